@@ -0,0 +1,109 @@
+"""Memory of slotted AST nodes and speed of table dispatch over `accept()`.
+
+Run from the repository root: python -m benchmarks.ast_benchmark
+"""
+
+import contextlib
+import inspect
+import io
+import tracemalloc
+
+from benchmarks.common import best_of, generate_source
+from pylox.expr import EXPR_NODES, Expr, Literal
+from pylox.interpreter import Interpreter
+from pylox.parser import Parser
+from pylox.regex_scanner import RegexScanner
+from pylox.resolver import Resolver
+from pylox.stmt import STMT_NODES, Stmt
+
+FIB = """
+fun fib(n) {
+  if (n < 2) return n;
+  return fib(n - 1) + fib(n - 2);
+}
+print fib(20);
+"""
+
+SLOTTED_CLASSES = {cls: cls for cls in (*EXPR_NODES, *STMT_NODES)}
+
+# The slots each node class takes as constructor parameters, in order; the
+# others are filled in later, by the resolver or at run time.
+CONSTRUCTOR_FIELDS = {
+    cls: tuple(inspect.signature(cls.__init__).parameters)[1:]
+    for cls in SLOTTED_CLASSES
+}
+
+
+# The same node class without `__slots__`, the way they used to be generated.
+def dict_class(cls: type) -> type:
+    def __init__(self, *fields) -> None:
+        for name, field in zip(CONSTRUCTOR_FIELDS[cls], fields):
+            setattr(self, name, field)
+
+    return type(cls.__name__, (), {"__init__": __init__})
+
+
+DICT_CLASSES = {cls: dict_class(cls) for cls in SLOTTED_CLASSES}
+
+
+# Rebuilds a tree with other node classes; tokens are shared with the original.
+def copy_tree(value, classes):
+    if isinstance(value, list):
+        return [copy_tree(item, classes) for item in value]
+    if isinstance(value, (Expr, Stmt)):
+        cls = type(value)
+        fields = [getattr(value, name) for name in CONSTRUCTOR_FIELDS[cls]]
+        if not isinstance(value, Literal):
+            fields = [copy_tree(field, classes) for field in fields]
+        node = classes[cls](*fields)
+        for name in value.__slots__:
+            if name not in CONSTRUCTOR_FIELDS[cls]:
+                setattr(node, name, getattr(value, name))
+        return node
+    return value
+
+
+def tree_size(statements, classes) -> int:
+    tracemalloc.start()
+    tree = copy_tree(statements, classes)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del tree
+    return size
+
+
+# `Resolver` as it dispatched before: through the node's `accept()`.
+class AcceptResolver(Resolver):
+    def resolve_ast_node(self, node) -> None:
+        node.accept(self)
+
+
+def evaluate(statements) -> None:
+    interpreter = Interpreter()
+    Resolver(interpreter).resolve(statements)
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpreter.interpret(statements)
+
+
+def main() -> None:
+    statements = Parser(RegexScanner(generate_source(5_000)).scan_tokens()).parse()
+    dict_size = tree_size(statements, DICT_CLASSES)
+    slotted_size = tree_size(statements, SLOTTED_CLASSES)
+    print("AST of a 5000 chunk program (nodes and lists)")
+    print(f"  __dict__  {dict_size / 1e6:8.2f} MB")
+    print(f"  __slots__ {slotted_size / 1e6:8.2f} MB")
+    print(f"  saved     {1 - slotted_size / dict_size:8.0%}")
+
+    accept = best_of(lambda: AcceptResolver(Interpreter()).resolve(statements))
+    table = best_of(lambda: Resolver(Interpreter()).resolve(statements))
+    print("Resolver over the same program")
+    print(f"  accept()  {accept:8.3f}s")
+    print(f"  table     {table:8.3f}s")
+    print(f"  speedup   {accept / table:8.2f}x")
+
+    program = Parser(RegexScanner(FIB).scan_tokens()).parse()
+    print(f"Interpreter, fib(20): {best_of(lambda: evaluate(program)):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
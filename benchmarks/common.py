@@ -0,0 +1,37 @@
+import time
+import typing
+
+# A chunk of Lox that exercises every token kind; repeated to build large inputs.
+SAMPLE_CHUNK = """
+// generated benchmark input
+class Shape%(n)d < Base {
+  init(width, height) {
+    this.width = width;
+    this.height = height; /* block /* nested */ comment */
+  }
+  area() { return this.width * this.height - 0.5 / 2; }
+}
+fun compute%(n)d(a, b) {
+  var total = 0;
+  for (var i = 0; i < 10; i = i + 1) {
+    if (i >= a and i <= b or !false) total = total + i;
+    else total = total - 1;
+  }
+  while (total != 0) { total = nil; break; }
+  print "shape " + "%(n)d";
+  return total == 123.456;
+}
+"""
+
+
+def generate_source(chunks: int) -> str:
+    return "".join(SAMPLE_CHUNK % {"n": i} for i in range(chunks))
+
+
+def best_of(func: typing.Callable[[], typing.Any], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
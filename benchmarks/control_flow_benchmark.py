@@ -0,0 +1,80 @@
+"""`return` and `break` as completion values against exceptions.
+
+The exception-based baseline is the tree walker with the two statements
+raising `Return` and `BreakException` again, which its calls and loops still
+catch.
+
+Run from the repository root: python -m benchmarks.control_flow_benchmark
+"""
+
+import contextlib
+import io
+import typing
+
+import pylox.stmt as stmt_ast
+from benchmarks.common import best_of
+from pylox.error import BreakException
+from pylox.interpreter import Interpreter
+from pylox.parser import Parser
+from pylox.regex_scanner import RegexScanner
+from pylox.resolver import Resolver
+from pylox.runtime_object import Return
+
+PROGRAMS = {
+    "fib(25)": """
+fun fib(n) {
+  if (n < 2) return n;
+  return fib(n - 1) + fib(n - 2);
+}
+print fib(25);
+""",
+    "early return": """
+fun find(limit) {
+  for (var i = 0; ; i = i + 1) {
+    if (i == limit) return i;
+  }
+}
+var total = 0;
+for (var n = 0; n < 3000; n = n + 1) total = total + find(5);
+print total;
+""",
+    "break": """
+var total = 0;
+for (var n = 0; n < 10000; n = n + 1) {
+  while (true) { total = total + 1; if (total > n) break; }
+}
+print total;
+""",
+}
+
+
+class RaisingInterpreter(Interpreter):
+    def visit_return_stmt(self, stmt: stmt_ast.Return) -> typing.Any:
+        value = None
+        if stmt.value is not None:
+            value = self.dispatch[stmt.value.kind](stmt.value)
+        raise Return(value)
+
+    def visit_break_stmt(self, stmt) -> typing.Any:
+        raise BreakException()
+
+
+def run(source: str, interpreter: Interpreter) -> None:
+    statements = Parser(RegexScanner(source).scan_tokens()).parse()
+    Resolver(interpreter).resolve(statements)
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpreter.interpret(statements)
+
+
+def main() -> None:
+    for name, source in PROGRAMS.items():
+        raising = best_of(lambda source=source: run(source, RaisingInterpreter()))
+        completions = best_of(lambda source=source: run(source, Interpreter()))
+        print(
+            f"{name:13} exceptions {raising:6.3f}s  completions "
+            f"{completions:6.3f}s  speedup {raising / completions:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
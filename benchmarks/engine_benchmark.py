@@ -0,0 +1,120 @@
+"""The execution engines against each other on classic Lox benchmarks.
+
+Run from the repository root: python -m benchmarks.engine_benchmark
+"""
+
+import contextlib
+import io
+
+from benchmarks.common import best_of
+from pylox.cli import ENGINES, EngineKind
+from pylox.interpreter import Interpreter
+from pylox.parser import Parser
+from pylox.regex_scanner import RegexScanner
+from pylox.resolver import Resolver
+
+PROGRAMS = {
+    "fib(20)": """
+fun fib(n) {
+  if (n < 2) return n;
+  return fib(n - 1) + fib(n - 2);
+}
+print fib(20);
+""",
+    "method_call": """
+class Toggle {
+  init(state) { this.state = state; }
+  value() { return this.state; }
+  activate() { this.state = !this.state; return this; }
+}
+var toggle = Toggle(true);
+for (var i = 0; i < 20000; i = i + 1) {
+  toggle.activate().value();
+}
+print toggle.value();
+""",
+    "instantiation": """
+class Foo { init() { this.a = 1; this.b = 2; } }
+for (var i = 0; i < 20000; i = i + 1) {
+  var foo = Foo();
+  foo.a = foo.a + foo.b;
+}
+print "done";
+""",
+    "zoo": """
+class Zoo {
+  init() { this.aarvark = 1; this.baboon = 1; this.cat = 1; }
+  ant() { return this.aarvark; }
+  banana() { return this.baboon; }
+  tuna() { return this.cat; }
+}
+var zoo = Zoo();
+var sum = 0;
+while (sum < 30000) {
+  sum = sum + zoo.ant() + zoo.banana() + zoo.tuna();
+}
+print sum;
+""",
+    "binary_trees": """
+class Tree {
+  init(depth) {
+    this.depth = depth;
+    if (depth > 0) {
+      this.a = Tree(depth - 1);
+      this.b = Tree(depth - 1);
+    }
+  }
+  check() {
+    if (this.depth == 0) return 1;
+    return 1 + this.a.check() + this.b.check();
+  }
+}
+print Tree(10).check();
+""",
+    "equality": """
+var count = 0;
+for (var i = 0; i < 30000; i = i + 1) {
+  if (i == 1 or "str" == "str" or nil == false) count = count + 1;
+}
+print count;
+""",
+    "closures": """
+fun makeAdder(n) {
+  fun add(x) { return x + n; }
+  return add;
+}
+var total = 0;
+for (var i = 0; i < 10000; i = i + 1) {
+  total = makeAdder(i)(total) - i;
+}
+print total;
+""",
+}
+
+
+def run(source: str, engine: EngineKind) -> None:
+    statements = Parser(RegexScanner(source).scan_tokens()).parse()
+    interpreter = Interpreter()
+    Resolver(interpreter).resolve(statements)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ENGINES[engine](interpreter).interpret(statements)
+
+
+def main() -> None:
+    for name, source in PROGRAMS.items():
+        times = {
+            engine: best_of(lambda source=source, engine=engine: run(source, engine))
+            for engine in EngineKind
+        }
+        tree = times[EngineKind.TREE]
+        print(
+            f"{name:13} "
+            + "  ".join(
+                f"{engine.value} {elapsed:6.3f}s ({tree / elapsed:.2f}x)"
+                for engine, elapsed in times.items()
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Variable access on recursion- and closure-heavy programs.
+
+Run from the repository root: python -m benchmarks.environment_benchmark
+"""
+
+import contextlib
+import io
+
+from benchmarks.common import best_of
+from pylox.interpreter import Interpreter
+from pylox.parser import Parser
+from pylox.regex_scanner import RegexScanner
+from pylox.resolver import Resolver
+
+PROGRAMS = {
+    "fib(20)": """
+fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+print fib(20);
+""",
+    "counters": """
+fun makeCounter() {
+  var count = 0;
+  fun inc() { count = count + 1; return count; }
+  return inc;
+}
+var total = 0;
+for (var i = 0; i < 2000; i = i + 1) {
+  var counter = makeCounter();
+  for (var j = 0; j < 20; j = j + 1) total = total + counter();
+}
+print total;
+""",
+    "deep locals": """
+fun run() {
+  var a = 1; var b = 2; var c = 3;
+  var total = 0;
+  for (var i = 0; i < 20000; i = i + 1) {
+    { { total = total + a + b + c + i; } }
+  }
+  return total;
+}
+print run();
+""",
+}
+
+
+def run(source: str) -> None:
+    statements = Parser(RegexScanner(source).scan_tokens()).parse()
+    interpreter = Interpreter()
+    Resolver(interpreter).resolve(statements)
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpreter.interpret(statements)
+
+
+def main() -> None:
+    for name, source in PROGRAMS.items():
+        seconds = best_of(lambda source=source: run(source), repeat=5)
+        print(f"{name:12} {seconds:6.3f}s")
+
+
+if __name__ == "__main__":
+    main()
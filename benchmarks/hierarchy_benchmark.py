@@ -0,0 +1,88 @@
+"""Method calls, super calls and instantiation at growing hierarchy depths.
+
+With flattened method tables the times should not grow with the depth.
+
+Run from the repository root: python -m benchmarks.hierarchy_benchmark
+"""
+
+import contextlib
+import io
+
+from benchmarks.common import best_of
+from pylox.cli import ENGINES, EngineKind
+from pylox.interpreter import Interpreter
+from pylox.parser import Parser
+from pylox.regex_scanner import RegexScanner
+from pylox.resolver import Resolver
+
+DEPTHS = (1, 10, 20, 40)
+
+# `Level0` defines everything; the leaf only adds a method calling `super`.
+HIERARCHY = """
+class Level0 {
+  init(value) { this.value = value; }
+  get() { return this.value; }
+}
+%(levels)s
+class Leaf < Level%(depth)d {
+  viaSuper() { return super.get(); }
+}
+"""
+
+WORKLOADS = {
+    "method": """
+var leaf = Leaf(1);
+var total = 0;
+for (var i = 0; i < 10000; i = i + 1) total = total + leaf.get();
+print total;
+""",
+    "super": """
+var leaf = Leaf(1);
+var total = 0;
+for (var i = 0; i < 10000; i = i + 1) total = total + leaf.viaSuper();
+print total;
+""",
+    "instantiation": """
+for (var i = 0; i < 10000; i = i + 1) Leaf(i);
+print "done";
+""",
+}
+
+
+def program(depth: int, workload: str) -> str:
+    levels = "\n".join(f"class Level{n} < Level{n - 1} {{}}" for n in range(1, depth))
+    return HIERARCHY % {"levels": levels, "depth": depth - 1} + workload
+
+
+def run(source: str, engine: EngineKind) -> None:
+    statements = Parser(RegexScanner(source).scan_tokens()).parse()
+    interpreter = Interpreter()
+    Resolver(interpreter).resolve(statements)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ENGINES[engine](interpreter).interpret(statements)
+
+
+def main() -> None:
+    for name, workload in WORKLOADS.items():
+        for engine in (EngineKind.TREE, EngineKind.CLOSURE, EngineKind.VM):
+            times = [
+                best_of(
+                    lambda d=d, workload=workload, engine=engine: run(
+                        program(d, workload), engine
+                    )
+                )
+                for d in DEPTHS
+            ]
+            print(
+                f"{name:13} {engine.value:8} "
+                + "  ".join(
+                    f"depth {depth:2} {elapsed:6.3f}s"
+                    for depth, elapsed in zip(DEPTHS, times)
+                )
+                + f"  ({times[-1] / times[0]:.2f}x from depth {DEPTHS[0]} "
+                f"to {DEPTHS[-1]})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Edit-to-result latency: incremental re-parse vs scanning and parsing again.
+
+Run from the repository root: python -m benchmarks.incremental_benchmark
+"""
+
+import time
+
+from benchmarks.common import best_of, generate_source
+from pylox.incremental import IncrementalDocument
+from pylox.parser import Parser
+from pylox.regex_scanner import RegexScanner
+
+
+def main() -> None:
+    for chunks in (100, 1_000, 5_000):
+        source = generate_source(chunks)
+        full = best_of(
+            lambda source=source: Parser(RegexScanner(source).scan_tokens()).parse()
+        )
+
+        doc = IncrementalDocument(source)
+        # Type a digit into the middle of the file and delete it again,
+        # once with a newline to force line renumbering.
+        middle = source.index("var total = 0", len(source) // 2) + len("var total = ")
+        edits = 100
+        doc.reparsed = 0
+        start = time.perf_counter()
+        for _ in range(edits):
+            doc.edit(middle, 0, "7")
+            doc.edit(middle, 1, "")
+        same_line = (time.perf_counter() - start) / (2 * edits)
+        reparsed = doc.reparsed / (2 * edits)
+
+        start = time.perf_counter()
+        for _ in range(edits):
+            doc.edit(middle, 0, "\n")
+            doc.edit(middle, 1, "")
+        new_line = (time.perf_counter() - start) / (2 * edits)
+
+        print(f"{len(source) / 1e6:.2f} MB, {len(doc.chunks)} declarations")
+        print(f"  full re-parse          {full * 1e3:9.2f} ms")
+        print(
+            f"  incremental edit       {same_line * 1e3:9.2f} ms"
+            f" ({reparsed:.1f} declarations re-parsed)"
+        )
+        print(f"  incremental line break {new_line * 1e3:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
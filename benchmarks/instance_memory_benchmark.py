@@ -0,0 +1,102 @@
+"""Bytes per instance: fields in a dict per instance vs shapes and slots.
+
+Builds the binary trees of the binary-trees benchmark and a linked list on the
+VM, keeps the result alive and divides the memory traced by the number of
+instances. The dict-per-instance layout is kept here for comparison.
+
+Run from the repository root: python -m benchmarks.instance_memory_benchmark
+"""
+
+import contextlib
+import gc
+import io
+import tracemalloc
+import typing
+
+import pylox.runtime_object as runtime_object
+import pylox.vm as vm
+from pylox.interpreter import Interpreter
+from pylox.parser import Parser
+from pylox.regex_scanner import RegexScanner
+from pylox.resolver import Resolver
+from pylox.runtime_object import LoxClass
+
+PROGRAMS = {
+    "binary trees (depth 14)": (
+        """
+class Tree {
+  init(left, right) { this.left = left; this.right = right; }
+}
+fun build(depth) {
+  if (depth == 0) return Tree(nil, nil);
+  return Tree(build(depth - 1), build(depth - 1));
+}
+var kept = build(14);
+""",
+        2**15 - 1,
+    ),
+    "linked list (3 fields)": (
+        """
+class Node {
+  init(value, next) { this.value = value; this.next = next; this.seen = false; }
+}
+var kept = nil;
+for (var i = 0; i < 30000; i = i + 1) kept = Node(i, kept);
+""",
+        30000,
+    ),
+}
+
+
+# The instance layout before shapes, kept for comparison.
+class DictInstance:
+    def __init__(self, lox_class: LoxClass) -> None:
+        self.lox_class = lox_class
+        self.fields: typing.Dict[str, typing.Any] = {}
+
+    def set_field(self, name: str, value: typing.Any) -> None:
+        self.fields[name] = value
+
+
+def retained_bytes(source: str) -> int:
+    statements = Parser(RegexScanner(source).scan_tokens()).parse()
+    interpreter = Interpreter()
+    Resolver(interpreter).resolve(statements)
+    engine = vm.VM(interpreter, max_depth=100)
+    gc.collect()
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.interpret(statements)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current
+
+
+# Swaps the class the VM and `LoxClass.call` instantiate.
+@contextlib.contextmanager
+def patched(module: typing.Any, cls: type) -> typing.Iterator[None]:
+    original = module.LoxInstance
+    module.LoxInstance = cls
+    try:
+        yield
+    finally:
+        module.LoxInstance = original
+
+
+def main() -> None:
+    for name, (source, count) in PROGRAMS.items():
+        shaped = retained_bytes(source)
+        with contextlib.ExitStack() as stack:
+            for module in (vm, runtime_object):
+                stack.enter_context(patched(module, DictInstance))
+            dicts = retained_bytes(source)
+        print(
+            f"{name:24} dict fields {dicts / count:6.0f} B/instance  "
+            f"shapes {shaped / count:6.0f} B/instance  "
+            f"({dicts / shaped:.2f}x smaller)"
+        )
+
+
+if __name__ == "__main__":
+    main()
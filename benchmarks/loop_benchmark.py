@@ -0,0 +1,68 @@
+"""Tight counting loops as a `For` node and as the old `while` desugaring.
+
+Run from the repository root: python -m benchmarks.loop_benchmark
+"""
+
+import contextlib
+import io
+
+import pylox.expr as expr_ast
+import pylox.stmt as stmt_ast
+from benchmarks.common import best_of
+from pylox.interpreter import Interpreter
+from pylox.parser import Parser
+from pylox.regex_scanner import RegexScanner
+from pylox.resolver import Resolver
+
+PROGRAMS = {
+    "empty body": "for (var i = 0; i < 100000; i = i + 1) {}",
+    "statement body": """
+var total = 0;
+for (var i = 0; i < 100000; i = i + 1) total = total + i;
+print total;
+""",
+    "nested": """
+var total = 0;
+for (var i = 0; i < 300; i = i + 1)
+  for (var j = 0; j < 300; j = j + 1) total = total + 1;
+print total;
+""",
+}
+
+
+# What `Parser.for_statement` used to produce.
+def desugar(node):
+    if isinstance(node, list):
+        return [desugar(item) for item in node]
+    if isinstance(node, stmt_ast.For):
+        body = desugar(node.body)
+        if node.increment is not None:
+            body = stmt_ast.Block([body, stmt_ast.Expression(node.increment)])
+        condition = node.condition or expr_ast.Literal(True)
+        loop = stmt_ast.While(condition, body)
+        if node.initializer is None:
+            return loop
+        return stmt_ast.Block([node.initializer, loop])
+    if isinstance(node, stmt_ast.Block):
+        return stmt_ast.Block(desugar(node.statements))
+    return node
+
+
+def run(statements) -> None:
+    interpreter = Interpreter()
+    Resolver(interpreter).resolve(statements)
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpreter.interpret(statements)
+
+
+def main() -> None:
+    for name, source in PROGRAMS.items():
+        statements = Parser(RegexScanner(source).scan_tokens()).parse()
+        desugared = desugar(statements)
+        old = best_of(lambda desugared=desugared: run(desugared), repeat=5)
+        new = best_of(lambda statements=statements: run(statements), repeat=5)
+        print(f"{name:15} while {old:6.3f}s  for {new:6.3f}s  speedup {old / new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Method-heavy programs on the tree walker, with the bound methods it created
+and the ones direct `obj.method()` calls did without.
+
+Every elided bound method saves two allocations: the bound `LoxFunction` and
+the copy of the argument list that `LoxFunction.call` makes.
+
+Run from the repository root: python -m benchmarks.method_call_benchmark
+"""
+
+import contextlib
+import io
+
+from benchmarks.common import best_of
+from pylox.interpreter import Interpreter
+from pylox.parser import Parser
+from pylox.regex_scanner import RegexScanner
+from pylox.resolver import Resolver
+
+PROGRAMS = {
+    "accessors": """
+class Point {
+  init(x, y) { this.x = x; this.y = y; }
+  getX() { return this.x; }
+  getY() { return this.y; }
+  add(other) { return Point(this.x + other.getX(), this.y + other.getY()); }
+}
+var p = Point(0, 0);
+var step = Point(1, 2);
+for (var i = 0; i < 10000; i = i + 1) p = p.add(step);
+print p.getX() + p.getY();
+""",
+    "chained calls": """
+class Counter {
+  init() { this.n = 0; }
+  inc() { this.n = this.n + 1; return this; }
+  get() { return this.n; }
+}
+var c = Counter();
+for (var i = 0; i < 10000; i = i + 1) c.inc().inc().inc();
+print c.get();
+""",
+    "escaping methods": """
+class Greeter {
+  init(name) { this.name = name; }
+  greet() { return "hi " + this.name; }
+}
+var g = Greeter("lox");
+var last;
+for (var i = 0; i < 10000; i = i + 1) {
+  var greet = g.greet;
+  last = greet();
+}
+print last;
+""",
+}
+
+
+def run(source: str) -> Interpreter:
+    statements = Parser(RegexScanner(source).scan_tokens()).parse()
+    interpreter = Interpreter()
+    Resolver(interpreter).resolve(statements)
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpreter.interpret(statements)
+    return interpreter
+
+
+def main() -> None:
+    for name, source in PROGRAMS.items():
+        elapsed = best_of(lambda source=source: run(source), repeat=5)
+        counts = run(source)
+        print(
+            f"{name:16} {elapsed:6.3f}s  bound methods "
+            f"{counts.bound_methods} created, "
+            f"{counts.elided_bound_methods} elided "
+            f"({2 * counts.elided_bound_methods} allocations saved)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Run time of a loop over constant expressions with and without the optimizer.
+
+Run from the repository root: python -m benchmarks.optimizer_benchmark
+"""
+
+import contextlib
+import io
+
+from benchmarks.common import best_of
+from pylox.cli import Lox
+
+PROGRAM = """
+var total = 0;
+for (var i = 0; i < 20000; i = i + 1) {
+  total = total + (1 + 2 * 3) / (4 - 2);
+  if (!true) total = total - 1;
+  if (1 < 2 and "a" + "b" == "ab") total = total + 1;
+}
+print total;
+"""
+
+
+def run(level: int) -> None:
+    with contextlib.redirect_stdout(io.StringIO()):
+        Lox(opt_level=level).run(PROGRAM)
+
+
+def main() -> None:
+    unoptimized = best_of(lambda: run(0))
+    optimized = best_of(lambda: run(1))
+    print("20000 iterations over constant expressions")
+    print(f"  -O 0    {unoptimized:8.3f}s")
+    print(f"  -O 1    {optimized:8.3f}s")
+    print(f"  speedup {unoptimized / optimized:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
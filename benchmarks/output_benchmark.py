@@ -0,0 +1,59 @@
+"""A print-heavy script on the VM with each output sink.
+
+Output goes to a line-buffered stream, as it does on a terminal, so that
+`print()` per line and the line flush policy pay for a write per line.
+
+Run from the repository root: python -m benchmarks.output_benchmark
+"""
+
+import contextlib
+import os
+import typing
+
+from benchmarks.common import best_of
+from pylox.interpreter import Interpreter
+from pylox.output import FlushPolicy, NullSink, OutputSink, StreamSink
+from pylox.parser import Parser
+from pylox.regex_scanner import RegexScanner
+from pylox.resolver import Resolver
+from pylox.vm import VM
+
+PROGRAM = """
+for (var i = 0; i < 100000; i = i + 1) print "line " + i;
+"""
+
+
+# How `print` wrote before sinks: Python's `print()` for every line.
+class PrintSink(OutputSink):
+    def __init__(self, stream: typing.TextIO) -> None:
+        self.stream = stream
+
+    def write_line(self, text: str) -> None:
+        print(text, file=self.stream)
+
+
+def run(output: OutputSink) -> None:
+    statements = Parser(RegexScanner(PROGRAM).scan_tokens()).parse()
+    interpreter = Interpreter(output)
+    Resolver(interpreter).resolve(statements)
+    VM(interpreter).interpret(statements)
+
+
+def main() -> None:
+    with contextlib.ExitStack() as stack:
+        stream = stack.enter_context(open(os.devnull, "w", buffering=1))
+        sinks: typing.Dict[str, typing.Callable[[], OutputSink]] = {
+            "print()": lambda: PrintSink(stream),
+            "line": lambda: StreamSink(stream, FlushPolicy.LINE),
+            "buffered": lambda: StreamSink(stream, FlushPolicy.BUFFERED),
+            "null": NullSink,
+        }
+        baseline = None
+        for name, sink in sinks.items():
+            elapsed = best_of(lambda sink=sink: run(sink()))
+            baseline = baseline or elapsed
+            print(f"{name:9} {elapsed:6.3f}s  ({baseline / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
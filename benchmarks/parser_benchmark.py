@@ -0,0 +1,38 @@
+"""Parse time of the recursive descent and the Pratt expression parser.
+
+Run from the repository root: python -m benchmarks.parser_benchmark
+"""
+
+from benchmarks.common import best_of, generate_source
+from pylox.parser import Parser
+from pylox.pratt_parser import PrattParser
+from pylox.regex_scanner import RegexScanner
+
+EXPRESSION_LINE = (
+    "var v%(n)d = 1 + 2 * (3 - x) / 4 >= -5 == !ok or a and b(1, 2).c"
+    ' != "s" + 1.5 * y < z;\n'
+)
+
+
+def main() -> None:
+    sources = (
+        (
+            "expression-heavy",
+            "".join(EXPRESSION_LINE % {"n": i} for i in range(20_000)),
+        ),
+        ("mixed program", generate_source(2_000)),
+    )
+    for name, source in sources:
+        tokens = RegexScanner(source).scan_tokens()
+        print(f"{name}: {len(tokens)} tokens")
+        results = {}
+        for parser_name, parser in (("descent", Parser), ("pratt", PrattParser)):
+            results[parser_name] = best_of(
+                lambda parser=parser, tokens=tokens: parser(tokens).parse()
+            )
+            print(f"  {parser_name:8} {results[parser_name]:8.3f}s")
+        print(f"  speedup  {results['descent'] / results['pratt']:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Tokens/sec of the classic and the regex scanner on large inputs.
+
+Run from the repository root: python -m benchmarks.scanner_benchmark
+"""
+
+from benchmarks.common import best_of, generate_source
+from pylox.regex_scanner import RegexScanner
+from pylox.scanner import Scanner
+
+
+def main() -> None:
+    for chunks in (1_000, 10_000):
+        source = generate_source(chunks)
+        token_count = len(RegexScanner(source).scan_tokens())
+        print(f"{len(source) / 1e6:.1f} MB, {token_count} tokens")
+        for name, scanner in (("classic", Scanner), ("regex", RegexScanner)):
+            elapsed = best_of(
+                lambda scanner=scanner, source=source: scanner(source).scan_tokens()
+            )
+            print(
+                f"  {name:8} {elapsed:8.3f}s {token_count / elapsed:12,.0f} tokens/sec"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Block and loop scopes with and without escape analysis.
+
+Run from the repository root: python -m benchmarks.scope_benchmark
+"""
+
+import contextlib
+import io
+
+from benchmarks.common import best_of
+from pylox.interpreter import Interpreter
+from pylox.parser import Parser
+from pylox.regex_scanner import RegexScanner
+from pylox.resolver import Resolver
+
+PROGRAMS = {
+    "nested loops": """
+fun run() {
+  var total = 0;
+  for (var i = 0; i < 200; i = i + 1) {
+    for (var j = 0; j < 200; j = j + 1) {
+      var sum = i + j;
+      if (sum > 100) { total = total + 1; }
+    }
+  }
+  return total;
+}
+print run();
+""",
+    "block locals": """
+fun run() {
+  var total = 0;
+  var i = 0;
+  while (i < 20000) {
+    var doubled = i * 2;
+    { var tripled = doubled + i; total = total + tripled; }
+    i = i + 1;
+  }
+  return total;
+}
+print run();
+""",
+    "fib(18)": """
+fun fib(n) {
+  if (n < 2) { return n; }
+  { var a = fib(n - 1); var b = fib(n - 2); return a + b; }
+}
+print fib(18);
+""",
+    "closures": """
+fun run() {
+  var total = 0;
+  for (var i = 0; i < 3000; i = i + 1) {
+    var captured = i;
+    fun get() { return captured; }
+    { var scratch = get(); total = total + scratch; }
+  }
+  return total;
+}
+print run();
+""",
+}
+
+
+def run(source: str, flatten_scopes: bool) -> Interpreter:
+    statements = Parser(RegexScanner(source).scan_tokens()).parse()
+    interpreter = Interpreter()
+    Resolver(interpreter, flatten_scopes).resolve(statements)
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpreter.interpret(statements)
+    return interpreter
+
+
+def main() -> None:
+    for name, source in PROGRAMS.items():
+        nested = best_of(lambda source=source: run(source, False), repeat=5)
+        flat = best_of(lambda source=source: run(source, True), repeat=5)
+        counts = run(source, True)
+        print(
+            f"{name:13} nested {nested:6.3f}s  flat {flat:6.3f}s  "
+            f"speedup {nested / flat:.2f}x  environments "
+            f"{counts.scope_environments} allocated, "
+            f"{counts.avoided_environments} avoided"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Startup time of a script run from source and from a compiled .loxc program.
+
+Run from the repository root: python -m benchmarks.startup_benchmark
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import best_of, generate_source
+from pylox.cli import Lox
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        for chunks in (10, 500, 2_000):
+            script = os.path.join(tmp, f"script{chunks}.lox")
+            compiled = os.path.join(tmp, f"script{chunks}.loxc")
+            with open(script, "w", encoding="utf-8") as f:
+                f.write("class Base {}\n" + generate_source(chunks))
+            Lox().compile_file(script, compiled)
+            print(
+                f"{chunks} chunks: {os.path.getsize(script) / 1e3:.0f} kB source, "
+                f"{os.path.getsize(compiled) / 1e3:.0f} kB compiled"
+            )
+
+            source = best_of(lambda script=script: Lox().load_source(script))
+            artifact = best_of(lambda compiled=compiled: Lox().load_compiled(compiled))
+            print(f"  load   source {source:7.3f}s  compiled {artifact:7.3f}s")
+
+            commands = {
+                "source": [sys.executable, "-m", "pylox", "--no-cache", script],
+                "compiled": [sys.executable, "-m", "pylox", compiled],
+            }
+            process = {
+                name: best_of(
+                    lambda command=command: subprocess.run(command, check=True)
+                )
+                for name, command in commands.items()
+            }
+            print(
+                f"  process source {process['source']:6.3f}s  "
+                f"compiled {process['compiled']:7.3f}s  "
+                f"speedup {process['source'] / process['compiled']:.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Peak Python heap of the front end: whole-file scan vs streaming scan.
+
+Run from the repository root: python -m benchmarks.stream_benchmark
+"""
+
+import os
+import tempfile
+import tracemalloc
+import typing
+
+from benchmarks.common import generate_source
+from pylox.parser import Parser
+from pylox.regex_scanner import RegexScanner, StreamScanner
+
+
+def scan_whole_file(path: str) -> None:
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    for _ in RegexScanner(source).scan_tokens():
+        pass
+
+
+def scan_stream(path: str) -> None:
+    for _ in StreamScanner(path).scan_tokens():
+        pass
+
+
+def parse_whole_file(path: str) -> None:
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    Parser(RegexScanner(source).scan_tokens()).parse()
+
+
+def parse_stream(path: str) -> None:
+    Parser(StreamScanner(path).scan_tokens()).parse()
+
+
+def peak_memory(func: typing.Callable[[str], None], path: str) -> int:
+    tracemalloc.start()
+    func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main() -> None:
+    runs = (
+        ("scan whole", scan_whole_file),
+        ("scan stream", scan_stream),
+        ("parse whole", parse_whole_file),
+        ("parse stream", parse_stream),
+    )
+    for chunks in (500, 2_000, 4_000):
+        with tempfile.NamedTemporaryFile("w", suffix=".lox", delete=False) as f:
+            f.write(generate_source(chunks))
+        try:
+            size = os.path.getsize(f.name)
+            print(f"{size / 1e6:.1f} MB source")
+            for name, func in runs:
+                peak = peak_memory(func, f.name)
+                print(f"  {name:12} peak {peak / 1e6:8.1f} MB")
+        finally:
+            os.unlink(f.name)
+
+
+if __name__ == "__main__":
+    main()
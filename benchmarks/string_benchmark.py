@@ -0,0 +1,62 @@
+"""Building a long string with `s = s + piece;` in a loop.
+
+Plain strings copy the whole prefix on every `+`, so the time grows with the
+square of the final length; ropes only append a piece. Plain strings are
+measured at sizes they finish in reasonable time.
+
+Run from the repository root: python -m benchmarks.string_benchmark
+"""
+
+import contextlib
+import io
+
+import pylox.interpreter as interpreter_module
+from benchmarks.common import best_of
+from pylox.interpreter import Interpreter
+from pylox.parser import Parser
+from pylox.regex_scanner import RegexScanner
+from pylox.resolver import Resolver
+
+# 100 characters per piece.
+PROGRAM = """
+var piece = "0123456789012345678901234567890123456789012345678901234567890123456789012345678901234567890123456789";
+var s = "";
+for (var i = 0; i < %(pieces)d; i = i + 1) s = s + piece;
+print len(s);
+"""
+
+PLAIN_SIZES_MB = (0.5, 1, 2)
+ROPE_SIZES_MB = (0.5, 1, 2, 10)
+
+
+def run(size_mb: float) -> None:
+    source = PROGRAM % {"pieces": int(size_mb * 10_000)}
+    statements = Parser(RegexScanner(source).scan_tokens()).parse()
+    interpreter = Interpreter()
+    Resolver(interpreter).resolve(statements)
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpreter.interpret(statements)
+
+
+def plain_concat(left, right) -> str:
+    return str(left) + str(right)
+
+
+def main() -> None:
+    original = interpreter_module.concat
+    interpreter_module.concat = plain_concat
+    try:
+        for size in PLAIN_SIZES_MB:
+            print(
+                f"plain strings {size:4} MB {best_of(lambda size=size: run(size), 1):7.3f}s"
+            )
+    finally:
+        interpreter_module.concat = original
+    for size in ROPE_SIZES_MB:
+        print(
+            f"ropes         {size:4} MB {best_of(lambda size=size: run(size), 1):7.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Memory per 100k tokens: Token objects vs the compact TokenBuffer.
+
+Run from the repository root: python -m benchmarks.token_memory_benchmark
+"""
+
+import tracemalloc
+import typing
+
+from benchmarks.common import generate_source
+from pylox.parser import Parser
+from pylox.regex_scanner import CompactScanner, RegexScanner
+
+
+# The token layout before `Token` got `__slots__`, kept for comparison.
+class DictToken:
+    def __init__(self, token_type, lexeme, literal, line):
+        self.token_type = token_type
+        self.lexeme = lexeme
+        self.literal = literal
+        self.line = line
+
+
+def dict_tokens(source: str) -> list:
+    return [
+        DictToken(t.token_type, t.lexeme, t.literal, t.line)
+        for t in RegexScanner(source).scan_tokens()
+    ]
+
+
+def retained_memory(func: typing.Callable[[], typing.Any]) -> int:
+    tracemalloc.start()
+    result = func()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result  # kept alive until measured
+    return current
+
+
+def main() -> None:
+    source = generate_source(1_000)
+    token_count = len(CompactScanner(source).scan_tokens())
+    per_100k = 100_000 / token_count
+    print(f"{token_count} tokens, {len(source) / 1e6:.1f} MB source (not counted)")
+
+    runs = (
+        ("dict Token", lambda: dict_tokens(source)),
+        ("slotted Token", lambda: RegexScanner(source).scan_tokens()),
+        ("TokenBuffer", lambda: CompactScanner(source).scan_tokens()),
+    )
+    print("token stream, MB per 100k tokens:")
+    for name, func in runs:
+        retained = retained_memory(func)
+        print(f"  {name:14} {retained * per_100k / 1e6:8.2f}")
+
+    runs = (
+        ("slotted Token", lambda: Parser(RegexScanner(source).scan_tokens()).parse()),
+        ("TokenBuffer", lambda: Parser(CompactScanner(source).scan_tokens()).parse()),
+    )
+    print("parsed AST with the tokens it keeps, MB per 100k tokens:")
+    for name, func in runs:
+        retained = retained_memory(func)
+        print(f"  {name:14} {retained * per_100k / 1e6:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,548 @@
+import collections
+import typing
+
+import pylox.expr as expr_ast
+import pylox.stmt as stmt_ast
+from pylox.error import LoxRuntimeError
+from pylox.interpreter import Interpreter
+from pylox.rope import STRING_TYPES, concat
+from pylox.runtime_object import LoxCallable, LoxClass, LoxFunction, LoxInstance
+from pylox.tokens import Token, TokenType
+
+# How often a node may lose its specialization before it settles for the
+# generic code for good.
+MAX_DESPECIALIZATIONS = 2
+
+# Specialized nodes continue the kinds after the generated ones, so the
+# dispatch table just grows.
+FIRST_KIND = len(expr_ast.EXPR_NODES) + len(stmt_ast.STMT_NODES)
+
+
+# The node variants. Each one subclasses a generated node without adding
+# slots, so a node turns into a variant, and back, by assigning its
+# `__class__`; its new `kind` sends it to the variant's `visitor`.
+class AddNumbers(expr_ast.Binary):
+    __slots__ = ()
+    kind = FIRST_KIND
+    visitor = "visit_add_numbers"
+
+
+class AddStrings(expr_ast.Binary):
+    __slots__ = ()
+    kind = FIRST_KIND + 1
+    visitor = "visit_add_strings"
+
+
+class SubtractNumbers(expr_ast.Binary):
+    __slots__ = ()
+    kind = FIRST_KIND + 2
+    visitor = "visit_subtract_numbers"
+
+
+class MultiplyNumbers(expr_ast.Binary):
+    __slots__ = ()
+    kind = FIRST_KIND + 3
+    visitor = "visit_multiply_numbers"
+
+
+class DivideNumbers(expr_ast.Binary):
+    __slots__ = ()
+    kind = FIRST_KIND + 4
+    visitor = "visit_divide_numbers"
+
+
+class GreaterNumbers(expr_ast.Binary):
+    __slots__ = ()
+    kind = FIRST_KIND + 5
+    visitor = "visit_greater_numbers"
+
+
+class GreaterEqualNumbers(expr_ast.Binary):
+    __slots__ = ()
+    kind = FIRST_KIND + 6
+    visitor = "visit_greater_equal_numbers"
+
+
+class LessNumbers(expr_ast.Binary):
+    __slots__ = ()
+    kind = FIRST_KIND + 7
+    visitor = "visit_less_numbers"
+
+
+class LessEqualNumbers(expr_ast.Binary):
+    __slots__ = ()
+    kind = FIRST_KIND + 8
+    visitor = "visit_less_equal_numbers"
+
+
+# Equality takes any operands, so these need no guard.
+class Equal(expr_ast.Binary):
+    __slots__ = ()
+    kind = FIRST_KIND + 9
+    visitor = "visit_equal"
+
+
+class NotEqual(expr_ast.Binary):
+    __slots__ = ()
+    kind = FIRST_KIND + 10
+    visitor = "visit_not_equal"
+
+
+class GenericBinary(expr_ast.Binary):
+    __slots__ = ()
+    kind = FIRST_KIND + 11
+    visitor = "visit_generic_binary"
+
+
+class NegateNumber(expr_ast.Unary):
+    __slots__ = ()
+    kind = FIRST_KIND + 12
+    visitor = "visit_negate_number"
+
+
+class Not(expr_ast.Unary):
+    __slots__ = ()
+    kind = FIRST_KIND + 13
+    visitor = "visit_not"
+
+
+class GenericUnary(expr_ast.Unary):
+    __slots__ = ()
+    kind = FIRST_KIND + 14
+    visitor = "visit_generic_unary"
+
+
+# `cache` holds the last shape seen and the slot of the field in it.
+class GetField(expr_ast.Get):
+    __slots__ = ()
+    kind = FIRST_KIND + 15
+    visitor = "visit_get_field"
+
+
+# Monomorphic: `cache` holds the one class seen and the method it resolves to.
+# It is cleared on the way back to `Get`, whose inline cache has another shape.
+class GetMethod(expr_ast.Get):
+    __slots__ = ()
+    kind = FIRST_KIND + 16
+    visitor = "visit_get_method"
+
+
+class GenericGet(expr_ast.Get):
+    __slots__ = ()
+    kind = FIRST_KIND + 17
+    visitor = "visit_generic_get"
+
+
+class CallFunction(expr_ast.Call):
+    __slots__ = ()
+    kind = FIRST_KIND + 18
+    visitor = "visit_call_function"
+
+
+class CallClass(expr_ast.Call):
+    __slots__ = ()
+    kind = FIRST_KIND + 19
+    visitor = "visit_call_class"
+
+
+class GenericCall(expr_ast.Call):
+    __slots__ = ()
+    kind = FIRST_KIND + 20
+    visitor = "visit_generic_call"
+
+
+# A literal whose value is ready to use: integer literals, which the scanner
+# keeps as `int`, hold the equal float, as every other number does.
+class Constant(expr_ast.Literal):
+    __slots__ = ()
+    kind = FIRST_KIND + 21
+    visitor = "visit_constant"
+
+
+# `obj.method(...)`: the tree walker's call, which runs the method without
+# creating a bound function. It depends on the shape of the node alone.
+class CallMethod(expr_ast.Call):
+    __slots__ = ()
+    kind = FIRST_KIND + 22
+    visitor = "visit_call_method"
+
+
+# In `kind` order.
+SPECIALIZED_NODES: typing.Tuple[typing.Type[expr_ast.Expr], ...] = (
+    AddNumbers,
+    AddStrings,
+    SubtractNumbers,
+    MultiplyNumbers,
+    DivideNumbers,
+    GreaterNumbers,
+    GreaterEqualNumbers,
+    LessNumbers,
+    LessEqualNumbers,
+    Equal,
+    NotEqual,
+    GenericBinary,
+    NegateNumber,
+    Not,
+    GenericUnary,
+    GetField,
+    GetMethod,
+    GenericGet,
+    CallFunction,
+    CallClass,
+    GenericCall,
+    Constant,
+    CallMethod,
+)
+
+NUMBER_VARIANTS: typing.Dict[TokenType, typing.Type[expr_ast.Binary]] = {
+    TokenType.PLUS: AddNumbers,
+    TokenType.MINUS: SubtractNumbers,
+    TokenType.STAR: MultiplyNumbers,
+    TokenType.SLASH: DivideNumbers,
+    TokenType.GREATER: GreaterNumbers,
+    TokenType.GREATER_EQUAL: GreaterEqualNumbers,
+    TokenType.LESS: LessNumbers,
+    TokenType.LESS_EQUAL: LessEqualNumbers,
+}
+
+is_number = Interpreter.is_number
+concatenate = Interpreter.concatenate
+
+
+# The variant that fits a binary operator and the operands it just got, if any.
+def binary_variant(
+    token_type: TokenType, left: typing.Any, right: typing.Any
+) -> typing.Optional[typing.Type[expr_ast.Binary]]:
+    if token_type == TokenType.EQUAL_EQUAL:
+        return Equal
+    if token_type == TokenType.BANG_EQUAL:
+        return NotEqual
+    if is_number(left) and is_number(right):
+        return NUMBER_VARIANTS[token_type]
+    if (
+        token_type == TokenType.PLUS
+        and type(left) in STRING_TYPES
+        and type(right) in STRING_TYPES
+    ):
+        return AddStrings
+    return None
+
+
+# What the tree walker's `visit_binary_expr` does once the operands are known.
+def operate(op: Token, left: typing.Any, right: typing.Any) -> typing.Any:
+    token_type = op.token_type
+    if token_type == TokenType.EQUAL_EQUAL:
+        return left == right
+    if token_type == TokenType.BANG_EQUAL:
+        return left != right
+    if token_type == TokenType.PLUS:
+        if is_number(left) and is_number(right):
+            return float(left) + float(right)
+        if type(left) in STRING_TYPES or type(right) in STRING_TYPES:
+            return concatenate(left, right)
+        raise LoxRuntimeError(op, "Operands must be two numbers or two strings.")
+
+    Interpreter.check_number_operands(op, left, right)
+    a, b = float(left), float(right)
+    if token_type == TokenType.MINUS:
+        return a - b
+    if token_type == TokenType.STAR:
+        return a * b
+    if token_type == TokenType.SLASH:
+        if b == 0:
+            raise LoxRuntimeError(op, "Division by zero!")
+        return a / b
+    if token_type == TokenType.GREATER:
+        return a > b
+    if token_type == TokenType.GREATER_EQUAL:
+        return a >= b
+    if token_type == TokenType.LESS:
+        return a < b
+    return a <= b
+
+
+# A tree walker whose nodes adapt to the values flowing through them
+# ("quickening"). The first time a `Binary`, `Unary`, `Get` or `Call` runs it
+# looks at its operands and rewrites itself into a variant specialized for
+# them: `a - b` on numbers becomes a `SubtractNumbers` that subtracts two
+# floats after a cheap `type() is float` guard, `obj.method` on instances of
+# one class becomes a `GetMethod` that skips the lookup through the class
+# hierarchy. When a guard fails the node goes back to its generic form and
+# observes again; after `MAX_DESPECIALIZATIONS` it turns into a generic
+# variant that runs the tree walker's code without observing anything.
+#
+# The rewritten nodes belong to the program being run: a program is run by
+# one adaptive engine at a time, and the other engines don't run a program
+# after it.
+class AdaptiveInterpreter(Interpreter):
+    def __init__(self, interpreter: Interpreter):
+        super().__init__(interpreter.output)
+        self.globals = interpreter.globals
+        self.environment = self.globals
+        self.dispatch += [getattr(self, node.visitor) for node in SPECIALIZED_NODES]
+        # Rewrites into each variant, and guard failures that undid them.
+        self.specializations: typing.Counter[str] = collections.Counter()
+        self.despecializations: typing.Counter[str] = collections.Counter()
+
+    def report(self) -> typing.List[str]:
+        return super().report() + [
+            f"quickening: {self.specializations.total()} specializations"
+            + self.breakdown(self.specializations),
+            f"quickening: {self.despecializations.total()} de-specializations"
+            + self.breakdown(self.despecializations),
+        ]
+
+    @staticmethod
+    def breakdown(counts: typing.Counter[str]) -> str:
+        if not counts:
+            return ""
+        return " (" + ", ".join(f"{n} {name}" for name, n in counts.most_common()) + ")"
+
+    def specialize(self, expr: expr_ast.Expr, variant: type) -> None:
+        expr.__class__ = variant
+        self.specializations[variant.__name__] += 1
+
+    def despecialize(self, expr: expr_ast.Expr, generic: type, settled: type) -> None:
+        self.despecializations[type(expr).__name__] += 1
+        # The count lives on the node, so it goes away with the program.
+        expr.failures += 1  # type: ignore[attr-defined]
+        if expr.failures < MAX_DESPECIALIZATIONS:  # type: ignore[attr-defined]
+            expr.__class__ = generic
+        else:
+            self.specialize(expr, settled)
+
+    # Generic nodes: run like the tree walker, then specialize.
+
+    # Only integers that a float holds exactly: Lox arithmetic turns them
+    # into floats anyway and `stringify` prints both alike. Not counted, as
+    # there is nothing to guard.
+    def visit_literal_expr(self, expr: expr_ast.Literal) -> typing.Any:
+        value = expr.value
+        if type(value) is int and float(value) == value:
+            value = expr.value = float(value)
+        expr.__class__ = Constant
+        return value
+
+    def visit_binary_expr(self, expr: expr_ast.Binary) -> typing.Any:
+        left = self.dispatch[expr.left.kind](expr.left)
+        right = self.dispatch[expr.right.kind](expr.right)
+        variant = binary_variant(expr.operator.token_type, left, right)
+        if variant is not None:
+            self.specialize(expr, variant)
+        return operate(expr.operator, left, right)
+
+    def visit_unary_expr(self, expr: expr_ast.Unary) -> typing.Any:
+        right = self.dispatch[expr.right.kind](expr.right)
+        if expr.operator.token_type == TokenType.BANG:
+            self.specialize(expr, Not)
+            return right is None or right is False
+        self.check_number_operand(expr.operator, right)
+        self.specialize(expr, NegateNumber)
+        return -float(right)
+
+    def visit_get_expr(self, expr: expr_ast.Get) -> typing.Any:
+        obj = self.dispatch[expr.obj.kind](expr.obj)
+        if type(obj) is LoxInstance:
+            name = expr.name.lexeme
+            index = obj.shape.slots.get(name)
+            if index is not None:
+                expr.cache = (obj.shape, index)
+                self.specialize(expr, GetField)
+                return obj.values[index]
+            method = obj.lox_class.find_method(name)
+            if method is not None:
+                expr.cache = (obj.lox_class, method)
+                self.specialize(expr, GetMethod)
+                return method.bind(obj)
+        return self.get(expr, obj)
+
+    def visit_call_expr(self, expr: expr_ast.Call) -> typing.Any:
+        if type(expr.callee) is expr_ast.Get:
+            self.specialize(expr, CallMethod)
+            return self.visit_call_method(expr)
+        callee = self.dispatch[expr.callee.kind](expr.callee)
+        arguments = [self.dispatch[arg.kind](arg) for arg in expr.arguments]
+        if type(callee) is LoxFunction:
+            self.specialize(expr, CallFunction)
+        elif type(callee) is LoxClass:
+            self.specialize(expr, CallClass)
+        return self.call(expr, callee, arguments)
+
+    # Specialized nodes: the guarded fast path first. Number variants take
+    # integers from literals on a slower path without giving up.
+
+    def visit_add_numbers(self, expr: expr_ast.Binary) -> typing.Any:
+        left = self.dispatch[expr.left.kind](expr.left)
+        right = self.dispatch[expr.right.kind](expr.right)
+        if type(left) is float and type(right) is float:
+            return left + right
+        return self.binary_miss(expr, left, right)
+
+    def visit_add_strings(self, expr: expr_ast.Binary) -> typing.Any:
+        left = self.dispatch[expr.left.kind](expr.left)
+        right = self.dispatch[expr.right.kind](expr.right)
+        if type(left) in STRING_TYPES and type(right) in STRING_TYPES:
+            return concat(left, right)
+        return self.binary_miss(expr, left, right)
+
+    def visit_subtract_numbers(self, expr: expr_ast.Binary) -> typing.Any:
+        left = self.dispatch[expr.left.kind](expr.left)
+        right = self.dispatch[expr.right.kind](expr.right)
+        if type(left) is float and type(right) is float:
+            return left - right
+        return self.binary_miss(expr, left, right)
+
+    def visit_multiply_numbers(self, expr: expr_ast.Binary) -> typing.Any:
+        left = self.dispatch[expr.left.kind](expr.left)
+        right = self.dispatch[expr.right.kind](expr.right)
+        if type(left) is float and type(right) is float:
+            return left * right
+        return self.binary_miss(expr, left, right)
+
+    def visit_divide_numbers(self, expr: expr_ast.Binary) -> typing.Any:
+        left = self.dispatch[expr.left.kind](expr.left)
+        right = self.dispatch[expr.right.kind](expr.right)
+        if type(left) is float and type(right) is float and right != 0:
+            return left / right
+        return self.binary_miss(expr, left, right)
+
+    def visit_greater_numbers(self, expr: expr_ast.Binary) -> typing.Any:
+        left = self.dispatch[expr.left.kind](expr.left)
+        right = self.dispatch[expr.right.kind](expr.right)
+        if type(left) is float and type(right) is float:
+            return left > right
+        return self.binary_miss(expr, left, right)
+
+    def visit_greater_equal_numbers(self, expr: expr_ast.Binary) -> typing.Any:
+        left = self.dispatch[expr.left.kind](expr.left)
+        right = self.dispatch[expr.right.kind](expr.right)
+        if type(left) is float and type(right) is float:
+            return left >= right
+        return self.binary_miss(expr, left, right)
+
+    def visit_less_numbers(self, expr: expr_ast.Binary) -> typing.Any:
+        left = self.dispatch[expr.left.kind](expr.left)
+        right = self.dispatch[expr.right.kind](expr.right)
+        if type(left) is float and type(right) is float:
+            return left < right
+        return self.binary_miss(expr, left, right)
+
+    def visit_less_equal_numbers(self, expr: expr_ast.Binary) -> typing.Any:
+        left = self.dispatch[expr.left.kind](expr.left)
+        right = self.dispatch[expr.right.kind](expr.right)
+        if type(left) is float and type(right) is float:
+            return left <= right
+        return self.binary_miss(expr, left, right)
+
+    def visit_equal(self, expr: expr_ast.Binary) -> typing.Any:
+        left = self.dispatch[expr.left.kind](expr.left)
+        return left == self.dispatch[expr.right.kind](expr.right)
+
+    def visit_not_equal(self, expr: expr_ast.Binary) -> typing.Any:
+        left = self.dispatch[expr.left.kind](expr.left)
+        return left != self.dispatch[expr.right.kind](expr.right)
+
+    # Operands the fast path didn't take: a node only gives up its variant if
+    # they don't fit it.
+    def binary_miss(
+        self, expr: expr_ast.Binary, left: typing.Any, right: typing.Any
+    ) -> typing.Any:
+        if binary_variant(expr.operator.token_type, left, right) is not type(expr):
+            self.despecialize(expr, expr_ast.Binary, GenericBinary)
+        return operate(expr.operator, left, right)
+
+    def visit_negate_number(self, expr: expr_ast.Unary) -> typing.Any:
+        right = self.dispatch[expr.right.kind](expr.right)
+        if type(right) is float:
+            return -right
+        if type(right) is not int:
+            self.despecialize(expr, expr_ast.Unary, GenericUnary)
+            self.check_number_operand(expr.operator, right)
+        return -float(right)
+
+    def visit_not(self, expr: expr_ast.Unary) -> typing.Any:
+        right = self.dispatch[expr.right.kind](expr.right)
+        return right is None or right is False
+
+    def visit_get_field(self, expr: expr_ast.Get) -> typing.Any:
+        obj = self.dispatch[expr.obj.kind](expr.obj)
+        if type(obj) is LoxInstance:
+            shape, index = expr.cache
+            if obj.shape is shape:
+                return obj.values[index]
+            index = obj.shape.slots.get(expr.name.lexeme)
+            if index is not None:
+                expr.cache = (obj.shape, index)
+                return obj.values[index]
+        expr.cache = None
+        self.despecialize(expr, expr_ast.Get, GenericGet)
+        return self.get(expr, obj)
+
+    # A field of the same name shadows the method, so the guard checks that
+    # there is none.
+    def visit_get_method(self, expr: expr_ast.Get) -> typing.Any:
+        obj = self.dispatch[expr.obj.kind](expr.obj)
+        if type(obj) is LoxInstance:
+            lox_class, method = expr.cache
+            if obj.lox_class is lox_class and expr.name.lexeme not in obj.shape.slots:
+                return method.bind(obj)
+        expr.cache = None
+        self.despecialize(expr, expr_ast.Get, GenericGet)
+        return self.get(expr, obj)
+
+    def visit_call_function(self, expr: expr_ast.Call) -> typing.Any:
+        callee = self.dispatch[expr.callee.kind](expr.callee)
+        arguments = [self.dispatch[arg.kind](arg) for arg in expr.arguments]
+        if type(callee) is LoxFunction:
+            if len(arguments) == len(callee.declaration.params):
+                try:
+                    return callee.call(self, arguments)
+                except RecursionError:
+                    raise LoxRuntimeError(expr.paren, "Stack overflow.") from None
+        else:
+            self.despecialize(expr, expr_ast.Call, GenericCall)
+        return self.call(expr, callee, arguments)
+
+    def visit_call_class(self, expr: expr_ast.Call) -> typing.Any:
+        callee = self.dispatch[expr.callee.kind](expr.callee)
+        arguments = [self.dispatch[arg.kind](arg) for arg in expr.arguments]
+        if type(callee) is LoxClass:
+            if len(arguments) == callee.arity():
+                try:
+                    return callee.call(self, arguments)
+                except RecursionError:
+                    raise LoxRuntimeError(expr.paren, "Stack overflow.") from None
+        else:
+            self.despecialize(expr, expr_ast.Call, GenericCall)
+        return self.call(expr, callee, arguments)
+
+    # The tree walker's checks, for values the variants don't handle.
+
+    def get(self, expr: expr_ast.Get, obj: typing.Any) -> typing.Any:
+        if isinstance(obj, LoxInstance):
+            return obj.get(expr.name)
+        raise LoxRuntimeError(expr.name, "Only instances have properties.")
+
+    def call(
+        self, expr: expr_ast.Call, callee: typing.Any, arguments: list
+    ) -> typing.Any:
+        if not isinstance(callee, LoxCallable):
+            raise LoxRuntimeError(expr.paren, "Can only call functions and classes.")
+        if len(arguments) != callee.arity():
+            raise LoxRuntimeError(
+                expr.paren,
+                f"Expected {callee.arity()} arguments but got {len(arguments)}.",
+            )
+        try:
+            return callee.call(self, arguments)
+        except RecursionError:
+            raise LoxRuntimeError(expr.paren, "Stack overflow.") from None
+
+    visit_constant = Interpreter.visit_literal_expr
+    visit_call_method = Interpreter.visit_call_expr
+
+    # Nodes that gave up run the tree walker's code.
+    visit_generic_binary = Interpreter.visit_binary_expr
+    visit_generic_unary = Interpreter.visit_unary_expr
+    visit_generic_get = Interpreter.visit_get_expr
+    visit_generic_call = Interpreter.visit_call_expr
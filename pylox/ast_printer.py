@@ -1,11 +1,22 @@
-from pylox.expr import Expr, Binary, Grouping, Literal, Unary, ExprVisitor
+from pylox.expr import (
+    Expr,
+    Binary,
+    Grouping,
+    Literal,
+    Unary,
+    ExprVisitor,
+    expr_dispatch_table,
+)
 from pylox.tokens import Token, TokenType
 import typing
 
 
 class AstPrinter(ExprVisitor):
+    def __init__(self) -> None:
+        self.dispatch = expr_dispatch_table(self)
+
     def print(self, expr: Expr) -> str:
-        return expr.accept(self)
+        return self.dispatch[expr.kind](expr)
 
     def visit_super_expr(self, expr) -> typing.Any:
         pass
@@ -46,7 +57,7 @@ class AstPrinter(ExprVisitor):
     def parenthesize(self, name: str, *exprs: Expr) -> str:
         result: str = f"({name}"
         for expr in exprs:
-            result += " " + expr.accept(self)
+            result += " " + self.dispatch[expr.kind](expr)
         result += ")"
         return result
 
@@ -57,6 +68,9 @@ class AstPrinter(ExprVisitor):
 # Define a visitor class for our syntax tree classes that takes an expression,
 # converts it to RPN, and returns the resulting string.
 class RpnAstPrinter(ExprVisitor):
+    def __init__(self) -> None:
+        self.dispatch = expr_dispatch_table(self)
+
     def visit_super_expr(self, expr) -> typing.Any:
         pass
 
@@ -82,13 +96,13 @@ class RpnAstPrinter(ExprVisitor):
         pass
 
     def print_expr(self, expr: Expr):
-        return expr.accept(self)
+        return self.dispatch[expr.kind](expr)
 
     def visit_binary_expr(self, expr: Binary):
-        return f"{str(expr.left.accept(self))} {str(expr.right.accept(self))} {expr.operator.lexeme}"
+        return f"{str(self.print_expr(expr.left))} {str(self.print_expr(expr.right))} {expr.operator.lexeme}"
 
     def visit_grouping_expr(self, expr: Grouping):
-        return expr.expression.accept(self)
+        return self.print_expr(expr.expression)
 
     def visit_literal_expr(self, expr: Literal):
         return str(expr.value)
@@ -98,7 +112,7 @@ class RpnAstPrinter(ExprVisitor):
         if op == "-":
             # Can't use same symbol for unary and binary.
             op = "~"
-        return f"{str(expr.right.accept(self))} {op}"
+        return f"{str(self.print_expr(expr.right))} {op}"
 
 
 if __name__ == "__main__":
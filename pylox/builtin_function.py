@@ -13,6 +13,8 @@ class Clock(LoxCallable):
 
 class Input(LoxCallable):
     def call(self, interpreter, args: Any) -> Any:
+        # Whatever was printed before asking comes first.
+        interpreter.output.flush()
         return input()
 
     def arity(self) -> int:
@@ -0,0 +1,102 @@
+import typing
+from enum import IntEnum
+
+
+# The instruction set of the bytecode VM. Operands follow their opcode in the
+# code list, one int each; jump operands are absolute offsets.
+class OpCode(IntEnum):
+    CONSTANT = 0  # constant index
+    NIL = 1
+    TRUE = 2
+    FALSE = 3
+    POP = 4
+    GET_LOCAL = 5  # slot
+    SET_LOCAL = 6  # slot
+    GET_GLOBAL = 7  # name constant
+    DEFINE_GLOBAL = 8  # name constant
+    SET_GLOBAL = 9  # name constant
+    GET_UPVALUE = 10  # upvalue index
+    SET_UPVALUE = 11  # upvalue index
+    GET_PROPERTY = 12  # name constant
+    SET_PROPERTY = 13  # name constant
+    GET_SUPER = 14  # name constant
+    EQUAL = 15
+    NOT_EQUAL = 16
+    GREATER = 17
+    GREATER_EQUAL = 18
+    LESS = 19
+    LESS_EQUAL = 20
+    ADD = 21
+    SUBTRACT = 22
+    MULTIPLY = 23
+    DIVIDE = 24
+    NOT = 25
+    NEGATE = 26
+    PRINT = 27
+    JUMP = 28  # target
+    JUMP_IF_FALSE = 29  # target; leaves the condition on the stack
+    JUMP_IF_TRUE = 30  # target; leaves the condition on the stack
+    POP_JUMP_IF_FALSE = 31  # target
+    CALL = 32  # argument count
+    INVOKE = 33  # name constant, argument count
+    SUPER_INVOKE = 34  # name constant, argument count
+    CLOSURE = 35  # function constant, then (is_local, index) per upvalue
+    CLOSE_UPVALUE = 36
+    RETURN = 37
+    CLASS = 38  # name constant
+    INHERIT = 39
+    METHOD = 40  # name constant
+    BREAK_OUT = 41
+
+
+# Code, constants pool and line table of one function. `lines[i]` is the
+# source line of `code[i]`, operands included, so the line of the
+# instruction that was running is `lines[ip - 1]`.
+#
+# `break_targets` is for a `break` in a function declared in a loop, which
+# leaves the loop the function is called in: `BREAK_OUT` returns from frames
+# until it reaches a call listed there, by its return address, and goes on at
+# the end of the loop around the call, with the stack cut back to the
+# locals the loop had.
+class Chunk:
+    __slots__ = ("code", "constants", "lines", "constant_indexes", "break_targets")
+
+    def __init__(self) -> None:
+        self.code: typing.List[int] = []
+        self.constants: typing.List[typing.Any] = []
+        self.lines: typing.List[int] = []
+        # Equal constants share an entry. The type is part of the key, so
+        # that `1`, `1.0` and `true` don't.
+        self.constant_indexes: typing.Dict[typing.Tuple[type, typing.Any], int] = {}
+        # Return address of a call in a loop: (loop exit, locals on the stack).
+        self.break_targets: typing.Dict[int, typing.Tuple[int, int]] = {}
+
+    def write(self, value: int, line: int) -> int:
+        self.code.append(value)
+        self.lines.append(line)
+        return len(self.code) - 1
+
+    def add_constant(self, value: typing.Any) -> int:
+        key = (type(value), value)
+        index = self.constant_indexes.get(key)
+        if index is None:
+            index = len(self.constants)
+            self.constants.append(value)
+            self.constant_indexes[key] = index
+        return index
+
+
+# A compiled function: what the `CLOSURE` instruction turns into a closure.
+class BytecodeFunction:
+    __slots__ = ("name", "arity", "upvalue_count", "chunk")
+
+    def __init__(self, name: str, arity: int = 0) -> None:
+        self.name = name
+        self.arity = arity
+        self.upvalue_count = 0
+        self.chunk = Chunk()
+
+    def __str__(self) -> str:
+        if not self.name:
+            return "<script>"
+        return f"<fn {self.name}>"
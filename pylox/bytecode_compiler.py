@@ -0,0 +1,477 @@
+import typing
+
+import pylox.expr as expr_ast
+import pylox.stmt as stmt_ast
+from pylox.bytecode import BytecodeFunction, OpCode
+from pylox.expr import Expr
+from pylox.resolver import FunctionType
+from pylox.stmt import Stmt
+from pylox.tokens import Token, TokenType
+
+BINARY_OPS: typing.Dict[TokenType, OpCode] = {
+    TokenType.PLUS: OpCode.ADD,
+    TokenType.MINUS: OpCode.SUBTRACT,
+    TokenType.STAR: OpCode.MULTIPLY,
+    TokenType.SLASH: OpCode.DIVIDE,
+    TokenType.EQUAL_EQUAL: OpCode.EQUAL,
+    TokenType.BANG_EQUAL: OpCode.NOT_EQUAL,
+    TokenType.GREATER: OpCode.GREATER,
+    TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+    TokenType.LESS: OpCode.LESS,
+    TokenType.LESS_EQUAL: OpCode.LESS_EQUAL,
+}
+
+
+# A local variable: a stack slot of the function's frame.
+class Local:
+    __slots__ = ("name", "depth", "captured")
+
+    def __init__(self, name: str, depth: int) -> None:
+        self.name = name
+        self.depth = depth
+        # Captured locals are moved off the stack when they go out of scope.
+        self.captured = False
+
+
+# What the compiler knows about the function it is compiling.
+class FunctionState:
+    def __init__(
+        self,
+        enclosing: typing.Optional["FunctionState"],
+        function: BytecodeFunction,
+        kind: FunctionType,
+    ) -> None:
+        self.enclosing = enclosing
+        self.function = function
+        self.kind = kind
+        # Slot 0 holds the function being called, or `this` in methods.
+        in_method = kind in (FunctionType.METHOD, FunctionType.INITIALIZER)
+        self.locals = [Local("this" if in_method else "", 0)]
+        # (is_local, index) per captured variable: a slot of the enclosing
+        # function, or one of its own upvalues.
+        self.upvalues: typing.List[typing.Tuple[bool, int]] = []
+        self.scope_depth = 0
+        # Per enclosing loop: its scope depth, the jumps `break` made and the
+        # calls in it, as (return address, locals on the stack).
+        self.loops: typing.List[
+            typing.Tuple[int, typing.List[int], typing.List[typing.Tuple[int, int]]]
+        ] = []
+
+
+# Compiles a resolved program into bytecode for `VM`, one `BytecodeFunction`
+# per Lox function. The resolver already reported the scoping errors, and its
+# results say which variables are globals; locals become stack slots and the
+# variables of enclosing functions upvalues, as in clox.
+class BytecodeCompiler(expr_ast.ExprVisitor, stmt_ast.StmtVisitor):
+    def __init__(self) -> None:
+        self.dispatch = expr_ast.expr_dispatch_table(
+            self
+        ) + stmt_ast.stmt_dispatch_table(self)
+        self.state = FunctionState(None, BytecodeFunction(""), FunctionType.NONE)
+        # Instructions are written with this line; nodes that can fail at
+        # runtime set it to the line of their token first.
+        self.line = 0
+
+    def compile(self, statements: typing.List[Stmt]) -> BytecodeFunction:
+        self.state = FunctionState(None, BytecodeFunction(""), FunctionType.NONE)
+        self.line = 1
+        for statement in statements:
+            self.dispatch[statement.kind](statement)
+        self.emit_return()
+        return self.state.function
+
+    # A script returning the value of `expr`, for the REPL.
+    def compile_expr(self, expr: Expr) -> BytecodeFunction:
+        self.state = FunctionState(None, BytecodeFunction(""), FunctionType.NONE)
+        self.line = 1
+        self.dispatch[expr.kind](expr)
+        self.emit(OpCode.RETURN)
+        return self.state.function
+
+    def emit(self, op: OpCode, *operands: int) -> None:
+        chunk = self.state.function.chunk
+        chunk.write(op.value, self.line)
+        for operand in operands:
+            chunk.write(operand, self.line)
+
+    # Returns the offset of the jump target, for `patch_jump`.
+    def emit_jump(self, op: OpCode) -> int:
+        self.emit(op, -1)
+        return len(self.state.function.chunk.code) - 1
+
+    def patch_jump(self, offset: int) -> None:
+        code = self.state.function.chunk.code
+        code[offset] = len(code)
+
+    def emit_return(self) -> None:
+        if self.state.kind is FunctionType.INITIALIZER:
+            self.emit(OpCode.GET_LOCAL, 0)
+        else:
+            self.emit(OpCode.NIL)
+        self.emit(OpCode.RETURN)
+
+    def constant(self, value: typing.Any) -> int:
+        return self.state.function.chunk.add_constant(value)
+
+    def begin_scope(self) -> None:
+        self.state.scope_depth += 1
+
+    def end_scope(self) -> None:
+        state = self.state
+        state.scope_depth -= 1
+        self.discard_locals(state.scope_depth)
+        while state.locals and state.locals[-1].depth > state.scope_depth:
+            state.locals.pop()
+
+    # Takes the locals deeper than `depth` off the stack, without forgetting
+    # them: `break` leaves their scopes at runtime only.
+    def discard_locals(self, depth: int) -> None:
+        for local in reversed(self.state.locals):
+            if local.depth <= depth:
+                break
+            self.emit(OpCode.CLOSE_UPVALUE if local.captured else OpCode.POP)
+
+    def add_local(self, name: str) -> int:
+        self.state.locals.append(Local(name, self.state.scope_depth))
+        return len(self.state.locals) - 1
+
+    # Stores the value on top of the stack in a new variable.
+    def define_variable(self, name: Token) -> None:
+        if self.state.scope_depth == 0:
+            self.emit(OpCode.DEFINE_GLOBAL, self.constant(name.lexeme))
+        else:
+            self.add_local(name.lexeme)
+
+    @staticmethod
+    def resolve_local(state: FunctionState, name: str) -> int:
+        for index in range(len(state.locals) - 1, -1, -1):
+            if state.locals[index].name == name:
+                return index
+        return -1
+
+    def resolve_upvalue(self, state: FunctionState, name: str) -> int:
+        if state.enclosing is None:
+            return -1
+        local = self.resolve_local(state.enclosing, name)
+        if local != -1:
+            state.enclosing.locals[local].captured = True
+            return self.add_upvalue(state, True, local)
+        upvalue = self.resolve_upvalue(state.enclosing, name)
+        if upvalue != -1:
+            return self.add_upvalue(state, False, upvalue)
+        return -1
+
+    @staticmethod
+    def add_upvalue(state: FunctionState, is_local: bool, index: int) -> int:
+        if (is_local, index) in state.upvalues:
+            return state.upvalues.index((is_local, index))
+        state.upvalues.append((is_local, index))
+        state.function.upvalue_count = len(state.upvalues)
+        return len(state.upvalues) - 1
+
+    # The get and set instructions for a variable, with their operand. The
+    # resolver left globals unresolved; the rest is found by name, which
+    # gives the same variable since the resolver went through the same scopes.
+    def variable(
+        self, name: str, resolved: typing.Optional[typing.Tuple[int, int]]
+    ) -> typing.Tuple[OpCode, OpCode, int]:
+        if resolved is not None:
+            slot = self.resolve_local(self.state, name)
+            if slot != -1:
+                return OpCode.GET_LOCAL, OpCode.SET_LOCAL, slot
+            upvalue = self.resolve_upvalue(self.state, name)
+            if upvalue != -1:
+                return OpCode.GET_UPVALUE, OpCode.SET_UPVALUE, upvalue
+        return OpCode.GET_GLOBAL, OpCode.SET_GLOBAL, self.constant(name)
+
+    def load_variable(
+        self, name: Token, resolved: typing.Optional[typing.Tuple[int, int]]
+    ) -> None:
+        get_op, _, operand = self.variable(name.lexeme, resolved)
+        self.line = name.line
+        self.emit(get_op, operand)
+
+    def function(self, stmt: stmt_ast.Function, kind: FunctionType) -> None:
+        function = BytecodeFunction(stmt.name.lexeme, len(stmt.params))
+        self.state = FunctionState(self.state, function, kind)
+        self.line = stmt.name.line
+        self.begin_scope()
+        for param in stmt.params:
+            self.add_local(param.lexeme)
+        for statement in stmt.body:
+            self.dispatch[statement.kind](statement)
+        self.emit_return()
+
+        state = self.state
+        self.state = state.enclosing  # type: ignore[assignment]
+        self.line = stmt.name.line
+        operands = [self.constant(function)]
+        for is_local, index in state.upvalues:
+            operands += [int(is_local), index]
+        self.emit(OpCode.CLOSURE, *operands)
+
+    def visit_literal_expr(self, expr: expr_ast.Literal) -> typing.Any:
+        if expr.value is None:
+            self.emit(OpCode.NIL)
+        elif expr.value is True:
+            self.emit(OpCode.TRUE)
+        elif expr.value is False:
+            self.emit(OpCode.FALSE)
+        else:
+            self.emit(OpCode.CONSTANT, self.constant(expr.value))
+
+    def visit_grouping_expr(self, expr: expr_ast.Grouping) -> typing.Any:
+        self.dispatch[expr.expression.kind](expr.expression)
+
+    def visit_unary_expr(self, expr: expr_ast.Unary) -> typing.Any:
+        self.dispatch[expr.right.kind](expr.right)
+        self.line = expr.operator.line
+        if expr.operator.token_type == TokenType.MINUS:
+            self.emit(OpCode.NEGATE)
+        else:
+            self.emit(OpCode.NOT)
+
+    def visit_binary_expr(self, expr: expr_ast.Binary) -> typing.Any:
+        self.dispatch[expr.left.kind](expr.left)
+        self.dispatch[expr.right.kind](expr.right)
+        self.line = expr.operator.line
+        self.emit(BINARY_OPS[expr.operator.token_type])
+
+    # The left operand stays on the stack as the result if it decides.
+    def visit_logical_expr(self, expr: expr_ast.Logical) -> typing.Any:
+        self.dispatch[expr.left.kind](expr.left)
+        if expr.operator.token_type == TokenType.OR:
+            end = self.emit_jump(OpCode.JUMP_IF_TRUE)
+        else:
+            end = self.emit_jump(OpCode.JUMP_IF_FALSE)
+        self.emit(OpCode.POP)
+        self.dispatch[expr.right.kind](expr.right)
+        self.patch_jump(end)
+
+    def visit_variable_expr(self, expr: expr_ast.Variable) -> typing.Any:
+        self.load_variable(expr.name, expr.resolved)
+
+    def visit_assign_expr(self, expr: expr_ast.Assign) -> typing.Any:
+        self.dispatch[expr.value.kind](expr.value)
+        _, set_op, operand = self.variable(expr.name.lexeme, expr.resolved)
+        self.line = expr.name.line
+        self.emit(set_op, operand)
+
+    def visit_this_expr(self, expr: expr_ast.This) -> typing.Any:
+        self.load_variable(expr.keyword, expr.resolved)
+
+    def visit_super_expr(self, expr: expr_ast.Super) -> typing.Any:
+        self.load_variable(
+            Token(TokenType.THIS, "this", None, expr.keyword.line), expr.resolved
+        )
+        self.load_variable(expr.keyword, expr.resolved)
+        self.line = expr.method.line
+        self.emit(OpCode.GET_SUPER, self.constant(expr.method.lexeme))
+
+    # Method calls skip the bound method: `INVOKE` and `SUPER_INVOKE` look the
+    # method up and call it in one go. They report lookup and call errors on
+    # the same line, so calls spread over several lines don't use them. The
+    # lookup comes after the arguments, so they must be quiet.
+    def visit_call_expr(self, expr: expr_ast.Call) -> typing.Any:
+        callee = expr.callee
+        count = len(expr.arguments)
+        if (
+            type(callee) is expr_ast.Get
+            and callee.name.line == expr.paren.line
+            and all(map(self.quiet, expr.arguments))
+        ):
+            self.dispatch[callee.obj.kind](callee.obj)
+            self.arguments(expr.arguments)
+            self.line = expr.paren.line
+            self.emit_call(OpCode.INVOKE, self.constant(callee.name.lexeme), count)
+        elif (
+            type(callee) is expr_ast.Super
+            and callee.method.line == expr.paren.line
+            and all(map(self.quiet, expr.arguments))
+        ):
+            self.load_variable(
+                Token(TokenType.THIS, "this", None, callee.keyword.line),
+                callee.resolved,
+            )
+            self.arguments(expr.arguments)
+            self.load_variable(callee.keyword, callee.resolved)
+            self.line = expr.paren.line
+            self.emit_call(
+                OpCode.SUPER_INVOKE, self.constant(callee.method.lexeme), count
+            )
+        else:
+            self.dispatch[callee.kind](callee)
+            self.arguments(expr.arguments)
+            self.line = expr.paren.line
+            self.emit_call(OpCode.CALL, count)
+
+    # A call in a loop is where a `break` out of the callee lands.
+    def emit_call(self, op: OpCode, *operands: int) -> None:
+        self.emit(op, *operands)
+        state = self.state
+        if state.loops:
+            depth, _, calls = state.loops[-1]
+            height = sum(1 for local in state.locals if local.depth <= depth)
+            calls.append((len(state.function.chunk.code), height))
+
+    # Whether evaluating `expr` can neither fail nor have side effects, so it
+    # can't be told whether it ran before or after a method lookup.
+    def quiet(self, expr: Expr) -> bool:
+        kind = type(expr)
+        if kind is expr_ast.Grouping:
+            return self.quiet(expr.expression)  # type: ignore[attr-defined]
+        if kind is expr_ast.Variable or kind is expr_ast.This:
+            return expr.resolved is not None  # type: ignore[attr-defined]
+        return kind is expr_ast.Literal
+
+    def arguments(self, arguments: typing.List[Expr]) -> None:
+        for argument in arguments:
+            self.dispatch[argument.kind](argument)
+
+    def visit_get_expr(self, expr: expr_ast.Get) -> typing.Any:
+        self.dispatch[expr.obj.kind](expr.obj)
+        self.line = expr.name.line
+        self.emit(OpCode.GET_PROPERTY, self.constant(expr.name.lexeme))
+
+    def visit_set_expr(self, expr: expr_ast.Set) -> typing.Any:
+        self.dispatch[expr.obj.kind](expr.obj)
+        self.dispatch[expr.value.kind](expr.value)
+        self.line = expr.name.line
+        self.emit(OpCode.SET_PROPERTY, self.constant(expr.name.lexeme))
+
+    def visit_expression_stmt(self, stmt: stmt_ast.Expression) -> typing.Any:
+        self.dispatch[stmt.expression.kind](stmt.expression)
+        self.emit(OpCode.POP)
+
+    def visit_print_stmt(self, stmt: stmt_ast.Print) -> typing.Any:
+        self.dispatch[stmt.expression.kind](stmt.expression)
+        self.emit(OpCode.PRINT)
+
+    def visit_var_stmt(self, stmt: stmt_ast.Var) -> typing.Any:
+        if stmt.initializer is not None:
+            self.dispatch[stmt.initializer.kind](stmt.initializer)
+        else:
+            self.emit(OpCode.NIL)
+        self.line = stmt.name.line
+        self.define_variable(stmt.name)
+
+    def visit_block_stmt(self, stmt: stmt_ast.Block) -> typing.Any:
+        self.begin_scope()
+        for statement in stmt.statements:
+            self.dispatch[statement.kind](statement)
+        self.end_scope()
+
+    def visit_if_stmt(self, stmt: stmt_ast.If) -> typing.Any:
+        self.dispatch[stmt.condition.kind](stmt.condition)
+        otherwise = self.emit_jump(OpCode.POP_JUMP_IF_FALSE)
+        self.dispatch[stmt.then_branch.kind](stmt.then_branch)
+        if stmt.else_branch is None:
+            self.patch_jump(otherwise)
+            return
+        end = self.emit_jump(OpCode.JUMP)
+        self.patch_jump(otherwise)
+        self.dispatch[stmt.else_branch.kind](stmt.else_branch)
+        self.patch_jump(end)
+
+    def visit_while_stmt(self, stmt: stmt_ast.While) -> typing.Any:
+        start = len(self.state.function.chunk.code)
+        self.dispatch[stmt.condition.kind](stmt.condition)
+        exit_jump = self.emit_jump(OpCode.POP_JUMP_IF_FALSE)
+        self.loop_body(stmt.body)
+        self.emit(OpCode.JUMP, start)
+        self.patch_jump(exit_jump)
+
+    # The loop variable is one local for the whole loop, as in the tree
+    # walker; a block body gets its locals afresh on every iteration.
+    def visit_for_stmt(self, stmt: stmt_ast.For) -> typing.Any:
+        self.begin_scope()
+        if stmt.initializer is not None:
+            self.dispatch[stmt.initializer.kind](stmt.initializer)
+        start = len(self.state.function.chunk.code)
+        exit_jump = None
+        if stmt.condition is not None:
+            self.dispatch[stmt.condition.kind](stmt.condition)
+            exit_jump = self.emit_jump(OpCode.POP_JUMP_IF_FALSE)
+        self.loop_body(stmt.body, stmt.increment)
+        self.emit(OpCode.JUMP, start)
+        if exit_jump is not None:
+            self.patch_jump(exit_jump)
+        self.end_scope()
+
+    # Compiles the body of a loop and points its `break`s past it.
+    def loop_body(self, body: Stmt, increment: typing.Optional[Expr] = None) -> None:
+        breaks: typing.List[int] = []
+        calls: typing.List[typing.Tuple[int, int]] = []
+        self.state.loops.append((self.state.scope_depth, breaks, calls))
+        self.dispatch[body.kind](body)
+        self.state.loops.pop()
+        if increment is not None:
+            self.dispatch[increment.kind](increment)
+            self.emit(OpCode.POP)
+        # The backward jump comes next; breaks go past it.
+        chunk = self.state.function.chunk
+        code = chunk.code
+        for offset in breaks:
+            code[offset] = len(code) + 2
+        for address, height in calls:
+            chunk.break_targets[address] = (len(code) + 2, height)
+
+    # Outside any loop of its own function, `break` is in a function declared
+    # in a loop and leaves the loop the call is in.
+    def visit_break_stmt(self, stmt: stmt_ast.Break) -> typing.Any:
+        if not self.state.loops:
+            self.emit(OpCode.BREAK_OUT)
+            return
+        depth, breaks, _ = self.state.loops[-1]
+        self.discard_locals(depth)
+        breaks.append(self.emit_jump(OpCode.JUMP))
+
+    def visit_return_stmt(self, stmt: stmt_ast.Return) -> typing.Any:
+        self.line = stmt.keyword.line
+        if stmt.value is None:
+            self.emit_return()
+            return
+        self.dispatch[stmt.value.kind](stmt.value)
+        self.emit(OpCode.RETURN)
+
+    # Locals are defined before the body is compiled, so that the function
+    # can call itself through an upvalue.
+    def visit_function_stmt(self, stmt: stmt_ast.Function) -> typing.Any:
+        if self.state.scope_depth > 0:
+            self.add_local(stmt.name.lexeme)
+        self.function(stmt, FunctionType.FUNCTION)
+        if self.state.scope_depth == 0:
+            self.line = stmt.name.line
+            self.emit(OpCode.DEFINE_GLOBAL, self.constant(stmt.name.lexeme))
+
+    # The class stays on the stack while its methods are added: a local one
+    # in its own slot, which methods can capture, and a global one in a slot
+    # nobody can name until `DEFINE_GLOBAL` takes it.
+    def visit_class_stmt(self, stmt: stmt_ast.Class) -> typing.Any:
+        name = self.constant(stmt.name.lexeme)
+        is_global = self.state.scope_depth == 0
+        self.line = stmt.name.line
+        self.emit(OpCode.CLASS, name)
+        slot = self.add_local("" if is_global else stmt.name.lexeme)
+
+        if stmt.superclass is not None:
+            self.visit_variable_expr(stmt.superclass)
+            self.begin_scope()
+            self.add_local("super")
+            self.emit(OpCode.INHERIT)
+
+        self.emit(OpCode.GET_LOCAL, slot)
+        for method in stmt.methods:
+            kind = FunctionType.METHOD
+            if method.name.lexeme == "init":
+                kind = FunctionType.INITIALIZER
+            self.function(method, kind)
+            self.emit(OpCode.METHOD, self.constant(method.name.lexeme))
+        self.emit(OpCode.POP)
+
+        if stmt.superclass is not None:
+            self.end_scope()
+        if is_global:
+            self.state.locals.pop()
+            self.line = stmt.name.line
+            self.emit(OpCode.DEFINE_GLOBAL, name)
@@ -0,0 +1,311 @@
+import hashlib
+import inspect
+import itertools
+import marshal
+import os
+import tempfile
+import typing
+import zlib
+from array import array
+from pathlib import Path
+
+import pylox
+import pylox.expr as expr_ast
+import pylox.stmt as stmt_ast
+from pylox.expr import Expr
+from pylox.stmt import Stmt
+from pylox.tokens import Token, TokenType
+
+CACHE_DIR = "__loxcache__"
+# Not valid UTF-8, so a compiled program can never be mistaken for a script.
+MAGIC = b"\x89LOX"
+# Bump when the encoding below changes; AST changes are picked up by the schema.
+FORMAT_VERSION = 5
+
+
+# Every node is stored as `(kind, *fields)`, with the fields in the order of the
+# generated constructor. Fields declared as `object` (`Literal.value`) hold raw
+# values, all others hold nodes, lists, tokens or None.
+NODE_CLASSES: typing.List[type] = [*expr_ast.EXPR_NODES, *stmt_ast.STMT_NODES]
+NODE_FIELDS: typing.Dict[type, typing.Tuple[typing.Tuple[str, bool], ...]] = {
+    cls: tuple(
+        (name, param.annotation is object)
+        for name, param in inspect.signature(cls.__init__).parameters.items()
+        if name != "self"
+    )
+    for cls in NODE_CLASSES
+}
+# The fields the resolver fills in: every slot that is neither a constructor
+# parameter nor one of the engines' runtime fields. They are stored apart from
+# the tree, for the nodes that have them.
+RESOLVED_FIELDS: typing.Dict[type, typing.Tuple[str, ...]] = {
+    cls: tuple(
+        name
+        for name in cls.__slots__
+        if name not in {field for field, _ in NODE_FIELDS[cls]}
+        and name not in cls.runtime_fields
+    )
+    for cls in NODE_CLASSES
+}
+
+_SCHEMA = repr(
+    [(cls.__name__, NODE_FIELDS[cls], RESOLVED_FIELDS[cls]) for cls in NODE_CLASSES]
+)
+# Identifies everything a cached file depends on besides the source itself.
+BUILD_TAG: bytes = hashlib.sha256(
+    f"{pylox.__version__}:{FORMAT_VERSION}:{marshal.version}:{_SCHEMA}".encode()
+).digest()[:8]
+
+# MAGIC, BUILD_TAG, sha256 of the source, crc32 of the payload
+HEADER_SIZE = len(MAGIC) + len(BUILD_TAG) + hashlib.sha256().digest_size + 4
+
+
+class CorruptProgramError(Exception):
+    pass
+
+
+# Raised for files written by a different pylox build.
+class IncompatibleProgramError(Exception):
+    pass
+
+
+# Token lines hardly ever jump, so they are stored as deltas, one byte each
+# unless some delta does not fit.
+def encode_lines(lines: typing.List[int]) -> typing.Tuple[str, bytes]:
+    deltas = [line - previous for previous, line in zip([0] + lines, lines)]
+    typecode = "b" if all(-128 <= delta < 128 for delta in deltas) else "q"
+    return typecode, array(typecode, deltas).tobytes()
+
+
+def decode_lines(typecode: str, data: bytes) -> typing.List[int]:
+    deltas = array(typecode)
+    deltas.frombytes(data)
+    return list(itertools.accumulate(deltas))
+
+
+class _Encoder:
+    def __init__(self) -> None:
+        self.token_types = bytearray()
+        self.lexemes: typing.List[str] = []
+        self.literals: typing.List[typing.Any] = []
+        self.lines: typing.List[int] = []
+        # Equal lexemes are stored once; marshal writes references for repeats.
+        self.strings: typing.Dict[str, str] = {}
+        self.token_indexes: typing.Dict[int, int] = {}
+        self.node_count = 0
+        # (preorder index of node, *resolved fields) for every node that
+        # the resolver touched
+        self.resolved: typing.List[tuple] = []
+
+    def encode(self, value: typing.Any) -> typing.Any:
+        if value is None:
+            return None
+        if isinstance(value, list):
+            return [self.encode(item) for item in value]
+        if isinstance(value, (Expr, Stmt)):
+            return self.encode_node(value)
+        return self.encode_token(value)
+
+    def encode_node(self, node: typing.Union[Expr, Stmt]) -> tuple:
+        index = self.node_count
+        self.node_count += 1
+        cls = type(node)
+        resolved = [getattr(node, name) for name in RESOLVED_FIELDS[cls]]
+        if any(value is not None for value in resolved):
+            self.resolved.append((index, *resolved))
+
+        fields = [
+            getattr(node, name) if raw else self.encode(getattr(node, name))
+            for name, raw in NODE_FIELDS[cls]
+        ]
+        return (node.kind, *fields)
+
+    def encode_token(self, token: Token) -> int:
+        index = self.token_indexes.get(id(token))
+        if index is None:
+            index = len(self.lexemes)
+            self.token_indexes[id(token)] = index
+            self.token_types.append(token.token_type.value)
+            self.lexemes.append(self.strings.setdefault(token.lexeme, token.lexeme))
+            self.literals.append(token.literal)
+            self.lines.append(token.line)
+        return index
+
+
+class _Decoder:
+    def __init__(self, tokens: typing.List[Token]) -> None:
+        self.tokens = tokens
+        self.nodes: typing.List[typing.Any] = []
+
+    def decode(self, value: typing.Any) -> typing.Any:
+        if value is None:
+            return None
+        if isinstance(value, list):
+            return [self.decode(item) for item in value]
+        if isinstance(value, tuple):
+            return self.decode_node(value)
+        return self.tokens[value]
+
+    def decode_node(self, value: tuple) -> typing.Any:
+        index = len(self.nodes)
+        self.nodes.append(None)
+        cls = NODE_CLASSES[value[0]]
+        args = [
+            field if raw else self.decode(field)
+            for field, (_, raw) in zip(value[1:], NODE_FIELDS[cls], strict=True)
+        ]
+        node = cls(*args)
+        self.nodes[index] = node
+        return node
+
+
+# Serializes a parsed and resolved program. Tokens go into a column-wise table
+# and nodes refer to them by index.
+def dump_program(statements: typing.List[Stmt]) -> bytes:
+    encoder = _Encoder()
+    tree = encoder.encode(statements)
+    return marshal.dumps(
+        (
+            bytes(encoder.token_types),
+            encoder.lexemes,
+            encoder.literals,
+            encode_lines(encoder.lines),
+            tree,
+            encoder.resolved,
+        )
+    )
+
+
+# Inverse of `dump_program`: the statements come back resolved.
+def load_program(payload: bytes) -> typing.List[Stmt]:
+    try:
+        token_types, lexemes, literals, line_table, tree, resolved = marshal.loads(
+            payload
+        )
+        lines = decode_lines(*line_table)
+        tokens = [
+            Token(TokenType(token_type), lexeme, literal, line)
+            for token_type, lexeme, literal, line in zip(
+                token_types, lexemes, literals, lines, strict=True
+            )
+        ]
+        decoder = _Decoder(tokens)
+        statements = decoder.decode(tree)
+        for index, *values in resolved:
+            node = decoder.nodes[index]
+            for name, value in zip(RESOLVED_FIELDS[type(node)], values, strict=True):
+                setattr(node, name, value)
+    except (
+        EOFError,
+        ValueError,
+        TypeError,
+        IndexError,
+        KeyError,
+        RecursionError,
+    ) as err:
+        raise CorruptProgramError(str(err)) from err
+    return statements
+
+
+# Frames a payload as it is written to disk: MAGIC, BUILD_TAG, the sha256 of
+# the source it was compiled from, the crc32 of the payload and the payload.
+def pack_program(digest: bytes, payload: bytes) -> bytes:
+    checksum = zlib.crc32(payload).to_bytes(4, "little")
+    return MAGIC + BUILD_TAG + digest + checksum + payload
+
+
+# Inverse of `pack_program`: returns the source digest and the payload.
+def unpack_program(data: bytes) -> typing.Tuple[bytes, bytes]:
+    if data[: len(MAGIC)] != MAGIC:
+        raise CorruptProgramError("Not a compiled Lox program.")
+    if data[len(MAGIC) : len(MAGIC) + len(BUILD_TAG)] != BUILD_TAG:
+        raise IncompatibleProgramError(
+            f"Compiled by a different version of pylox than {pylox.__version__}."
+        )
+    digest = data[len(MAGIC) + len(BUILD_TAG) : HEADER_SIZE - 4]
+    payload = data[HEADER_SIZE:]
+    if data[HEADER_SIZE - 4 : HEADER_SIZE] != zlib.crc32(payload).to_bytes(4, "little"):
+        raise CorruptProgramError("Checksum mismatch.")
+    return digest, payload
+
+
+def is_compiled_program(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+# Writes to a temporary file first so readers never see half a file.
+def write_atomically(path: typing.Union[str, Path], data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=Path(path).parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+# `__pycache__` for Lox: keeps the resolved AST of every script it runs in a
+# `__loxcache__` directory next to the script, keyed by the source's hash.
+class ProgramCache:
+    def __init__(self, report: typing.Optional[typing.Callable[[str], None]] = None):
+        self.report = report
+        self.hits: int = 0
+        self.misses: int = 0
+
+    @staticmethod
+    def cache_path(script: str) -> Path:
+        path = Path(script)
+        return path.parent / CACHE_DIR / f"{path.name}.pylox-{pylox.__version__}.loxc"
+
+    @staticmethod
+    def source_digest(script: str) -> bytes:
+        with open(script, "rb") as f:
+            return hashlib.file_digest(f, "sha256").digest()
+
+    def load(self, script: str, digest: bytes) -> typing.Optional[typing.List[Stmt]]:
+        path = self.cache_path(script)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return self.miss(path, "missing")
+
+        try:
+            source_digest, payload = unpack_program(data)
+            if source_digest != digest:
+                return self.miss(path, "stale")
+            statements = load_program(payload)
+        except IncompatibleProgramError:
+            return self.miss(path, "stale")
+        except CorruptProgramError:
+            return self.miss(path, "corrupt")
+
+        self.hits += 1
+        self._report(f"cache hit: {path}")
+        return statements
+
+    def store(self, script: str, digest: bytes, statements: typing.List[Stmt]) -> None:
+        path = self.cache_path(script)
+        try:
+            payload = dump_program(statements)
+        except RecursionError:
+            self._report(f"cache skipped, program nested too deeply: {path}")
+            return
+        try:
+            path.parent.mkdir(exist_ok=True)
+            write_atomically(path, pack_program(digest, payload))
+        except OSError:
+            # A read-only location just means no caching, like for `.pyc` files.
+            self._report(f"cache not writable: {path}")
+            return
+        self._report(f"cache written: {path}")
+
+    def miss(self, path: Path, reason: str) -> None:
+        self.misses += 1
+        self._report(f"cache miss ({reason}): {path}")
+        return None
+
+    def _report(self, message: str) -> None:
+        if self.report is not None:
+            self.report(message)
@@ -1,25 +1,132 @@
 import sys
 import typing as t
+from enum import Enum
 from pathlib import Path
 
+from pylox.adaptive import AdaptiveInterpreter
+from pylox.cache import (
+    CorruptProgramError,
+    IncompatibleProgramError,
+    ProgramCache,
+    dump_program,
+    is_compiled_program,
+    load_program,
+    pack_program,
+    unpack_program,
+)
+from pylox.bytecode_compiler import BytecodeCompiler
+from pylox.closure_compiler import ClosureCompiler
+from pylox.disassembler import disassemble
 from pylox.expr import Expr
 from pylox.resolver import Resolver
 from pylox.scanner import Scanner
+from pylox.regex_scanner import CompactScanner, RegexScanner, StreamScanner
 from pylox.error import LoxException, LoxRuntimeError, LoxParseError, LoxSyntaxError
 from pylox.interpreter import Interpreter
+from pylox.optimizer import Optimizer
+from pylox.output import FlushPolicy, OutputSink, StreamSink
 from pylox.parser import Parser
+from pylox.stmt import Stmt
+from pylox.pratt_parser import PrattParser
+from pylox.transpiler import PythonEngine
+from pylox.vm import MAX_FRAMES, VM
 import typing
 import typer
+from typer.core import TyperGroup
 from rich import print
 from rich.prompt import Prompt
 
-pylox_cli = typer.Typer()
+
+# `pylox script.lox` keeps working next to the subcommands: anything that is
+# not a subcommand name goes to `run`.
+class DefaultCommandGroup(TyperGroup):
+    default_command = "run"
+
+    def parse_args(self, ctx, args):
+        own_options = {opt for param in self.get_params(ctx) for opt in param.opts}
+        if not args or (args[0] not in self.commands and args[0] not in own_options):
+            args = [self.default_command, *args]
+        return super().parse_args(ctx, args)
+
+
+pylox_cli = typer.Typer(cls=DefaultCommandGroup)
 Prompt.prompt_suffix = ""  # Get rid of the default colon suffix
 
 
+class ScannerKind(str, Enum):
+    CLASSIC = "classic"
+    REGEX = "regex"
+    COMPACT = "compact"
+
+
+SCANNERS: t.Dict[ScannerKind, t.Callable] = {
+    ScannerKind.CLASSIC: Scanner,
+    ScannerKind.REGEX: RegexScanner,
+    ScannerKind.COMPACT: CompactScanner,
+}
+
+
+class ParserKind(str, Enum):
+    DESCENT = "descent"
+    PRATT = "pratt"
+
+
+PARSERS: t.Dict[ParserKind, t.Callable] = {
+    ParserKind.DESCENT: Parser,
+    ParserKind.PRATT: PrattParser,
+}
+
+
+class EngineKind(str, Enum):
+    TREE = "tree"
+    ADAPTIVE = "adaptive"
+    CLOSURE = "closure"
+    VM = "vm"
+    PYTHON = "python"
+
+
+# An engine runs resolved statements with `interpret()` and REPL expressions
+# with `interpret_expr()`, sharing the globals of the given interpreter. The
+# tree walker is the interpreter itself. Engines with a `report()` describe
+# what their runtime machinery did, one line per item.
+ENGINES: t.Dict[EngineKind, t.Callable[[Interpreter], t.Any]] = {
+    EngineKind.TREE: lambda interpreter: interpreter,
+    EngineKind.ADAPTIVE: AdaptiveInterpreter,
+    EngineKind.CLOSURE: ClosureCompiler,
+    EngineKind.VM: VM,
+    EngineKind.PYTHON: PythonEngine,
+}
+
+
 class Lox:
-    def __init__(self) -> None:
-        self.interpreter = Interpreter()
+    def __init__(
+        self,
+        scanner: ScannerKind = ScannerKind.CLASSIC,
+        stream: bool = False,
+        parser: ParserKind = ParserKind.DESCENT,
+        cache: t.Optional[ProgramCache] = None,
+        opt_level: int = 0,
+        report: t.Optional[t.Callable[[str], None]] = None,
+        scope_report: t.Optional[t.Callable[[str], None]] = None,
+        engine: EngineKind = EngineKind.TREE,
+        engine_report: t.Optional[t.Callable[[str], None]] = None,
+        max_depth: t.Optional[int] = None,
+        output: t.Optional[OutputSink] = None,
+    ) -> None:
+        self.interpreter = Interpreter(output)
+        self.engine = ENGINES[engine](self.interpreter)
+        # Only the VM keeps its frames off the Python stack; the other engines
+        # overflow at the Python recursion limit.
+        if max_depth is not None and engine == EngineKind.VM:
+            self.engine.max_depth = max_depth
+        self.scanner = SCANNERS[scanner]
+        self.stream = stream
+        self.parser = PARSERS[parser]
+        self.cache = cache
+        self.opt_level = opt_level
+        self.report = report
+        self.scope_report = scope_report
+        self.engine_report = engine_report
         self.had_error: bool = False
         self.had_runtime_error: bool = False
 
@@ -38,31 +145,43 @@ class Lox:
             line = Prompt.ask("> ")
             if line == "exit":
                 break
-            try:
-                tokens = Scanner(line).scan_tokens()
-                ast = Parser(tokens, self.report_error).parse_repl()
-                if self.had_error:
-                    continue
-
-                if isinstance(ast, Expr):
-                    print(self.interpreter.interpret_expr(ast))
-                elif isinstance(ast, list):
-                    resolver = Resolver(self.interpreter)
-                    resolver.resolve(ast)
-                    self.interpreter.interpret(ast)
-            except (LoxSyntaxError, LoxParseError) as e:
-                self.report_error(e)
-            except LoxRuntimeError as e:
-                self.report_runtime_error(e)
+            self.run_line(line)
 
             # Reset these so we can stay in the REPL unhindered
             self.had_error = False
             self.had_runtime_error = False
 
+    # Runs one line of REPL input; nothing but the globals it defines
+    # outlives it.
+    def run_line(self, line: str) -> None:
+        try:
+            tokens = self.scanner(line).scan_tokens()
+            ast = self.parser(tokens, self.report_error).parse_repl()
+            if self.had_error:
+                return
+
+            if isinstance(ast, Expr):
+                # Through the sink rather than rich, which would take brackets
+                # in strings for markup.
+                self.interpreter.output.write_line(self.engine.interpret_expr(ast))
+                self.interpreter.output.flush()
+            elif isinstance(ast, list):
+                resolver = Resolver(self.interpreter)
+                resolver.resolve(ast)
+                self.engine.interpret(self.optimize(ast))
+        except (LoxSyntaxError, LoxParseError) as e:
+            self.report_error(e)
+        except LoxRuntimeError as e:
+            self.report_runtime_error(e)
+
     def run_file(self, filename: str) -> None:
-        with open(filename, encoding="utf-8") as f:
-            content: str = f.read()
-        self.run(content)
+        if is_compiled_program(filename):
+            statements = self.load_compiled(filename)
+        else:
+            statements = self.load_source(filename)
+
+        if statements is not None:
+            self.execute(self.optimize(statements))
 
         if self.had_error:
             sys.exit(65)
@@ -70,20 +189,126 @@ class Lox:
         if self.had_runtime_error:
             sys.exit(70)
 
+    def load_source(self, filename: str) -> t.Optional[t.List[Stmt]]:
+        digest = None
+        statements = None
+        if self.cache is not None:
+            digest = self.cache.source_digest(filename)
+            statements = self.cache.load(filename, digest)
+
+        if statements is None:
+            statements = self.front_end(self.file_scanner(filename))
+            if statements is not None and self.cache is not None:
+                self.cache.store(filename, digest, statements)
+        return statements
+
+    # Reads a program written by `compile_file`; no scanning, parsing or
+    # resolving happens here.
+    def load_compiled(self, filename: str) -> t.Optional[t.List[Stmt]]:
+        with open(filename, "rb") as f:
+            data = f.read()
+        try:
+            _, payload = unpack_program(data)
+            statements = load_program(payload)
+        except (CorruptProgramError, IncompatibleProgramError) as e:
+            print(f"{filename}: [bold red]{e}[/bold red]")
+            self.had_error = True
+            return None
+
+        return statements
+
+    # Runs the front end over a script and saves the result to `output`,
+    # ready to be run with `run_file`. Returns False if the script has errors.
+    def compile_file(self, filename: str, output: str) -> bool:
+        statements = self.front_end(self.file_scanner(filename))
+        if statements is None:
+            return False
+        statements = self.optimize(statements)
+        try:
+            payload = dump_program(statements)
+        except RecursionError:
+            print(f"{filename}: [bold red]Program is nested too deeply.[/bold red]")
+            self.had_error = True
+            return False
+        digest = ProgramCache.source_digest(filename)
+        Path(output).write_bytes(pack_program(digest, payload))
+        return True
+
+    # The bytecode the VM would run for a script, as text.
+    def disassemble_file(self, filename: str) -> t.Optional[str]:
+        statements = self.front_end(self.file_scanner(filename))
+        if statements is None:
+            return None
+        return disassemble(BytecodeCompiler().compile(self.optimize(statements)))
+
+    # The Python source the python engine runs for a script.
+    def transpile_file(self, filename: str) -> t.Optional[str]:
+        statements = self.front_end(self.file_scanner(filename))
+        if statements is None:
+            return None
+        return PythonEngine.transpile(self.optimize(statements))
+
+    def file_scanner(self, filename: str) -> t.Any:
+        if self.stream:
+            return StreamScanner(filename)
+        with open(filename, encoding="utf-8") as f:
+            content: str = f.read()
+        return self.scanner(content)
+
     def run(self, source: str) -> None:
+        statements = self.front_end(self.scanner(source))
+        if statements is not None:
+            self.execute(self.optimize(statements))
+
+    # Scans, parses and resolves; returns None if any error was reported.
+    def front_end(self, scanner: t.Any) -> t.Optional[t.List[Stmt]]:
         try:
-            scanner: Scanner = Scanner(source)
             tokens = scanner.scan_tokens()
             # print("Tokens:", [(token.lexeme, token.token_type) for token in tokens])
-            ast = Parser(tokens, self.report_error).parse()
-            if not self.had_error:
-                self.interpreter.interpret(ast)
+            ast = self.parser(tokens, self.report_error).parse()
+            if self.had_error:
+                return None
+            Resolver(self.interpreter).resolve(ast)
+            return ast
         except LoxSyntaxError as e:
             self.report_error(e)
         except LoxParseError as e:
             self.report_error(e)
+        return None
+
+    # Level 1 folds constant expressions and drops dead branches.
+    def optimize(self, statements: t.List[Stmt]) -> t.List[Stmt]:
+        if self.opt_level < 1:
+            return statements
+        optimizer = Optimizer()
+        statements = optimizer.optimize(statements)
+        if self.report is not None:
+            self.report(
+                f"optimizer: folded {optimizer.folded} expressions, "
+                f"pruned {optimizer.pruned} statements"
+            )
+        return statements
+
+    def execute(self, statements: t.List[Stmt]) -> None:
+        try:
+            self.engine.interpret(statements)
         except LoxRuntimeError as e:
             self.report_runtime_error(e)
+        if self.scope_report is not None:
+            walker = (
+                self.engine
+                if isinstance(self.engine, Interpreter)
+                else self.interpreter
+            )
+            self.scope_report(
+                f"environments: {walker.scope_environments} allocated "
+                f"for blocks and loops, {walker.avoided_environments} "
+                "avoided"
+            )
+        report = getattr(self.engine, "report", None)
+        if self.engine_report is not None and report is not None:
+            for line in report():
+                self.engine_report(line)
 
     @staticmethod
     def stringify(value: typing.Any) -> str:
@@ -109,12 +334,144 @@ class Lox:
         self.had_runtime_error = True
 
 
-@pylox_cli.command()
+def stderr_report(message: str) -> None:
+    print(message, file=sys.stderr)
+
+
+@pylox_cli.command("run", help="Run a script or a compiled program, or start a REPL.")
 def main(
     lox_script: t.Optional[Path] = typer.Argument(default=None),
+    scanner: ScannerKind = typer.Option(
+        ScannerKind.CLASSIC, help="Tokenizer used by the front end."
+    ),
+    stream: bool = typer.Option(
+        False, help="Scan the script lazily from a memory-mapped file."
+    ),
+    parser: ParserKind = typer.Option(
+        ParserKind.DESCENT, help="Expression parsing strategy."
+    ),
+    cache: bool = typer.Option(
+        True, help="Reuse the resolved program from __loxcache__ if unchanged."
+    ),
+    cache_report: bool = typer.Option(
+        False, help="Report cache hits and misses on stderr."
+    ),
+    optimize: int = typer.Option(
+        0,
+        "--optimize",
+        "-O",
+        min=0,
+        max=1,
+        help="1 folds constants and removes dead branches.",
+    ),
+    optimize_report: bool = typer.Option(
+        False, help="Report what the optimizer did on stderr."
+    ),
+    scope_report: bool = typer.Option(
+        False,
+        help="Report how many block and loop environments the tree walker "
+        "allocated and avoided on stderr.",
+    ),
+    engine: EngineKind = typer.Option(
+        EngineKind.TREE, help="How the resolved program is executed."
+    ),
+    engine_report: bool = typer.Option(
+        False,
+        help="Report on stderr what the engine did at run time, such as the "
+        "nodes the adaptive engine specialized.",
+    ),
+    max_depth: int = typer.Option(
+        MAX_FRAMES,
+        min=1,
+        help='Nested calls the vm engine allows before "Stack overflow."; '
+        "tail calls don't count.",
+    ),
+    flush: FlushPolicy = typer.Option(
+        FlushPolicy.AUTO,
+        help="When printed output is written: after each line, in large "
+        "blocks, or by line only on a terminal.",
+    ),
 ) -> None:  # pragma: no cover
-    lox = Lox()
+    program_cache = None
+    if cache:
+        program_cache = ProgramCache(stderr_report if cache_report else None)
+    lox = Lox(
+        scanner,
+        stream,
+        parser,
+        program_cache,
+        optimize,
+        stderr_report if optimize_report else None,
+        stderr_report if scope_report else None,
+        engine,
+        stderr_report if engine_report else None,
+        max_depth,
+        StreamSink(policy=flush),
+    )
     if not lox_script:
         lox.run_prompt()
     else:
         lox.run_file(str(lox_script))
+
+
+@pylox_cli.command("compile", help="Compile a script into a .loxc program.")
+def compile_command(
+    lox_script: Path = typer.Argument(...),
+    output: t.Optional[Path] = typer.Option(
+        None, "--output", "-o", help="Defaults to the script with a .loxc suffix."
+    ),
+    optimize: int = typer.Option(
+        0,
+        "--optimize",
+        "-O",
+        min=0,
+        max=1,
+        help="1 folds constants and removes dead branches.",
+    ),
+) -> None:  # pragma: no cover
+    lox = Lox(opt_level=optimize)
+    if not lox.compile_file(
+        str(lox_script), str(output or lox_script.with_suffix(".loxc"))
+    ):
+        sys.exit(65)
+
+
+@pylox_cli.command("disassemble", help="Print the bytecode the VM runs for a script.")
+def disassemble_command(
+    lox_script: Path = typer.Argument(...),
+    optimize: int = typer.Option(
+        0,
+        "--optimize",
+        "-O",
+        min=0,
+        max=1,
+        help="1 folds constants and removes dead branches.",
+    ),
+) -> None:  # pragma: no cover
+    lox = Lox(opt_level=optimize)
+    listing = lox.disassemble_file(str(lox_script))
+    if listing is None:
+        sys.exit(65)
+    # Not through rich: listings are full of brackets.
+    sys.stdout.write(listing + "\n")
+
+
+@pylox_cli.command(
+    "transpile", help="Print the Python the python engine runs for a script."
+)
+def transpile_command(
+    lox_script: Path = typer.Argument(...),
+    optimize: int = typer.Option(
+        0,
+        "--optimize",
+        "-O",
+        min=0,
+        max=1,
+        help="1 folds constants and removes dead branches.",
+    ),
+) -> None:  # pragma: no cover
+    lox = Lox(opt_level=optimize)
+    source = lox.transpile_file(str(lox_script))
+    if source is None:
+        sys.exit(65)
+    sys.stdout.write(source)
@@ -0,0 +1,593 @@
+import operator
+import typing
+
+import pylox.expr as expr_ast
+import pylox.stmt as stmt_ast
+from pylox.environment import Environment
+from pylox.error import BreakException, LoxRuntimeError
+from pylox.expr import Expr
+from pylox.interpreter import NO_VARIABLES, Interpreter
+from pylox.rope import STRING_TYPES
+from pylox.runtime_object import (
+    BREAK,
+    NIL_RETURN,
+    LoxCallable,
+    LoxClass,
+    LoxFunction,
+    LoxInstance,
+)
+from pylox.stmt import Stmt
+from pylox.tokens import Token, TokenType
+
+# Compiled code: a closure over the compiled children of one node, called with
+# the current environment.
+Code = typing.Callable[[Environment], typing.Any]
+# Compiled statements return their completion, as in the tree walker: None,
+# `BREAK` or a 1-tuple with the value of a `return`.
+
+stringify = Interpreter.stringify
+concatenate = Interpreter.concatenate
+
+# Operators that take two numbers.
+ARITHMETIC: typing.Dict[TokenType, typing.Callable[[float, float], typing.Any]] = {
+    TokenType.MINUS: operator.sub,
+    TokenType.STAR: operator.mul,
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+    TokenType.LESS: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+}
+
+
+def _nothing(env: Environment) -> None:
+    return None
+
+
+def numbers(
+    op: Token, left: typing.Any, right: typing.Any
+) -> typing.Tuple[float, float]:
+    if (type(left) is float or type(left) is int) and (
+        type(right) is float or type(right) is int
+    ):
+        return float(left), float(right)
+    raise LoxRuntimeError(op, "Operands must be a numbers.")
+
+
+# A function whose body was compiled to a closure. It fits into `LoxClass` and
+# `LoxInstance` like any `LoxFunction`.
+class CompiledFunction(LoxFunction):
+    def __init__(
+        self,
+        declaration: stmt_ast.Function,
+        closure: Environment,
+        is_init: bool,
+        body: Code,
+    ) -> None:
+        super().__init__(declaration, closure, is_init)
+        self.body = body
+        self.param_count = len(declaration.params)
+
+    # Every call site builds a fresh argument list, so it becomes the
+    # environment's values as is.
+    # A `break` that leaves the body goes on as a `BreakException` to the loop
+    # the call is in, as in `LoxFunction.run`.
+    def call(self, interpreter, args: list) -> typing.Any:
+        completion = self.body(Environment(self.closure, args))
+        if completion is BREAK:
+            raise BreakException()
+        if self.is_init:
+            return self.closure.values[0]
+        if completion is None:
+            return None
+        return completion[0]
+
+    def call_bound(self, interpreter, instance: LoxInstance, args: list) -> typing.Any:
+        completion = self.body(Environment(Environment(self.closure, [instance]), args))
+        if completion is BREAK:
+            raise BreakException()
+        if self.is_init:
+            return instance
+        if completion is None:
+            return None
+        return completion[0]
+
+    def bind(self, instance: LoxInstance) -> "CompiledFunction":
+        env = Environment(self.closure, [instance])
+        return CompiledFunction(self.declaration, env, self.is_init, self.body)
+
+
+# Alternative to the tree walker: compiles every node of a resolved program
+# once into a Python closure that runs it, so evaluating a node no longer goes
+# through the dispatch table and the `match` on its operator. A `Binary` with
+# `MINUS` becomes a closure calling its two operand closures and subtracting;
+# a local variable becomes a closure reading a fixed slot at a fixed depth.
+#
+# Runtime values, environments, classes and instances are the interpreter's,
+# and the globals are shared with it.
+class ClosureCompiler(expr_ast.ExprVisitor, stmt_ast.StmtVisitor):
+    def __init__(self, interpreter: Interpreter):
+        self.interpreter = interpreter
+        self.globals = interpreter.globals.values
+        self.dispatch = expr_ast.expr_dispatch_table(
+            self
+        ) + stmt_ast.stmt_dispatch_table(self)
+        # Environments between the code being compiled and the globals;
+        # declarations at 0 define globals.
+        self.local_depth = 0
+
+    def interpret(self, statements: typing.List[Stmt]) -> None:
+        try:
+            self.compile(statements)(self.interpreter.globals)
+        finally:
+            self.interpreter.output.flush()
+
+    def interpret_expr(self, expr: Expr) -> str:
+        return stringify(self.compile_expr(expr)(self.interpreter.globals))
+
+    def compile(self, statements: typing.List[Stmt]) -> Code:
+        return self.sequence(statements)
+
+    def compile_expr(self, expr: Expr) -> Code:
+        return self.dispatch[expr.kind](expr)
+
+    def sequence(self, statements: typing.List[Stmt]) -> Code:
+        codes = [self.dispatch[stmt.kind](stmt) for stmt in statements]
+        if not codes:
+            return _nothing
+        if len(codes) == 1:
+            return codes[0]
+
+        def run(env):
+            for code in codes:
+                completion = code(env)
+                if completion is not None:
+                    return completion
+            return None
+
+        return run
+
+    # Compiles `statements` as running `inner` environments further in.
+    def nested(self, statements: typing.List[Stmt], inner: int) -> Code:
+        self.local_depth += inner
+        try:
+            return self.sequence(statements)
+        finally:
+            self.local_depth -= inner
+
+    def define(self, name: Token, value: Code) -> Code:
+        if self.local_depth == 0:
+            values, key = self.globals, name.lexeme
+
+            def define_global(env):
+                values[key] = value(env)
+
+            return define_global
+
+        def define_local(env):
+            env.values.append(value(env))
+
+        return define_local
+
+    @staticmethod
+    def local_reader(depth: int, slot: int) -> Code:
+        if depth == 0:
+            return lambda env: env.values[slot]
+        if depth == 1:
+            return lambda env: env.enclosing.values[slot]
+        if depth == 2:
+            return lambda env: env.enclosing.enclosing.values[slot]
+
+        def read(env):
+            for _ in range(depth):
+                env = env.enclosing
+            return env.values[slot]
+
+        return read
+
+    def global_reader(self, name: Token) -> Code:
+        values, key = self.globals, name.lexeme
+
+        def read(env):
+            try:
+                return values[key]
+            except KeyError:
+                raise LoxRuntimeError(name, f"Undefined variable {key}.") from None
+
+        return read
+
+    def visit_literal_expr(self, expr: expr_ast.Literal) -> Code:
+        value = expr.value
+        return lambda env: value
+
+    def visit_grouping_expr(self, expr: expr_ast.Grouping) -> Code:
+        return self.compile_expr(expr.expression)
+
+    def visit_variable_expr(self, expr: expr_ast.Variable) -> Code:
+        if expr.resolved is None:
+            return self.global_reader(expr.name)
+        return self.local_reader(*expr.resolved)
+
+    def visit_this_expr(self, expr: expr_ast.This) -> Code:
+        if expr.resolved is None:
+            return self.global_reader(expr.keyword)
+        return self.local_reader(*expr.resolved)
+
+    def visit_assign_expr(self, expr: expr_ast.Assign) -> Code:
+        value = self.compile_expr(expr.value)
+        if expr.resolved is None:
+            values, key, name = self.globals, expr.name.lexeme, expr.name
+
+            def assign_global(env):
+                result = value(env)
+                if key not in values:
+                    raise LoxRuntimeError(name, f"Undefined variable {key}.")
+                values[key] = result
+                return result
+
+            return assign_global
+
+        depth, slot = expr.resolved
+        if depth == 0:
+
+            def assign_local(env):
+                result = env.values[slot] = value(env)
+                return result
+
+            return assign_local
+
+        def assign(env):
+            result = value(env)
+            env.assign_at(depth, slot, result)
+            return result
+
+        return assign
+
+    def visit_unary_expr(self, expr: expr_ast.Unary) -> Code:
+        right, op = self.compile_expr(expr.right), expr.operator
+        if op.token_type == TokenType.BANG:
+
+            def bang(env):
+                value = right(env)
+                return value is None or value is False
+
+            return bang
+
+        def negate(env):
+            value = right(env)
+            if type(value) is float or type(value) is int:
+                return -float(value)
+            raise LoxRuntimeError(op, "Operand must be a number.")
+
+        return negate
+
+    def visit_binary_expr(self, expr: expr_ast.Binary) -> Code:
+        left, right = self.compile_expr(expr.left), self.compile_expr(expr.right)
+        op = expr.operator
+        token_type = op.token_type
+
+        if token_type == TokenType.EQUAL_EQUAL:
+            return lambda env: left(env) == right(env)
+        if token_type == TokenType.BANG_EQUAL:
+            return lambda env: left(env) != right(env)
+
+        if token_type == TokenType.PLUS:
+
+            def add(env):
+                a, b = left(env), right(env)
+                if type(a) is float and type(b) is float:
+                    return a + b
+                if (type(a) is float or type(a) is int) and (
+                    type(b) is float or type(b) is int
+                ):
+                    return float(a) + float(b)
+                if type(a) in STRING_TYPES or type(b) in STRING_TYPES:
+                    return concatenate(a, b)
+                raise LoxRuntimeError(
+                    op, "Operands must be two numbers or two strings."
+                )
+
+            return add
+
+        if token_type == TokenType.SLASH:
+
+            def divide(env):
+                a, b = numbers(op, left(env), right(env))
+                if b == 0:
+                    raise LoxRuntimeError(op, "Division by zero!")
+                return a / b
+
+            return divide
+
+        apply = ARITHMETIC[token_type]
+
+        def arithmetic(env):
+            a, b = left(env), right(env)
+            if type(a) is float and type(b) is float:
+                return apply(a, b)
+            return apply(*numbers(op, a, b))
+
+        return arithmetic
+
+    def visit_logical_expr(self, expr: expr_ast.Logical) -> Code:
+        left, right = self.compile_expr(expr.left), self.compile_expr(expr.right)
+        if expr.operator.token_type == TokenType.OR:
+
+            def logical_or(env):
+                value = left(env)
+                if value is None or value is False:
+                    return right(env)
+                return value
+
+            return logical_or
+
+        def logical_and(env):
+            value = left(env)
+            if value is None or value is False:
+                return value
+            return right(env)
+
+        return logical_and
+
+    def visit_call_expr(self, expr: expr_ast.Call) -> Code:
+        callee_code = self.compile_expr(expr.callee)
+        arguments = self.compile_arguments(expr.arguments)
+        paren, interpreter = expr.paren, self.interpreter
+        count = len(expr.arguments)
+
+        def call(env):
+            callee = callee_code(env)
+            args = arguments(env)
+            # Calls of plain functions skip `LoxFunction.call` and `arity()`.
+            if type(callee) is CompiledFunction and not callee.is_init:
+                if callee.param_count != count:
+                    raise LoxRuntimeError(
+                        paren,
+                        f"Expected {callee.param_count} arguments but got {count}.",
+                    )
+                try:
+                    completion = callee.body(Environment(callee.closure, args))
+                except RecursionError:
+                    raise LoxRuntimeError(paren, "Stack overflow.") from None
+                if completion is None:
+                    return None
+                if completion is BREAK:
+                    raise BreakException()
+                return completion[0]
+            if not isinstance(callee, LoxCallable):
+                raise LoxRuntimeError(paren, "Can only call functions and classes.")
+            if count != callee.arity():
+                raise LoxRuntimeError(
+                    paren, f"Expected {callee.arity()} arguments but got {count}."
+                )
+            try:
+                return callee.call(interpreter, args)
+            except RecursionError:
+                raise LoxRuntimeError(paren, "Stack overflow.") from None
+
+        return call
+
+    def compile_arguments(self, arguments: typing.List[Expr]) -> Code:
+        codes = [self.compile_expr(arg) for arg in arguments]
+        if not codes:
+            return lambda env: []
+        if len(codes) == 1:
+            first = codes[0]
+            return lambda env: [first(env)]
+        if len(codes) == 2:
+            first, second = codes
+            return lambda env: [first(env), second(env)]
+        return lambda env: [code(env) for code in codes]
+
+    def visit_get_expr(self, expr: expr_ast.Get) -> Code:
+        obj_code, name = self.compile_expr(expr.obj), expr.name
+
+        def get(env):
+            obj = obj_code(env)
+            if isinstance(obj, LoxInstance):
+                return obj.get(name)
+            raise LoxRuntimeError(name, "Only instances have properties.")
+
+        return get
+
+    def visit_set_expr(self, expr: expr_ast.Set) -> Code:
+        obj_code, value_code = (
+            self.compile_expr(expr.obj),
+            self.compile_expr(expr.value),
+        )
+        name = expr.name
+
+        def set_property(env):
+            obj = obj_code(env)
+            if not isinstance(obj, LoxInstance):
+                raise LoxRuntimeError(name, "Only instances have fields.")
+            value = value_code(env)
+            obj.set(name, value)
+            return value
+
+        return set_property
+
+    def visit_super_expr(self, expr: expr_ast.Super) -> Code:
+        depth, _ = expr.resolved  # type: ignore[misc]
+        superclass_code = self.local_reader(depth, 0)
+        this_code = self.local_reader(depth - 1, 0)
+        method_name = expr.method
+
+        def super_method(env):
+            superclass = superclass_code(env)
+            method = superclass.find_method(method_name.lexeme)
+            if method is None:
+                raise LoxRuntimeError(
+                    method_name, f"Undefined property '{method_name.lexeme}'."
+                )
+            return method.bind(this_code(env))
+
+        return super_method
+
+    def visit_expression_stmt(self, stmt: stmt_ast.Expression) -> Code:
+        expression = self.compile_expr(stmt.expression)
+
+        def run(env):
+            expression(env)
+
+        return run
+
+    def visit_print_stmt(self, stmt: stmt_ast.Print) -> Code:
+        expression = self.compile_expr(stmt.expression)
+        write_line = self.interpreter.output.write_line
+
+        def run(env):
+            write_line(stringify(expression(env)))
+
+        return run
+
+    def visit_var_stmt(self, stmt: stmt_ast.Var) -> Code:
+        value = _nothing
+        if stmt.initializer is not None:
+            value = self.compile_expr(stmt.initializer)
+        return self.define(stmt.name, value)
+
+    def visit_block_stmt(self, stmt: stmt_ast.Block) -> Code:
+        base = stmt.inline_base
+        if base is None:
+            body = self.nested(stmt.statements, 1)
+            return lambda env: body(Environment(env))
+
+        body = self.sequence(stmt.statements)
+        if base == NO_VARIABLES:
+            return body
+
+        # The variables go away with the block, also when a `break` out of a
+        # function called in it unwinds through it.
+        def run_inline(env):
+            try:
+                return body(env)
+            finally:
+                del env.values[base:]
+
+        return run_inline
+
+    def visit_if_stmt(self, stmt: stmt_ast.If) -> Code:
+        condition = self.compile_expr(stmt.condition)
+        then_branch = self.dispatch[stmt.then_branch.kind](stmt.then_branch)
+        else_branch = _nothing
+        if stmt.else_branch is not None:
+            else_branch = self.dispatch[stmt.else_branch.kind](stmt.else_branch)
+
+        def run(env):
+            value = condition(env)
+            if value is None or value is False:
+                return else_branch(env)
+            return then_branch(env)
+
+        return run
+
+    def visit_while_stmt(self, stmt: stmt_ast.While) -> Code:
+        condition = self.compile_expr(stmt.condition)
+        body = self.dispatch[stmt.body.kind](stmt.body)
+
+        def run(env):
+            try:
+                while True:
+                    value = condition(env)
+                    if value is None or value is False:
+                        return None
+                    completion = body(env)
+                    if completion is not None:
+                        return None if completion is BREAK else completion
+            except BreakException:
+                return None
+
+        return run
+
+    def visit_for_stmt(self, stmt: stmt_ast.For) -> Code:
+        base = stmt.inline_base
+        inner = 1 if base is None else 0
+        self.local_depth += inner
+        try:
+            initializer = _nothing
+            if stmt.initializer is not None:
+                initializer = self.dispatch[stmt.initializer.kind](stmt.initializer)
+            condition = None
+            if stmt.condition is not None:
+                condition = self.compile_expr(stmt.condition)
+            increment = _nothing
+            if stmt.increment is not None:
+                increment = self.compile_expr(stmt.increment)
+            body = self.dispatch[stmt.body.kind](stmt.body)
+        finally:
+            self.local_depth -= inner
+
+        def loop(env):
+            initializer(env)
+            try:
+                while True:
+                    if condition is not None:
+                        value = condition(env)
+                        if value is None or value is False:
+                            return None
+                    completion = body(env)
+                    if completion is not None:
+                        return None if completion is BREAK else completion
+                    increment(env)
+            except BreakException:
+                return None
+
+        if base is None:
+            return lambda env: loop(Environment(env))
+        if base == NO_VARIABLES:
+            return loop
+
+        def run_inline(env):
+            try:
+                return loop(env)
+            finally:
+                del env.values[base:]
+
+        return run_inline
+
+    def visit_break_stmt(self, stmt: stmt_ast.Break) -> Code:
+        return lambda env: BREAK
+
+    def visit_return_stmt(self, stmt: stmt_ast.Return) -> Code:
+        if stmt.value is None:
+            return lambda env: NIL_RETURN
+        value = self.compile_expr(stmt.value)
+        return lambda env: (value(env),)
+
+    def visit_function_stmt(self, stmt: stmt_ast.Function) -> Code:
+        body = self.nested(stmt.body, 1)
+
+        def function(env):
+            return CompiledFunction(stmt, env, False, body)
+
+        return self.define(stmt.name, function)
+
+    def visit_class_stmt(self, stmt: stmt_ast.Class) -> Code:
+        superclass_code = None
+        if stmt.superclass is not None:
+            superclass_code = self.compile_expr(stmt.superclass)
+        # Methods run inside the `super` environment, if any, and `this`.
+        scopes = 2 if superclass_code is None else 3
+        methods = [
+            (method, method.name.lexeme == "init", self.nested(method.body, scopes))
+            for method in stmt.methods
+        ]
+        name = stmt.name
+
+        def create_class(env):
+            superclass = None
+            if superclass_code is not None:
+                superclass = superclass_code(env)
+                if not isinstance(superclass, LoxClass):
+                    raise LoxRuntimeError(
+                        stmt.superclass.name,  # type: ignore[union-attr]
+                        "Superclass must be a class.",
+                    )
+                env = Environment(env, [superclass])
+            functions: typing.Dict[str, LoxFunction] = {
+                method.name.lexeme: CompiledFunction(method, env, is_init, body)
+                for method, is_init, body in methods
+            }
+            return LoxClass(name.lexeme, typing.cast(LoxClass, superclass), functions)
+
+        return self.define(name, create_class)
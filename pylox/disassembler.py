@@ -0,0 +1,86 @@
+import typing
+
+from pylox.bytecode import BytecodeFunction, Chunk, OpCode
+from pylox.interpreter import Interpreter
+
+# Instructions by the shape of their operands.
+CONSTANT_OPERAND = {
+    OpCode.CONSTANT,
+    OpCode.GET_GLOBAL,
+    OpCode.DEFINE_GLOBAL,
+    OpCode.SET_GLOBAL,
+    OpCode.GET_PROPERTY,
+    OpCode.SET_PROPERTY,
+    OpCode.GET_SUPER,
+    OpCode.CLASS,
+    OpCode.METHOD,
+}
+INT_OPERAND = {
+    OpCode.GET_LOCAL,
+    OpCode.SET_LOCAL,
+    OpCode.GET_UPVALUE,
+    OpCode.SET_UPVALUE,
+    OpCode.CALL,
+}
+JUMPS = {
+    OpCode.JUMP,
+    OpCode.JUMP_IF_FALSE,
+    OpCode.JUMP_IF_TRUE,
+    OpCode.POP_JUMP_IF_FALSE,
+}
+INVOKES = {OpCode.INVOKE, OpCode.SUPER_INVOKE}
+
+
+def describe(value: typing.Any) -> str:
+    if isinstance(value, BytecodeFunction):
+        return str(value)
+    return repr(value) if isinstance(value, str) else Interpreter.stringify(value)
+
+
+# One line per instruction, as in clox: offset, source line ("|" if the
+# same as the previous instruction's), name and operands. `CLOSURE` gets
+# one more line per captured variable.
+def disassemble_instruction(chunk: Chunk, offset: int) -> typing.Tuple[str, int]:
+    code, line = chunk.code, chunk.lines[offset]
+    same_line = offset > 0 and chunk.lines[offset - 1] == line
+    prefix = f"{offset:04d} {'   |' if same_line else f'{line:4d}'} "
+    op = OpCode(code[offset])
+    name = f"{op.name:<17}"
+    if op in CONSTANT_OPERAND:
+        index = code[offset + 1]
+        text = f"{name}{index:4d} {describe(chunk.constants[index])}"
+        return prefix + text, offset + 2
+    if op in INT_OPERAND:
+        return prefix + f"{name}{code[offset + 1]:4d}", offset + 2
+    if op in JUMPS:
+        return prefix + f"{name}{offset:4d} -> {code[offset + 1]}", offset + 2
+    if op in INVOKES:
+        index, count = code[offset + 1], code[offset + 2]
+        text = f"{name}({count} args){index:4d} {describe(chunk.constants[index])}"
+        return prefix + text, offset + 3
+    if op is OpCode.CLOSURE:
+        index = code[offset + 1]
+        function = chunk.constants[index]
+        lines = [prefix + f"{name}{index:4d} {function}"]
+        offset += 2
+        for _ in range(function.upvalue_count):
+            kind = "local" if code[offset] else "upvalue"
+            lines.append(f"{offset:04d}    |   {kind:>19} {code[offset + 1]}")
+            offset += 2
+        return "\n".join(lines), offset
+    return prefix + op.name, offset + 1
+
+
+# The code of `function`, followed by that of the functions it defines.
+def disassemble(function: BytecodeFunction) -> str:
+    chunk = function.chunk
+    lines = [f"== {function} =="]
+    offset = 0
+    while offset < len(chunk.code):
+        text, offset = disassemble_instruction(chunk, offset)
+        lines.append(text)
+    for constant in chunk.constants:
+        if isinstance(constant, BytecodeFunction):
+            lines.append("")
+            lines.append(disassemble(constant))
+    return "\n".join(lines)
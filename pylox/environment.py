@@ -3,39 +3,33 @@ from pylox.error import LoxRuntimeError
 from pylox.tokens import Token
 
 
+# A local scope. The resolver numbers the variables of every scope in the
+# order they are declared, and the interpreter defines them in that same
+# order, so a variable is found by its (depth, slot) pair instead of by name.
 class Environment:
-    def __init__(self, enclosing=None) -> None:
-        self._values: dict[str, typing.Any] = {}
+    __slots__ = ("values", "enclosing")
+
+    def __init__(self, enclosing=None, values: typing.Optional[list] = None) -> None:
+        self.values: typing.Any = [] if values is None else values
         self.enclosing = enclosing
 
+    # The name is only needed by `GlobalEnvironment`; locals are found by slot.
     def define(self, name: str, value: typing.Any) -> None:
-        self._values[name] = value
-
-    def get(self, name: Token) -> typing.Any:
-        if name.lexeme in self._values.keys():
-            return self._values[name.lexeme]
-
-        if self.enclosing is not None:
-            return self.enclosing.get(name)
-
-        raise LoxRuntimeError(name, f"Undefined variable {name.lexeme}.")
-
-    def assign(self, name: Token, value: typing.Any) -> None:
-        if name.lexeme in self._values.keys():
-            self._values[name.lexeme] = value
-            return
+        self.values.append(value)
 
-        if self.enclosing is not None:
-            self.enclosing.assign(name, value)
-            return
-
-        raise LoxRuntimeError(name, f"Undefined variable {name.lexeme}.")
-
-    def get_at(self, distance: int, name: str) -> typing.Any:
-        return self.ancestor(distance)._values.get(name)
+    def get_at(self, distance: int, slot: int) -> typing.Any:
+        env = self
+        while distance > 0:
+            env = env.enclosing  # type: ignore
+            distance -= 1
+        return env.values[slot]
 
-    def assign_at(self, distance: int, name: Token, value: typing.Any) -> typing.Any:
-        self.ancestor(distance)._values[name.lexeme] = value
+    def assign_at(self, distance: int, slot: int, value: typing.Any) -> None:
+        env = self
+        while distance > 0:
+            env = env.enclosing  # type: ignore
+            distance -= 1
+        env.values[slot] = value
 
     def ancestor(self, distance: int) -> typing.Any:
         env = self
@@ -43,3 +37,29 @@ class Environment:
             env = env.enclosing  # type: ignore
             distance -= 1
         return env
+
+
+# The outermost scope. Globals can be used before they are declared and be
+# redefined, so they stay in a dict keyed by name.
+class GlobalEnvironment(Environment):
+    __slots__ = ()
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.values = {}
+
+    def define(self, name: str, value: typing.Any) -> None:
+        self.values[name] = value
+
+    def get(self, name: Token) -> typing.Any:
+        if name.lexeme in self.values:
+            return self.values[name.lexeme]
+
+        raise LoxRuntimeError(name, f"Undefined variable {name.lexeme}.")
+
+    def assign(self, name: Token, value: typing.Any) -> None:
+        if name.lexeme in self.values:
+            self.values[name.lexeme] = value
+            return
+
+        raise LoxRuntimeError(name, f"Undefined variable {name.lexeme}.")
@@ -57,31 +57,47 @@ class ExprVisitor(ABC):
 
 
 class Expr(ABC):
+    __slots__ = ()
+    kind: int
+    runtime_fields: typing.Tuple[str, ...] = ()
+
     @abstractmethod
     def accept(self, visitor: ExprVisitor) -> typing.Any:
         pass
 
 
 class Assign(Expr):
+    __slots__ = ("name", "value", "resolved")
+    kind = 0
+
     def __init__(self, name: Token, value: Expr):
         self.name = name
         self.value = value
+        self.resolved: typing.Optional[typing.Tuple[int, int]] = None
 
     def accept(self, visitor: ExprVisitor) -> typing.Any:
         return visitor.visit_assign_expr(self)
 
 
 class Binary(Expr):
+    __slots__ = ("left", "operator", "right", "failures")
+    kind = 1
+    runtime_fields = ("failures",)
+
     def __init__(self, left: Expr, operator: Token, right: Expr):
         self.left = left
         self.operator = operator
         self.right = right
+        self.failures: int = 0
 
     def accept(self, visitor: ExprVisitor) -> typing.Any:
         return visitor.visit_binary_expr(self)
 
 
 class Grouping(Expr):
+    __slots__ = ("expression",)
+    kind = 2
+
     def __init__(self, expression: Expr):
         self.expression = expression
 
@@ -90,6 +106,9 @@ class Grouping(Expr):
 
 
 class Literal(Expr):
+    __slots__ = ("value",)
+    kind = 3
+
     def __init__(self, value: object):
         self.value = value
 
@@ -98,6 +117,9 @@ class Literal(Expr):
 
 
 class Logical(Expr):
+    __slots__ = ("left", "operator", "right")
+    kind = 4
+
     def __init__(self, left: Expr, operator: Token, right: Expr):
         self.left = left
         self.operator = operator
@@ -108,42 +130,65 @@ class Logical(Expr):
 
 
 class Unary(Expr):
+    __slots__ = ("operator", "right", "failures")
+    kind = 5
+    runtime_fields = ("failures",)
+
     def __init__(self, operator: Token, right: Expr):
         self.operator = operator
         self.right = right
+        self.failures: int = 0
 
     def accept(self, visitor: ExprVisitor) -> typing.Any:
         return visitor.visit_unary_expr(self)
 
 
 class Variable(Expr):
+    __slots__ = ("name", "resolved")
+    kind = 6
+
     def __init__(self, name: Token):
         self.name = name
+        self.resolved: typing.Optional[typing.Tuple[int, int]] = None
 
     def accept(self, visitor: ExprVisitor) -> typing.Any:
         return visitor.visit_variable_expr(self)
 
 
 class Call(Expr):
+    __slots__ = ("callee", "paren", "arguments", "failures")
+    kind = 7
+    runtime_fields = ("failures",)
+
     def __init__(self, callee: Expr, paren: Token, arguments: typing.List[Expr]):
         self.callee = callee
         self.paren = paren
         self.arguments = arguments
+        self.failures: int = 0
 
     def accept(self, visitor: ExprVisitor) -> typing.Any:
         return visitor.visit_call_expr(self)
 
 
 class Get(Expr):
+    __slots__ = ("obj", "name", "cache", "failures")
+    kind = 8
+    runtime_fields = ("cache", "failures")
+
     def __init__(self, obj: Expr, name: Token):
         self.obj = obj
         self.name = name
+        self.cache: typing.Any = None
+        self.failures: int = 0
 
     def accept(self, visitor: ExprVisitor) -> typing.Any:
         return visitor.visit_get_expr(self)
 
 
 class Set(Expr):
+    __slots__ = ("obj", "name", "value")
+    kind = 9
+
     def __init__(self, obj: Expr, name: Token, value: Expr):
         self.obj = obj
         self.name = name
@@ -154,17 +199,66 @@ class Set(Expr):
 
 
 class This(Expr):
+    __slots__ = ("keyword", "resolved")
+    kind = 10
+
     def __init__(self, keyword: Token):
         self.keyword = keyword
+        self.resolved: typing.Optional[typing.Tuple[int, int]] = None
 
     def accept(self, visitor: ExprVisitor) -> typing.Any:
         return visitor.visit_this_expr(self)
 
 
 class Super(Expr):
+    __slots__ = ("keyword", "method", "resolved", "cache")
+    kind = 11
+    runtime_fields = ("cache",)
+
     def __init__(self, keyword: Token, method: Token):
         self.keyword = keyword
         self.method = method
+        self.resolved: typing.Optional[typing.Tuple[int, int]] = None
+        self.cache: typing.Any = None
 
     def accept(self, visitor: ExprVisitor) -> typing.Any:
         return visitor.visit_super_expr(self)
+
+
+# The node classes in `kind` order, starting at 0.
+EXPR_NODES: typing.Tuple[typing.Type[Expr], ...] = (
+    Assign,
+    Binary,
+    Grouping,
+    Literal,
+    Logical,
+    Unary,
+    Variable,
+    Call,
+    Get,
+    Set,
+    This,
+    Super,
+)
+
+
+# Table-driven alternative to `accept()`: the visitor's methods
+# for the `Expr` kinds, in order. Visitors of both `Expr` and
+# `Stmt` concatenate the two tables and call `table[node.kind](node)`.
+def expr_dispatch_table(
+    visitor: ExprVisitor,
+) -> typing.List[typing.Callable[[typing.Any], typing.Any]]:
+    return [
+        visitor.visit_assign_expr,
+        visitor.visit_binary_expr,
+        visitor.visit_grouping_expr,
+        visitor.visit_literal_expr,
+        visitor.visit_logical_expr,
+        visitor.visit_unary_expr,
+        visitor.visit_variable_expr,
+        visitor.visit_call_expr,
+        visitor.visit_get_expr,
+        visitor.visit_set_expr,
+        visitor.visit_this_expr,
+        visitor.visit_super_expr,
+    ]
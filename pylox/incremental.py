@@ -0,0 +1,203 @@
+from bisect import bisect_left
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from pylox.error import LoxException, LoxSyntaxError
+from pylox.parser import Parser
+from pylox.regex_scanner import RegexScanner
+from pylox.stmt import Stmt
+from pylox.tokens import Token
+
+
+# One top-level declaration as produced by `Parser.declaration()`, together
+# with the source span and the tokens it was parsed from.
+class Chunk:
+    __slots__ = ("start", "end", "start_line", "tokens", "stmt", "errors")
+
+    def __init__(
+        self,
+        start: int,
+        end: int,
+        start_line: int,
+        tokens: List[Token],
+        stmt: Optional[Stmt],
+        errors: List[LoxException],
+    ) -> None:
+        self.start = start
+        self.end = end
+        self.start_line = start_line
+        self.tokens = tokens
+        self.stmt = stmt
+        self.errors = errors
+
+    def shift(self, offset_delta: int, line_delta: int) -> None:
+        self.start += offset_delta
+        self.end += offset_delta
+        if line_delta:
+            self.start_line += line_delta
+            for token in self.tokens:
+                token.line += line_delta
+            for err in self.errors:
+                err.line += line_delta
+
+
+# Feeds the parser while remembering where each token came from, so that the
+# document can cut the token stream into per-declaration chunks.
+class _SpanRecorder:
+    def __init__(self, spans: Iterator[Tuple[Token, int, int]]) -> None:
+        self.spans = spans
+        self.tokens: List[Token] = []
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+
+    def __iter__(self) -> "_SpanRecorder":
+        return self
+
+    def __next__(self) -> Token:
+        token, start, end = next(self.spans)
+        self.tokens.append(token)
+        self.starts.append(start)
+        self.ends.append(end)
+        return token
+
+    # Everything but the parser's lookahead token belongs to the declaration
+    # that was just parsed.
+    def take_chunk(self) -> Tuple[List[Token], int]:
+        tokens, end = self.tokens[:-1], self.ends[-2]
+        del self.tokens[:-1], self.starts[:-1], self.ends[:-1]
+        return tokens, end
+
+    def lookahead_start(self) -> int:
+        return self.starts[-1]
+
+
+# Keeps the parse of a source buffer up to date across text edits.
+#
+# The source is split into the top-level declarations the parser produces.
+# After an edit only the declarations around it are re-scanned and re-parsed;
+# this stops as soon as a declaration boundary behind the edit lines up with
+# an old one, and every declaration from there on is reused as is (shifted to
+# the new offsets and line numbers).
+class IncrementalDocument:
+    def __init__(self, source: str, report_error: Optional[Callable] = None):
+        self.source: str = source
+        self.report_error = report_error
+        self.chunks: List[Chunk] = []
+        self.syntax_error: Optional[LoxSyntaxError] = None
+        # Number of declarations parsed so far, for measuring reuse.
+        self.reparsed: int = 0
+        self.parse_all()
+
+    @property
+    def statements(self) -> List[Stmt]:
+        return [chunk.stmt for chunk in self.chunks if chunk.stmt is not None]
+
+    @property
+    def errors(self) -> List[LoxException]:
+        errors: List[LoxException] = [
+            err for chunk in self.chunks for err in chunk.errors
+        ]
+        if self.syntax_error is not None:
+            errors.append(self.syntax_error)
+        return errors
+
+    # Replaces `removed` characters at `offset` with `inserted`.
+    def edit(self, offset: int, removed: int, inserted: str) -> List[Stmt]:
+        if not 0 <= offset <= offset + removed <= len(self.source):
+            raise ValueError("Edit is outside of the document.")
+
+        old_source = self.source
+        self.source = old_source[:offset] + inserted + old_source[offset + removed :]
+        if self.syntax_error is not None:
+            # The old chunks stop at the scanning error, start over.
+            self.parse_all()
+            return self.statements
+
+        offset_delta = len(inserted) - removed
+        line_delta = inserted.count("\n") - old_source.count(
+            "\n", offset, offset + removed
+        )
+
+        old_chunks = self.chunks
+        # The first declaration whose tokens may change: a token that merely
+        # touches the edit can still merge with the inserted text.
+        damaged = bisect_left(old_chunks, offset, key=lambda chunk: chunk.end)
+        # The parser looks one token ahead, so the declaration before the
+        # damage may parse differently too (think of a following `else`).
+        first = max(damaged - 1, 0)
+        if first < damaged:
+            start, start_line = old_chunks[first].start, old_chunks[first].start_line
+        else:
+            start, start_line = 0, 1
+        # Only declarations completely behind the edit can be reused.
+        reusable = bisect_left(
+            old_chunks, offset + removed, lo=first, key=lambda chunk: chunk.start
+        )
+
+        new_chunks, resumed = self.parse_from(
+            start,
+            start_line,
+            old_chunks,
+            reusable,
+            offset + len(inserted),
+            offset_delta,
+        )
+        self.chunks = old_chunks[:first] + new_chunks
+        if resumed is not None:
+            for chunk in old_chunks[resumed:]:
+                chunk.shift(offset_delta, line_delta)
+            self.chunks += old_chunks[resumed:]
+        return self.statements
+
+    def parse_all(self) -> None:
+        self.syntax_error = None
+        self.chunks, _ = self.parse_from(0, 1, [], 0, 0, 0)
+
+    # Parses declarations from `start` on. As soon as the next declaration
+    # starts at or behind `edit_end`, exactly where one of `old_chunks` (from
+    # `reusable` on) started before the edit, parsing stops and the index of
+    # that old chunk is returned alongside the new chunks.
+    def parse_from(
+        self,
+        start: int,
+        start_line: int,
+        old_chunks: List[Chunk],
+        reusable: int,
+        edit_end: int,
+        offset_delta: int,
+    ) -> Tuple[List[Chunk], Optional[int]]:
+        scanner = RegexScanner(self.source)
+        scanner.line, scanner.line_pos = start_line, start
+        recorder = _SpanRecorder(scanner.scan_spans(start))
+        chunks: List[Chunk] = []
+
+        try:
+            parser = Parser(recorder, self.report_error)
+            while not parser.is_at_end():
+                first = parser.peek()
+                chunk_start = recorder.lookahead_start()
+                chunk_line = first.line - first.lexeme.count("\n")
+                error_count = len(parser.errors)
+
+                stmt = parser.declaration()
+                tokens, chunk_end = recorder.take_chunk()
+                errors = parser.errors[error_count:]
+                chunks.append(
+                    Chunk(chunk_start, chunk_end, chunk_line, tokens, stmt, errors)
+                )
+                self.reparsed += 1
+
+                next_start = recorder.lookahead_start()
+                if next_start < edit_end or parser.is_at_end():
+                    continue
+                old_start = next_start - offset_delta
+                index = bisect_left(
+                    old_chunks, old_start, lo=reusable, key=lambda chunk: chunk.start
+                )
+                if index < len(old_chunks) and old_chunks[index].start == old_start:
+                    return chunks, index
+        except LoxSyntaxError as err:
+            self.syntax_error = err
+            if self.report_error is not None:
+                self.report_error(err)
+
+        return chunks, None
@@ -5,65 +5,150 @@ from pylox.error import LoxRuntimeError, BreakException
 from pylox.tokens import Token, TokenType
 from pylox.expr import Expr
 from pylox.stmt import Stmt
-from pylox.environment import Environment
-from pylox.runtime_object import LoxCallable, LoxClass, LoxFunction, LoxInstance, Return
+from pylox.environment import Environment, GlobalEnvironment
+from pylox.runtime_object import (
+    BREAK,
+    NIL_RETURN,
+    LoxCallable,
+    LoxClass,
+    LoxFunction,
+    LoxInstance,
+)
 from pylox.builtin_function import FUNCTIONS_MAPPING
-
-
+from pylox.output import OutputSink, StreamSink
+from pylox.rope import STRING_TYPES, concat
+
+# `inline_base` of a block or loop that runs in place and declares nothing.
+NO_VARIABLES = -1
+# Receiver classes a property site remembers; later ones take the slow path.
+MAX_CACHED_CLASSES = 4
+
+
+# Statements signal how they completed through their return value rather
+# than exceptions: None to carry on, `BREAK` to leave the innermost loop and
+# a 1-tuple with the value of a `return`. Statements that contain others hand
+# on anything but None. `BreakException` and `Return` are still honoured.
+#
+# `print` writes to `output`, which every engine running on this interpreter
+# shares; a run flushes it when it ends.
 class Interpreter(expr_ast.ExprVisitor, stmt_ast.StmtVisitor):
-    def __init__(self):
-        self.globals = Environment()
-        self.environment = self.globals
+    def __init__(self, output: typing.Optional[OutputSink] = None):
+        self.output: OutputSink = StreamSink() if output is None else output
+        self.globals = GlobalEnvironment()
+        self.environment: Environment = self.globals
         self.init_standard_library()
-        self.locals: typing.Dict[Expr, int] = {}
+        # Environments created and avoided for blocks and `for` loops.
+        self.scope_environments: int = 0
+        self.avoided_environments: int = 0
+        # Method lookups answered by the inline caches of `Get` and `Super`
+        # nodes, and those that had to search the class hierarchy.
+        self.property_cache_hits: int = 0
+        self.property_cache_misses: int = 0
+        self.super_cache_hits: int = 0
+        self.super_cache_misses: int = 0
+        # Bound methods created for `Get` values, and the ones that direct
+        # calls like `obj.method()` did without.
+        self.bound_methods: int = 0
+        self.elided_bound_methods: int = 0
+        # Visit methods by node kind. The hot paths below index this directly
+        # rather than going through `evaluate`/`execute` or `accept`, which
+        # saves two Python calls per node.
+        self.dispatch = expr_ast.expr_dispatch_table(
+            self
+        ) + stmt_ast.stmt_dispatch_table(self)
 
     def init_standard_library(self) -> None:
         for name, func in FUNCTIONS_MAPPING.items():
             self.globals.define(name, func)
 
-    def resolve(self, expr: Expr, depth: int) -> None:
-        self.locals[expr] = depth
+    # Resolution results live on the nodes themselves, so they go away with
+    # the program; an unresolved variable is a global.
+    def resolve(self, expr: Expr, depth: int, slot: int) -> None:
+        expr.resolved = (depth, slot)  # type: ignore[attr-defined]
+
+    # Lets a block or `for` loop run in the current environment, with its
+    # variables from slot `base` on (or `NO_VARIABLES`).
+    def inline_scope(self, stmt: Stmt, base: int) -> None:
+        stmt.inline_base = base  # type: ignore[attr-defined]
 
     def visit_this_expr(self, expr: expr_ast.This) -> typing.Any:
         return self.lookup_variable(expr.keyword, expr)
 
+    # `LoxInstance.get` with an inline cache: the node's `cache` maps the
+    # receiver classes seen here to the method each one resolves to. Classes
+    # never change once created, so an entry holds for as long as its class
+    # is around, and a new class, even one with the same name, is a new key.
+    # Fields are checked first, so one that shadows a method still wins.
     def visit_get_expr(self, expr: expr_ast.Get) -> typing.Any:
-        obj = self.evaluate(expr.obj)
-        if isinstance(obj, LoxInstance):
-            return typing.cast(LoxInstance, obj).get(expr.name)
-        raise LoxRuntimeError(expr.name, "Only instances have properties.")
+        obj = self.dispatch[expr.obj.kind](expr.obj)
+        if not isinstance(obj, LoxInstance):
+            raise LoxRuntimeError(expr.name, "Only instances have properties.")
+        index = obj.shape.slots.get(expr.name.lexeme)
+        if index is not None:
+            return obj.values[index]
+
+        self.bound_methods += 1
+        return self.lookup_method(expr, obj.lox_class).bind(obj)
+
+    def lookup_method(self, expr: expr_ast.Get, lox_class: LoxClass) -> LoxFunction:
+        cache = expr.cache
+        if cache is not None:
+            method = cache.get(lox_class)
+            if method is not None:
+                self.property_cache_hits += 1
+                return method
+        self.property_cache_misses += 1
+        method = lox_class.find_method(expr.name.lexeme)
+        if method is None:
+            raise LoxRuntimeError(expr.name, f"Undefined property {expr.name.lexeme}.")
+        if cache is None:
+            expr.cache = {lox_class: method}
+        elif len(cache) < MAX_CACHED_CLASSES:
+            cache[lox_class] = method
+        return method
 
     def visit_set_expr(self, expr: expr_ast.Set) -> typing.Any:
-        obj = self.evaluate(expr.obj)
+        obj = self.dispatch[expr.obj.kind](expr.obj)
         if not isinstance(obj, LoxInstance):
             raise LoxRuntimeError(expr.name, "Only instances have fields.")
-        value = self.evaluate(expr.value)
+        value = self.dispatch[expr.value.kind](expr.value)
         typing.cast(LoxInstance, obj).set(expr.name, value)
         return value
 
+    def report(self) -> typing.List[str]:
+        return [
+            f"inline caches: property {self.property_cache_hits} hits, "
+            f"{self.property_cache_misses} misses; super {self.super_cache_hits} "
+            f"hits, {self.super_cache_misses} misses",
+            f"bound methods: {self.bound_methods} created, "
+            f"{self.elided_bound_methods} elided by direct calls",
+        ]
+
     def interpret(self, statements: list[Stmt]) -> None:
-        for statement in statements:
-            self.execute(statement)
+        try:
+            for statement in statements:
+                self.execute(statement)
+        finally:
+            self.output.flush()
 
     def interpret_expr(self, expr: Expr) -> str:
         return self.stringify(self.evaluate(expr))
 
-    def execute(self, stmt: Stmt) -> None:
-        stmt.accept(self)
+    def execute(self, stmt: Stmt) -> typing.Any:
+        return self.dispatch[stmt.kind](stmt)
 
     def evaluate(self, expr: Expr) -> typing.Any:
-        return expr.accept(self)
+        return self.dispatch[expr.kind](expr)
 
     def visit_class_stmt(self, stmt: stmt_ast.Class) -> typing.Any:
         superclass = None
         if stmt.superclass is not None:
-            superclass = self.evaluate(stmt.superclass)
+            superclass = self.dispatch[stmt.superclass.kind](stmt.superclass)
             if not isinstance(superclass, LoxClass):
                 raise LoxRuntimeError(
                     stmt.superclass.name, "Superclass must be a class."
                 )
 
-        self.environment.define(stmt.name.lexeme, None)
         if stmt.superclass is not None:
             self.environment = Environment(enclosing=self.environment)
             self.environment.define("super", superclass)
@@ -82,26 +167,37 @@ class Interpreter(expr_ast.ExprVisitor, stmt_ast.StmtVisitor):
         if superclass is not None:
             self.environment = self.environment.enclosing
 
-        self.environment.assign(stmt.name, lox_class)
+        # Nothing can run between declaring the name and creating the class,
+        # so define it only now: locals are defined in slot order.
+        self.environment.define(stmt.name.lexeme, lox_class)
 
         return None
 
+    # A `super` site sees the superclass of one class declaration, so its
+    # inline cache holds a single `(superclass, method)` pair; it only misses
+    # again when the declaration runs again and makes a new class.
     def visit_super_expr(self, expr: expr_ast.Super) -> typing.Any:
-        distance = self.locals[expr]
-        superclass = typing.cast(LoxClass, self.environment.get_at(distance, "super"))
-        obj = typing.cast(LoxInstance, self.environment.get_at(distance - 1, "this"))
+        # `super` and `this` are alone in the scopes the resolver made for them.
+        distance, _ = expr.resolved  # type: ignore[misc]
+        superclass = typing.cast(LoxClass, self.environment.get_at(distance, 0))
+        obj = typing.cast(LoxInstance, self.environment.get_at(distance - 1, 0))
+        cache = expr.cache
+        if cache is not None and cache[0] is superclass:
+            self.super_cache_hits += 1
+            return cache[1].bind(obj)
+        self.super_cache_misses += 1
         method = superclass.find_method(expr.method.lexeme)
         if method is None:
             raise LoxRuntimeError(
                 expr.method, f"Undefined property '{expr.method.lexeme}'."
             )
+        expr.cache = (superclass, method)
         return method.bind(obj)
 
     def visit_return_stmt(self, stmt: stmt_ast.Return) -> typing.Any:
-        value = None
-        if stmt.value is not None:
-            value = self.evaluate(stmt.value)
-        raise Return(value)
+        if stmt.value is None:
+            return NIL_RETURN
+        return (self.dispatch[stmt.value.kind](stmt.value),)
 
     def visit_function_stmt(self, stmt: stmt_ast.Function) -> typing.Any:
         function = LoxFunction(stmt, self.environment, False)
@@ -111,11 +207,40 @@ class Interpreter(expr_ast.ExprVisitor, stmt_ast.StmtVisitor):
     # It stores the callee expression and a list of expressions for the arguments.
     # It also stores the token for the closing parenthesis.
     # We’ll use that token’s location when we report a runtime error caused by a function call.
+    #
+    # A call of a method, `obj.method(...)`, runs the method with `this`
+    # bound by `LoxFunction.call_bound`: no bound function is created for a
+    # value that is used only once. A field of the same name is called
+    # as a value.
     def visit_call_expr(self, expr: expr_ast.Call) -> typing.Any:
-        callee = self.evaluate(expr.callee)
+        callee_expr = expr.callee
+        if type(callee_expr) is expr_ast.Get:
+            obj = self.dispatch[callee_expr.obj.kind](callee_expr.obj)
+            if not isinstance(obj, LoxInstance):
+                raise LoxRuntimeError(
+                    callee_expr.name, "Only instances have properties."
+                )
+            index = obj.shape.slots.get(callee_expr.name.lexeme)
+            if index is not None:
+                callee = obj.values[index]
+            else:
+                method = self.lookup_method(callee_expr, obj.lox_class)
+                args = [self.dispatch[arg.kind](arg) for arg in expr.arguments]
+                if len(args) != method.arity():
+                    raise LoxRuntimeError(
+                        expr.paren,
+                        f"Expected {method.arity()} arguments but got {len(args)}.",
+                    )
+                self.elided_bound_methods += 1
+                try:
+                    return method.call_bound(self, obj, args)
+                except RecursionError:
+                    raise LoxRuntimeError(expr.paren, "Stack overflow.") from None
+        else:
+            callee = self.dispatch[callee_expr.kind](callee_expr)
         arguments: list = []
         for arg in expr.arguments:
-            arguments.append(self.evaluate(arg))
+            arguments.append(self.dispatch[arg.kind](arg))
         if not isinstance(callee, LoxCallable):
             raise LoxRuntimeError(expr.paren, "Can only call functions and classes.")
         if len(arguments) != callee.arity():
@@ -123,60 +248,126 @@ class Interpreter(expr_ast.ExprVisitor, stmt_ast.StmtVisitor):
                 expr.paren,
                 f"Expected {callee.arity()} arguments but got {len(arguments)}.",
             )
-        return callee.call(self, arguments)
+        try:
+            return callee.call(self, arguments)
+        except RecursionError:
+            raise LoxRuntimeError(expr.paren, "Stack overflow.") from None
 
     def visit_logical_expr(self, expr: expr_ast.Logical) -> typing.Any:
-        left = self.evaluate(expr.left)
+        left = self.dispatch[expr.left.kind](expr.left)
         if expr.operator.token_type == TokenType.OR:
             if self.is_truthy(left):
                 return left
         elif expr.operator.token_type == TokenType.AND:
             if not self.is_truthy(left):
                 return left
-        return self.evaluate(expr.right)
+        return self.dispatch[expr.right.kind](expr.right)
 
     def visit_while_stmt(self, stmt: stmt_ast.While) -> typing.Any:
         try:
-            while self.is_truthy(self.evaluate(stmt.condition)):
-                self.execute(stmt.body)
+            while self.is_truthy(self.dispatch[stmt.condition.kind](stmt.condition)):
+                completion = self.dispatch[stmt.body.kind](stmt.body)
+                if completion is not None:
+                    return None if completion is BREAK else completion
         except BreakException:
             pass  # Do nothing.
+        return None
+
+    # The loop variable lives in one environment for the whole loop, so
+    # closures created in the body share it, as with the classic desugaring
+    # into `while`. Only a block body gets a fresh environment per iteration.
+    def visit_for_stmt(self, stmt: stmt_ast.For) -> typing.Any:
+        previous = self.environment
+        base = stmt.inline_base
+        if base is None:
+            self.scope_environments += 1
+            self.environment = Environment(previous)
+        else:
+            self.avoided_environments += 1
+        dispatch = self.dispatch
+        initializer, condition = stmt.initializer, stmt.condition
+        increment, body = stmt.increment, stmt.body
+        try:
+            if initializer is not None:
+                dispatch[initializer.kind](initializer)
+            while condition is None or self.is_truthy(
+                dispatch[condition.kind](condition)
+            ):
+                completion = dispatch[body.kind](body)
+                if completion is not None:
+                    return None if completion is BREAK else completion
+                if increment is not None:
+                    dispatch[increment.kind](increment)
+        except BreakException:
+            pass  # Do nothing.
+        finally:
+            self.environment = previous
+            if base is not None and base != NO_VARIABLES:
+                del previous.values[base:]
+        return None
 
     def visit_break_stmt(self, stmt) -> typing.Any:
-        raise BreakException()
+        return BREAK
 
     def visit_if_stmt(self, stmt: stmt_ast.If) -> typing.Any:
-        if self.is_truthy(self.evaluate(stmt.condition)):
-            self.execute(stmt.then_branch)
+        if self.is_truthy(self.dispatch[stmt.condition.kind](stmt.condition)):
+            return self.dispatch[stmt.then_branch.kind](stmt.then_branch)
         elif stmt.else_branch is not None:
-            self.execute(stmt.else_branch)
+            return self.dispatch[stmt.else_branch.kind](stmt.else_branch)
         return None
 
     def visit_block_stmt(self, stmt: stmt_ast.Block) -> typing.Any:
-        self.execute_block(stmt.statements, Environment(self.environment))
+        base = stmt.inline_base
+        if base is None:
+            self.scope_environments += 1
+            return self.execute_block(stmt.statements, Environment(self.environment))
+
+        self.avoided_environments += 1
+        dispatch = self.dispatch
+        if base == NO_VARIABLES:
+            for statement in stmt.statements:
+                completion = dispatch[statement.kind](statement)
+                if completion is not None:
+                    return completion
+            return None
+        # The variables live in the current environment from `base` on and
+        # go away with the block, so the slots can be used again.
+        values = self.environment.values
+        try:
+            for statement in stmt.statements:
+                completion = dispatch[statement.kind](statement)
+                if completion is not None:
+                    return completion
+        finally:
+            del values[base:]
         return None
 
-    def execute_block(self, statements: typing.List[Stmt], env: Environment) -> None:
+    def execute_block(
+        self, statements: typing.List[Stmt], env: Environment
+    ) -> typing.Any:
         previous = self.environment
         try:
             self.environment = env
             for stmt in statements:
-                self.execute(stmt)
+                completion = self.dispatch[stmt.kind](stmt)
+                if completion is not None:
+                    return completion
         finally:
             self.environment = previous
+        return None
 
     def visit_var_stmt(self, stmt: stmt_ast.Var) -> typing.Any:
         value: typing.Any = None
         if stmt.initializer is not None:
-            value = self.evaluate(stmt.initializer)
+            value = self.dispatch[stmt.initializer.kind](stmt.initializer)
         self.environment.define(stmt.name.lexeme, value)
         return None
 
     def visit_assign_expr(self, expr: expr_ast.Assign) -> typing.Any:
-        value = self.evaluate(expr.value)
-        distance = self.locals.get(expr)
-        if distance is not None:
-            self.environment.assign_at(distance, expr.name, value)
+        value = self.dispatch[expr.value.kind](expr.value)
+        resolved = expr.resolved
+        if resolved is not None:
+            self.environment.assign_at(resolved[0], resolved[1], value)
         else:
             self.globals.assign(expr.name, value)
         return value
@@ -185,29 +376,35 @@ class Interpreter(expr_ast.ExprVisitor, stmt_ast.StmtVisitor):
         return self.lookup_variable(expr.name, expr)
 
     def lookup_variable(self, name: Token, expr: Expr) -> typing.Any:
-        distance = self.locals.get(expr)
-        if distance is not None:
-            return self.environment.get_at(distance, name.lexeme)
+        resolved = expr.resolved  # type: ignore[attr-defined]
+        if resolved is not None:
+            # `Environment.get_at`, inlined: this is the hottest path there is.
+            distance, slot = resolved
+            env = self.environment
+            while distance:
+                env = env.enclosing  # type: ignore
+                distance -= 1
+            return env.values[slot]
         else:
             return self.globals.get(name)
 
     def visit_expression_stmt(self, stmt: stmt_ast.Expression) -> typing.Any:
-        self.evaluate(stmt.expression)
+        self.dispatch[stmt.expression.kind](stmt.expression)
         return None
 
     def visit_print_stmt(self, stmt: stmt_ast.Print) -> typing.Any:
-        value = self.evaluate(stmt.expression)
-        print(self.stringify(value))
+        value = self.dispatch[stmt.expression.kind](stmt.expression)
+        self.output.write_line(self.stringify(value))
         return None
 
     def visit_literal_expr(self, expr: expr_ast.Literal) -> typing.Any:
         return expr.value
 
     def visit_grouping_expr(self, expr: expr_ast.Grouping) -> typing.Any:
-        return self.evaluate(expr.expression)
+        return self.dispatch[expr.expression.kind](expr.expression)
 
     def visit_unary_expr(self, expr: expr_ast.Unary) -> typing.Any:
-        right = self.evaluate(expr.right)
+        right = self.dispatch[expr.right.kind](expr.right)
 
         match expr.operator.token_type:
             case TokenType.MINUS:
@@ -219,8 +416,8 @@ class Interpreter(expr_ast.ExprVisitor, stmt_ast.StmtVisitor):
                 return None  # Fallback case
 
     def visit_binary_expr(self, expr: expr_ast.Binary) -> typing.Any:
-        left = self.evaluate(expr.left)
-        right = self.evaluate(expr.right)
+        left = self.dispatch[expr.left.kind](expr.left)
+        right = self.dispatch[expr.right.kind](expr.right)
 
         # print(f"Operator: {expr.operator.token_type}, Expected: {TokenType.PLUS}")
         # print(f"ID of expr.operator.token_type: {id(expr.operator.token_type)}")
@@ -266,8 +463,8 @@ class Interpreter(expr_ast.ExprVisitor, stmt_ast.StmtVisitor):
                 if self.is_number(left) and self.is_number(right):
                     return float(left) + float(right)
 
-                if type(left) is str or type(right) is str:
-                    return self.stringify(left) + self.stringify(right)
+                if type(left) in STRING_TYPES or type(right) in STRING_TYPES:
+                    return self.concatenate(left, right)
 
                 raise LoxRuntimeError(
                     expr.operator,
@@ -300,6 +497,16 @@ class Interpreter(expr_ast.ExprVisitor, stmt_ast.StmtVisitor):
             return
         raise LoxRuntimeError(op, "Operands must be a numbers.")
 
+    # `+` with a string on either side; the other operand is converted to its
+    # text as `print` would show it.
+    @staticmethod
+    def concatenate(left: typing.Any, right: typing.Any) -> typing.Any:
+        if type(left) not in STRING_TYPES:
+            left = Interpreter.stringify(left)
+        if type(right) not in STRING_TYPES:
+            right = Interpreter.stringify(right)
+        return concat(left, right)
+
     @staticmethod
     def stringify(value: typing.Any) -> str:
         if value is None:
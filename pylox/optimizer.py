@@ -0,0 +1,209 @@
+import typing
+
+import pylox.expr as expr_ast
+import pylox.stmt as stmt_ast
+from pylox.error import LoxRuntimeError
+from pylox.expr import Expr
+from pylox.interpreter import Interpreter
+from pylox.rope import Rope
+from pylox.stmt import Stmt
+from pylox.tokens import TokenType
+
+
+# Simplifies a resolved program before it runs:
+# - `Binary`, `Unary` and `Logical` expressions over literals become literals,
+#   and groupings are dropped since the tree already encodes precedence,
+# - `If`, `While` and `For` statements with a constant condition lose the
+#   branch that can never run, and expression statements without effect
+#   disappear.
+# Operators are evaluated with the interpreter's own visit methods, so folding
+# can't change semantics. An operation that fails (dividing by zero, negating
+# a string) is left in place to report its error at runtime.
+#
+# The tree is rewritten in place; nodes that stay keep their identity, so the
+# resolution the resolver stored on them remains valid.
+class Optimizer(expr_ast.ExprVisitor, stmt_ast.StmtVisitor):
+    def __init__(self):
+        self.evaluator = Interpreter()
+        self.dispatch = expr_ast.expr_dispatch_table(
+            self
+        ) + stmt_ast.stmt_dispatch_table(self)
+        # Expression nodes replaced by something simpler.
+        self.folded: int = 0
+        # Statements and branches removed as dead code.
+        self.pruned: int = 0
+
+    def optimize(self, statements: typing.List[Stmt]) -> typing.List[Stmt]:
+        result = []
+        for statement in statements:
+            optimized = self.dispatch[statement.kind](statement)
+            if optimized is not None:
+                result.append(optimized)
+        return result
+
+    # Statements can't simply vanish from a branch or a loop body.
+    def optimize_branch(self, stmt: Stmt) -> Stmt:
+        optimized = self.dispatch[stmt.kind](stmt)
+        return stmt_ast.Block([]) if optimized is None else optimized
+
+    def optimize_expr(self, expr: Expr) -> Expr:
+        return self.dispatch[expr.kind](expr)
+
+    def fold(self, expr: Expr) -> Expr:
+        try:
+            value = self.evaluator.evaluate(expr)
+        except LoxRuntimeError:
+            return expr
+        self.folded += 1
+        # A literal's value is saved with the compiled program.
+        if type(value) is Rope:
+            value = str(value)
+        return expr_ast.Literal(value)
+
+    def visit_assign_expr(self, expr: expr_ast.Assign) -> typing.Any:
+        expr.value = self.optimize_expr(expr.value)
+        return expr
+
+    def visit_binary_expr(self, expr: expr_ast.Binary) -> typing.Any:
+        expr.left = self.optimize_expr(expr.left)
+        expr.right = self.optimize_expr(expr.right)
+        if isinstance(expr.left, expr_ast.Literal) and isinstance(
+            expr.right, expr_ast.Literal
+        ):
+            return self.fold(expr)
+        return expr
+
+    def visit_grouping_expr(self, expr: expr_ast.Grouping) -> typing.Any:
+        self.folded += 1
+        return self.optimize_expr(expr.expression)
+
+    def visit_literal_expr(self, expr: expr_ast.Literal) -> typing.Any:
+        return expr
+
+    # `false or x` is `x` and `true or x` is `true`, whatever `x` is;
+    # the same goes for `and` the other way around.
+    def visit_logical_expr(self, expr: expr_ast.Logical) -> typing.Any:
+        expr.left = self.optimize_expr(expr.left)
+        expr.right = self.optimize_expr(expr.right)
+        if not isinstance(expr.left, expr_ast.Literal):
+            return expr
+
+        self.folded += 1
+        truthy = Interpreter.is_truthy(expr.left.value)
+        if expr.operator.token_type == TokenType.OR:
+            return expr.left if truthy else expr.right
+        return expr.right if truthy else expr.left
+
+    def visit_unary_expr(self, expr: expr_ast.Unary) -> typing.Any:
+        expr.right = self.optimize_expr(expr.right)
+        if isinstance(expr.right, expr_ast.Literal):
+            return self.fold(expr)
+        return expr
+
+    def visit_variable_expr(self, expr: expr_ast.Variable) -> typing.Any:
+        return expr
+
+    def visit_call_expr(self, expr: expr_ast.Call) -> typing.Any:
+        expr.callee = self.optimize_expr(expr.callee)
+        expr.arguments = [self.optimize_expr(arg) for arg in expr.arguments]
+        return expr
+
+    def visit_get_expr(self, expr: expr_ast.Get) -> typing.Any:
+        expr.obj = self.optimize_expr(expr.obj)
+        return expr
+
+    def visit_set_expr(self, expr: expr_ast.Set) -> typing.Any:
+        expr.obj = self.optimize_expr(expr.obj)
+        expr.value = self.optimize_expr(expr.value)
+        return expr
+
+    def visit_this_expr(self, expr: expr_ast.This) -> typing.Any:
+        return expr
+
+    def visit_super_expr(self, expr: expr_ast.Super) -> typing.Any:
+        return expr
+
+    def visit_if_stmt(self, stmt: stmt_ast.If) -> typing.Any:
+        stmt.condition = self.optimize_expr(stmt.condition)
+        if not isinstance(stmt.condition, expr_ast.Literal):
+            stmt.then_branch = self.optimize_branch(stmt.then_branch)
+            if stmt.else_branch is not None:
+                stmt.else_branch = self.optimize_branch(stmt.else_branch)
+            return stmt
+
+        self.pruned += 1
+        if Interpreter.is_truthy(stmt.condition.value):
+            return self.dispatch[stmt.then_branch.kind](stmt.then_branch)
+        if stmt.else_branch is not None:
+            return self.dispatch[stmt.else_branch.kind](stmt.else_branch)
+        return None
+
+    def visit_block_stmt(self, stmt: stmt_ast.Block) -> typing.Any:
+        stmt.statements = self.optimize(stmt.statements)
+        return stmt
+
+    def visit_expression_stmt(self, stmt: stmt_ast.Expression) -> typing.Any:
+        stmt.expression = self.optimize_expr(stmt.expression)
+        if isinstance(stmt.expression, expr_ast.Literal):
+            self.pruned += 1
+            return None
+        return stmt
+
+    def visit_print_stmt(self, stmt: stmt_ast.Print) -> typing.Any:
+        stmt.expression = self.optimize_expr(stmt.expression)
+        return stmt
+
+    def visit_var_stmt(self, stmt: stmt_ast.Var) -> typing.Any:
+        if stmt.initializer is not None:
+            stmt.initializer = self.optimize_expr(stmt.initializer)
+        return stmt
+
+    def visit_while_stmt(self, stmt: stmt_ast.While) -> typing.Any:
+        stmt.condition = self.optimize_expr(stmt.condition)
+        if isinstance(stmt.condition, expr_ast.Literal) and not Interpreter.is_truthy(
+            stmt.condition.value
+        ):
+            self.pruned += 1
+            return None
+        stmt.body = self.optimize_branch(stmt.body)
+        return stmt
+
+    def visit_for_stmt(self, stmt: stmt_ast.For) -> typing.Any:
+        if stmt.initializer is not None:
+            stmt.initializer = self.dispatch[stmt.initializer.kind](stmt.initializer)
+        if stmt.condition is not None:
+            stmt.condition = self.optimize_expr(stmt.condition)
+            if isinstance(stmt.condition, expr_ast.Literal):
+                if not Interpreter.is_truthy(stmt.condition.value):
+                    # Only the initializer runs. The loop stays to keep its
+                    # scope, which the resolver may have laid out inline.
+                    self.pruned += 1
+                    if stmt.initializer is None:
+                        return None
+                    stmt.increment = None
+                    stmt.body = stmt_ast.Block([])
+                    return stmt
+                stmt.condition = None
+        if stmt.increment is not None:
+            stmt.increment = self.optimize_expr(stmt.increment)
+            if isinstance(stmt.increment, expr_ast.Literal):
+                stmt.increment = None
+        stmt.body = self.optimize_branch(stmt.body)
+        return stmt
+
+    def visit_break_stmt(self, stmt: stmt_ast.Break) -> typing.Any:
+        return stmt
+
+    def visit_function_stmt(self, stmt: stmt_ast.Function) -> typing.Any:
+        stmt.body = self.optimize(stmt.body)
+        return stmt
+
+    def visit_return_stmt(self, stmt: stmt_ast.Return) -> typing.Any:
+        if stmt.value is not None:
+            stmt.value = self.optimize_expr(stmt.value)
+        return stmt
+
+    def visit_class_stmt(self, stmt: stmt_ast.Class) -> typing.Any:
+        for method in stmt.methods:
+            self.visit_function_stmt(method)
+        return stmt
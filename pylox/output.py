@@ -0,0 +1,84 @@
+import sys
+import typing
+from abc import ABC, abstractmethod
+from enum import Enum
+
+# Characters a buffered sink holds before writing them out.
+BUFFER_SIZE = 64 * 1024
+
+
+# Where the lines of Lox `print` statements go. Engines flush their sink when
+# a run ends, so buffered output is out before errors and reports are.
+class OutputSink(ABC):
+    @abstractmethod
+    def write_line(self, text: str) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+
+class FlushPolicy(str, Enum):
+    # After every line.
+    LINE = "line"
+    # Once `BUFFER_SIZE` characters are waiting, and at the end of a run.
+    BUFFERED = "buffered"
+    # By line on a terminal, buffered otherwise.
+    AUTO = "auto"
+
+
+# Writes to a text stream, `sys.stdout` as it is at the time of writing if
+# none is given. Buffered lines go out in a single `write`.
+class StreamSink(OutputSink):
+    def __init__(
+        self,
+        stream: typing.Optional[typing.TextIO] = None,
+        policy: FlushPolicy = FlushPolicy.AUTO,
+        buffer_size: int = BUFFER_SIZE,
+    ) -> None:
+        self.stream = stream
+        if policy == FlushPolicy.AUTO:
+            policy = (
+                FlushPolicy.LINE if self.target().isatty() else FlushPolicy.BUFFERED
+            )
+        self.limit = 0 if policy == FlushPolicy.LINE else buffer_size
+        self.pending: typing.List[str] = []
+        self.size = 0
+
+    def target(self) -> typing.TextIO:
+        return sys.stdout if self.stream is None else self.stream
+
+    def write_line(self, text: str) -> None:
+        self.pending.append(text)
+        self.size += len(text) + 1
+        if self.size > self.limit:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        pending = self.pending
+        self.pending = []
+        self.size = 0
+        stream = self.target()
+        pending.append("")
+        stream.write("\n".join(pending))
+        stream.flush()
+
+
+# Keeps the lines, for embedding the interpreter and for tests.
+class CaptureSink(OutputSink):
+    def __init__(self) -> None:
+        self.lines: typing.List[str] = []
+
+    def write_line(self, text: str) -> None:
+        self.lines.append(text)
+
+    def getvalue(self) -> str:
+        return "".join(line + "\n" for line in self.lines)
+
+
+# Drops everything, so benchmarks measure the engine rather than the I/O.
+class NullSink(OutputSink):
+    def write_line(self, text: str) -> None:
+        pass
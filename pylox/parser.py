@@ -1,4 +1,4 @@
-from typing import List, Optional, Callable, cast
+from typing import Iterable, Iterator, Optional, Callable, cast
 from pylox.tokens import Token, TokenType
 from pylox.expr import Expr
 import pylox.expr as expr_ast
@@ -9,12 +9,16 @@ import typing
 
 
 # recursive descent, top-down parser
+# Tokens are pulled one at a time from any iterable (a list or a lazy scanner);
+# the grammar is LL(1), so the parser only buffers the current and the
+# previous token instead of indexing into the whole token list.
 class Parser:
     def __init__(
-        self, tokens: List[Token], report_error: Optional[Callable] = None
+        self, tokens: Iterable[Token], report_error: Optional[Callable] = None
     ) -> None:
-        self.tokens = tokens
-        self.current = 0
+        self.tokens: Iterator[Token] = iter(tokens)
+        self.current_token: Token = next(self.tokens)
+        self.previous_token: Optional[Token] = None
         self.errors = []
         self.report_error = report_error
         self.allow_expressions = False
@@ -175,18 +179,7 @@ class Parser:
         try:
             self.loop_depth += 1
             body = self.statement()
-
-            if increment is not None:
-                body = stmt_ast.Block([body, stmt_ast.Expression(increment)])
-
-            if condition is None:
-                condition = expr_ast.Literal(True)
-
-            result: stmt_ast.While | stmt_ast.Block = stmt_ast.While(condition, body)
-            if initializer is not None:
-                result = stmt_ast.Block([initializer, result])
-
-            return result
+            return stmt_ast.For(initializer, condition, increment, body)
         finally:
             self.loop_depth -= 1
 
@@ -455,17 +448,18 @@ class Parser:
 
     def advance(self) -> Token:
         if not self.is_at_end():
-            self.current += 1
+            self.previous_token = self.current_token
+            self.current_token = next(self.tokens)
         return self.previous()
 
     def is_at_end(self) -> bool:
-        return self.peek().token_type == TokenType.EOF
+        return self.current_token.token_type == TokenType.EOF
 
     def peek(self) -> Token:
-        return self.tokens[self.current]
+        return self.current_token
 
     def previous(self) -> Token:
-        return self.tokens[self.current - 1]
+        return cast(Token, self.previous_token)
 
     # error handling
     def consume(self, token_type: TokenType, message: str) -> Token:
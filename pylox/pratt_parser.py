@@ -0,0 +1,115 @@
+from enum import IntEnum
+
+import pylox.expr as expr_ast
+from pylox.expr import Expr
+from pylox.parser import Parser
+from pylox.tokens import TokenType
+
+
+class Precedence(IntEnum):
+    NONE = 0
+    ASSIGNMENT = 1  # =
+    OR = 2  # or
+    AND = 3  # and
+    EQUALITY = 4  # == !=
+    COMPARISON = 5  # < > <= >=
+    TERM = 6  # + -
+    FACTOR = 7  # * /
+    UNARY = 8  # ! -
+    CALL = 9  # . ()
+
+
+# Binding power of every binary operator; all of them are left-associative.
+INFIX_PRECEDENCE: dict[TokenType, Precedence] = {
+    TokenType.OR: Precedence.OR,
+    TokenType.AND: Precedence.AND,
+    TokenType.BANG_EQUAL: Precedence.EQUALITY,
+    TokenType.EQUAL_EQUAL: Precedence.EQUALITY,
+    TokenType.GREATER: Precedence.COMPARISON,
+    TokenType.GREATER_EQUAL: Precedence.COMPARISON,
+    TokenType.LESS: Precedence.COMPARISON,
+    TokenType.LESS_EQUAL: Precedence.COMPARISON,
+    TokenType.MINUS: Precedence.TERM,
+    TokenType.PLUS: Precedence.TERM,
+    TokenType.SLASH: Precedence.FACTOR,
+    TokenType.STAR: Precedence.FACTOR,
+}
+
+LOGICAL_OPERATORS = frozenset((TokenType.OR, TokenType.AND))
+
+
+# Pratt (precedence climbing) parser for expressions.
+# The `logic_or` ... `factor` levels of the grammar collapse into one loop
+# over `INFIX_PRECEDENCE`, and prefix/postfix positions dispatch on the current
+# token type directly instead of trying `match()` for every alternative.
+# Statements and the rare `primary` cases are shared with `Parser`, so the
+# trees and error messages are identical.
+class PrattParser(Parser):
+    def parse_precedence(self, precedence: Precedence) -> Expr:
+        expr = self.unary()
+        while True:
+            token_type = self.current_token.token_type
+            infix = INFIX_PRECEDENCE.get(token_type)
+            if infix is None or infix < precedence:
+                return expr
+
+            op = self.advance()
+            right = self.parse_precedence(infix + 1)  # type: ignore[arg-type]
+            if token_type in LOGICAL_OPERATORS:
+                expr = expr_ast.Logical(expr, op, right)
+            else:
+                expr = expr_ast.Binary(expr, op, right)
+
+    def unary(self) -> Expr:
+        token_type = self.current_token.token_type
+        if token_type is TokenType.BANG or token_type is TokenType.MINUS:
+            op = self.advance()
+            return expr_ast.Unary(op, self.unary())
+        return self.call()
+
+    def call(self) -> Expr:
+        expr = self.primary()
+        while True:
+            token_type = self.current_token.token_type
+            if token_type is TokenType.LEFT_PAREN:
+                self.advance()
+                expr = self.parse_arguments(expr)
+            elif token_type is TokenType.DOT:
+                self.advance()
+                name = self.consume(
+                    TokenType.IDENTIFIER, "Expect property name after '.'."
+                )
+                expr = expr_ast.Get(expr, name)
+            else:
+                return expr
+
+    def primary(self) -> Expr:
+        token = self.current_token
+        token_type = token.token_type
+        if token_type is TokenType.IDENTIFIER:
+            self.advance()
+            return expr_ast.Variable(token)
+        if token_type is TokenType.NUMBER or token_type is TokenType.STRING:
+            self.advance()
+            return expr_ast.Literal(token.literal)
+        return super().primary()
+
+    # The grammar levels stay available under their usual names: `assignment`
+    # and the error recovery in `primary` call them.
+    def or_expression(self) -> Expr:
+        return self.parse_precedence(Precedence.OR)
+
+    def and_expression(self) -> Expr:
+        return self.parse_precedence(Precedence.AND)
+
+    def equality(self) -> Expr:
+        return self.parse_precedence(Precedence.EQUALITY)
+
+    def comparison(self) -> Expr:
+        return self.parse_precedence(Precedence.COMPARISON)
+
+    def term(self) -> Expr:
+        return self.parse_precedence(Precedence.TERM)
+
+    def factor(self) -> Expr:
+        return self.parse_precedence(Precedence.FACTOR)
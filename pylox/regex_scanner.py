@@ -0,0 +1,316 @@
+import mmap
+import os
+import re
+from typing import Iterator, List, Tuple
+
+from pylox.error import LoxSyntaxError
+from pylox.scanner import Scanner
+from pylox.token_buffer import TokenBuffer
+from pylox.tokens import Token, TokenType
+
+
+# One master pattern for the whole lexical grammar.
+# Whitespace, newlines and line comments are skipped by an atomic group so the
+# engine never backtracks into them; every alternative after it is anchored at
+# the current position, and ERROR/END guarantee that a match always exists,
+# so `finditer` never silently jumps over input.
+_TOKEN_PATTERN = re.compile(
+    r"""
+    (?>(?:[ \t\r\n]+|//[^\n]*)*)
+    (?:
+        (?P<NUMBER>[0-9]+(?:\.[0-9]+)?)
+      | (?P<IDENTIFIER>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<STRING>"[^"]*")
+      | (?P<BLOCK_COMMENT>/\*)
+      | (?P<OPERATOR>[!=<>]=?|[(){},.\-+;*/])
+      | (?P<UNTERMINATED_STRING>")
+      | (?P<END>\Z)
+      | (?P<ERROR>.)
+    )
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# The same grammar over raw bytes, so memory-mapped files can be scanned
+# without decoding them into one big string first.
+_BYTES_TOKEN_PATTERN = re.compile(
+    _TOKEN_PATTERN.pattern.encode("ascii"), _TOKEN_PATTERN.flags & ~re.UNICODE
+)
+
+_NUMBER = _TOKEN_PATTERN.groupindex["NUMBER"]
+_IDENTIFIER = _TOKEN_PATTERN.groupindex["IDENTIFIER"]
+_STRING = _TOKEN_PATTERN.groupindex["STRING"]
+_BLOCK_COMMENT = _TOKEN_PATTERN.groupindex["BLOCK_COMMENT"]
+_OPERATOR = _TOKEN_PATTERN.groupindex["OPERATOR"]
+_UNTERMINATED_STRING = _TOKEN_PATTERN.groupindex["UNTERMINATED_STRING"]
+_END = _TOKEN_PATTERN.groupindex["END"]
+
+_OPERATORS: dict[str, TokenType] = {
+    "(": TokenType.LEFT_PAREN,
+    ")": TokenType.RIGHT_PAREN,
+    "{": TokenType.LEFT_BRACE,
+    "}": TokenType.RIGHT_BRACE,
+    ",": TokenType.COMMA,
+    ".": TokenType.DOT,
+    "-": TokenType.MINUS,
+    "+": TokenType.PLUS,
+    ";": TokenType.SEMICOLON,
+    "/": TokenType.SLASH,
+    "*": TokenType.STAR,
+    "!": TokenType.BANG,
+    "!=": TokenType.BANG_EQUAL,
+    "=": TokenType.EQUAL,
+    "==": TokenType.EQUAL_EQUAL,
+    ">": TokenType.GREATER,
+    ">=": TokenType.GREATER_EQUAL,
+    "<": TokenType.LESS,
+    "<=": TokenType.LESS_EQUAL,
+}
+
+
+# table-driven scanner: produces the same tokens, lines and errors as `Scanner`,
+# but lets the regex engine do the character-level work
+class RegexScanner:
+    keywords: dict[str, TokenType] = Scanner.keywords
+
+    def __init__(self, source: str):
+        self.source: str = source
+        self.tokens: List[Token] = []
+        self.line: int = 1
+        # Lines are counted lazily: `line` is the line number at `line_pos`.
+        self.line_pos: int = 0
+
+    def scan_tokens(self) -> List[Token]:
+        source = self.source
+        tokens = self.tokens
+        append = tokens.append
+        keywords = self.keywords
+        operators = _OPERATORS
+        count = source.count
+        identifier = TokenType.IDENTIFIER
+        number = TokenType.NUMBER
+        string = TokenType.STRING
+        line = self.line
+        line_pos = self.line_pos
+
+        pos = 0
+        while True:
+            for m in _TOKEN_PATTERN.finditer(source, pos):
+                kind = m.lastindex
+                end = m.end()
+                line += count("\n", line_pos, end)
+                line_pos = end
+
+                if kind == _OPERATOR:
+                    text = m[kind]
+                    append(Token(operators[text], text, None, line))
+                elif kind == _IDENTIFIER:
+                    text = m[kind]
+                    append(Token(keywords.get(text, identifier), text, None, line))
+                elif kind == _NUMBER:
+                    text = m[kind]
+                    value = float(text) if "." in text else int(text)
+                    append(Token(number, text, value, line))
+                elif kind == _STRING:
+                    text = m[kind]
+                    append(Token(string, text, text[1:-1], line))
+                else:
+                    self.line, self.line_pos = line, line_pos
+                    if kind == _BLOCK_COMMENT:
+                        # Nested comments are not regular, so skip them by hand
+                        # and restart the scan right after the closing "*/".
+                        pos = self.block_comment(end)
+                        break
+                    if kind == _END:
+                        append(Token(TokenType.EOF, "", None, line))
+                        return tokens
+                    if kind == _UNTERMINATED_STRING:
+                        self.advance_line(len(source))
+                        raise LoxSyntaxError(self.line, "Unterminated string.")
+                    raise LoxSyntaxError(self.line, "Unexpected character.")
+
+    # Lazily yields `(token, start, end)` starting at `pos`, which must not be
+    # inside a token, string or comment; `line` and `line_pos` must describe it.
+    def scan_spans(self, pos: int = 0) -> Iterator[Tuple[Token, int, int]]:
+        source = self.source
+        keywords = self.keywords
+        operators = _OPERATORS
+        identifier = TokenType.IDENTIFIER
+
+        while True:
+            for m in _TOKEN_PATTERN.finditer(source, pos):
+                kind = m.lastindex
+                end = m.end()
+                self.advance_line(end)
+
+                if kind == _OPERATOR:
+                    text = m[kind]
+                    token = Token(operators[text], text, None, self.line)
+                elif kind == _IDENTIFIER:
+                    text = m[kind]
+                    token = Token(keywords.get(text, identifier), text, None, self.line)
+                elif kind == _NUMBER:
+                    text = m[kind]
+                    value = float(text) if "." in text else int(text)
+                    token = Token(TokenType.NUMBER, text, value, self.line)
+                elif kind == _STRING:
+                    text = m[kind]
+                    token = Token(TokenType.STRING, text, text[1:-1], self.line)
+                elif kind == _BLOCK_COMMENT:
+                    pos = self.block_comment(end)
+                    break
+                elif kind == _END:
+                    yield Token(TokenType.EOF, "", None, self.line), end, end
+                    return
+                elif kind == _UNTERMINATED_STRING:
+                    self.advance_line(len(source))
+                    raise LoxSyntaxError(self.line, "Unterminated string.")
+                else:
+                    raise LoxSyntaxError(self.line, "Unexpected character.")
+                yield token, m.start(kind), end
+
+    def advance_line(self, pos: int) -> None:
+        self.line += self.source.count("\n", self.line_pos, pos)
+        self.line_pos = pos
+
+    # Returns the position right after the comment that was opened before `pos`.
+    def block_comment(self, pos: int) -> int:
+        source = self.source
+        depth: int = 1
+
+        while depth != 0:
+            close = source.find("*/", pos)
+            if close == -1:
+                self.advance_line(len(source))
+                raise LoxSyntaxError(self.line, "Unterminated block comment.")
+
+            nested = source.find("/*", pos, close + 1)
+            if nested != -1:
+                depth += 1
+                pos = nested + 2
+            else:
+                depth -= 1
+                pos = close + 2
+
+        return pos
+
+
+# compact scanner: same scan as `RegexScanner`, but records each token as
+# offsets in a `TokenBuffer` instead of allocating a `Token`
+class CompactScanner(RegexScanner):
+    def scan_tokens(self) -> TokenBuffer:  # type: ignore[override]
+        source = self.source
+        buffer = TokenBuffer(source)
+        append = buffer.append
+        keywords = self.keywords
+        operators = _OPERATORS
+        count = source.count
+        identifier = TokenType.IDENTIFIER
+        line = self.line
+        line_pos = self.line_pos
+
+        pos = 0
+        while True:
+            for m in _TOKEN_PATTERN.finditer(source, pos):
+                kind = m.lastindex
+                end = m.end()
+                line += count("\n", line_pos, end)
+                line_pos = end
+
+                if kind == _OPERATOR:
+                    append(operators[m[kind]], m.start(kind), end, line)
+                elif kind == _IDENTIFIER:
+                    token_type = keywords.get(m[kind], identifier)
+                    append(token_type, m.start(kind), end, line)
+                elif kind == _NUMBER:
+                    append(TokenType.NUMBER, m.start(kind), end, line)
+                elif kind == _STRING:
+                    append(TokenType.STRING, m.start(kind), end, line)
+                else:
+                    self.line, self.line_pos = line, line_pos
+                    if kind == _BLOCK_COMMENT:
+                        pos = self.block_comment(end)
+                        break
+                    if kind == _END:
+                        append(TokenType.EOF, end, end, line)
+                        return buffer
+                    if kind == _UNTERMINATED_STRING:
+                        self.advance_line(len(source))
+                        raise LoxSyntaxError(self.line, "Unterminated string.")
+                    raise LoxSyntaxError(self.line, "Unexpected character.")
+
+
+# streaming scanner: maps the file into memory and yields tokens lazily, so only
+# the tokens the parser still needs are alive at any time
+class StreamScanner:
+    keywords: dict[str, TokenType] = Scanner.keywords
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self.line: int = 1
+
+    def scan_tokens(self) -> Iterator[Token]:
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # Empty files can't be memory-mapped.
+                yield Token(TokenType.EOF, "", None, self.line)
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                yield from self.scan_buffer(buffer)
+
+    def scan_buffer(self, buffer) -> Iterator[Token]:
+        keywords = self.keywords
+        operators = _OPERATORS
+        identifier = TokenType.IDENTIFIER
+
+        pos = 0
+        while True:
+            for m in _BYTES_TOKEN_PATTERN.finditer(buffer, pos):
+                kind = m.lastindex
+                self.line += m[0].count(b"\n")
+
+                if kind == _OPERATOR:
+                    text = m[kind].decode()
+                    yield Token(operators[text], text, None, self.line)
+                elif kind == _IDENTIFIER:
+                    text = m[kind].decode()
+                    yield Token(keywords.get(text, identifier), text, None, self.line)
+                elif kind == _NUMBER:
+                    text = m[kind].decode()
+                    value = float(text) if "." in text else int(text)
+                    yield Token(TokenType.NUMBER, text, value, self.line)
+                elif kind == _STRING:
+                    text = m[kind].decode("utf-8")
+                    yield Token(TokenType.STRING, text, text[1:-1], self.line)
+                elif kind == _BLOCK_COMMENT:
+                    pos = self.block_comment(buffer, m.end())
+                    break
+                elif kind == _END:
+                    yield Token(TokenType.EOF, "", None, self.line)
+                    return
+                elif kind == _UNTERMINATED_STRING:
+                    self.line += buffer[m.end() :].count(b"\n")
+                    raise LoxSyntaxError(self.line, "Unterminated string.")
+                else:
+                    raise LoxSyntaxError(self.line, "Unexpected character.")
+
+    def block_comment(self, buffer, pos: int) -> int:
+        depth: int = 1
+        start = pos
+
+        while depth != 0:
+            close = buffer.find(b"*/", pos)
+            if close == -1:
+                self.line += buffer[start:].count(b"\n")
+                raise LoxSyntaxError(self.line, "Unterminated block comment.")
+
+            nested = buffer.find(b"/*", pos, close + 1)
+            if nested != -1:
+                depth += 1
+                pos = nested + 2
+            else:
+                depth -= 1
+                pos = close + 2
+
+        self.line += buffer[start:pos].count(b"\n")
+        return pos
@@ -17,12 +17,14 @@ from pylox.expr import (
     This,
     Unary,
     Variable,
+    expr_dispatch_table,
 )
-from pylox.interpreter import Interpreter
+from pylox.interpreter import NO_VARIABLES, Interpreter
 from pylox.stmt import (
     Block,
     Class,
     Expression,
+    For,
     Function,
     If,
     Print,
@@ -31,6 +33,7 @@ from pylox.stmt import (
     StmtVisitor,
     Var,
     While,
+    stmt_dispatch_table,
 )
 from pylox.tokens import Token
 
@@ -48,12 +51,67 @@ class ClassType(Enum):
     SUBCLASS = auto()
 
 
+# A local scope, as far as the escape analysis is concerned.
+class Scope:
+    __slots__ = (
+        "parent",
+        "node",
+        "function",
+        "slots",
+        "declared_before",
+        "captured",
+        "materialized",
+        "level",
+        "base",
+    )
+
+    def __init__(
+        self, parent: typing.Optional["Scope"], node: typing.Optional[Stmt], function
+    ) -> None:
+        self.parent = parent
+        # The `Block` or `For` statement that opened the scope, None for the
+        # scopes of functions, `this` and `super`, which always get an
+        # environment.
+        self.node = node
+        # Identifies the function the scope belongs to.
+        self.function = function
+        # Index of every name in the scope, in declaration order.
+        self.slots: typing.Dict[str, int] = {}
+        # Variables the parent had declared when the scope was opened.
+        self.declared_before = 0 if parent is None else len(parent.slots)
+        # Whether a nested function refers to one of the variables.
+        self.captured = False
+        # Filled in by `Resolver.assign_slots`.
+        self.materialized = True
+        self.level = 0
+        self.base = 0
+
+
+# Resolves every local variable to its (depth, slot) pair.
+#
+# With `flatten_scopes` the resolver also does a simple escape analysis: the
+# variables of a block or `for` loop that no nested function refers to can't
+# outlive it, so they are kept in the environment of the enclosing function
+# (or materialized scope), after the variables already declared there. Only
+# scopes with captured variables still get an `Environment` of their own, and
+# scopes that declare nothing never do.
+#
+# Whether a scope is captured is only known once it is closed, so references
+# are collected and numbered when the outermost scope closes.
 class Resolver(ExprVisitor, StmtVisitor):
-    def __init__(self, interpreter: Interpreter):
+    def __init__(self, interpreter: Interpreter, flatten_scopes: bool = True):
         self.interpreter = interpreter
+        self.flatten_scopes = flatten_scopes
         self.scopes: typing.List[typing.Dict[str, bool]] = []
+        # The `Scope` of every entry in `scopes`.
+        self.open_scopes: typing.List[Scope] = []
+        # Every scope opened since the outermost one, in order.
+        self.opened: typing.List[Scope] = []
+        # (expression, scope it is in, scope of the variable, index there)
+        self.references: typing.List[typing.Tuple[Expr, Scope, Scope, int]] = []
         self.current_function = FunctionType.NONE
         self.current_class = ClassType.SUBCLASS
+        self.dispatch = expr_dispatch_table(self) + stmt_dispatch_table(self)
 
     def visit_this_expr(self, expr: This) -> typing.Any:
         if self.current_class == ClassType.NONE:
@@ -88,9 +146,11 @@ class Resolver(ExprVisitor, StmtVisitor):
 
         if stmt.superclass is not None:
             self.begin_scope()
+            self.declare_name("super")
             self.scopes[-1]["super"] = True
 
         self.begin_scope()
+        self.declare_name("this")
         self.scopes[-1]["this"] = True
 
         for method in stmt.methods:
@@ -177,6 +237,19 @@ class Resolver(ExprVisitor, StmtVisitor):
         self.resolve_ast_node(stmt.body)
         return None
 
+    # Mirrors `Interpreter.visit_for_stmt`: one scope for the whole loop.
+    def visit_for_stmt(self, stmt: For) -> typing.Any:
+        self.begin_scope(stmt)
+        if stmt.initializer is not None:
+            self.resolve_ast_node(stmt.initializer)
+        if stmt.condition is not None:
+            self.resolve_ast_node(stmt.condition)
+        if stmt.increment is not None:
+            self.resolve_ast_node(stmt.increment)
+        self.resolve_ast_node(stmt.body)
+        self.end_scope()
+        return None
+
     def visit_print_stmt(self, stmt: Print) -> typing.Any:
         self.resolve_ast_node(stmt.expression)
         return None
@@ -195,7 +268,7 @@ class Resolver(ExprVisitor, StmtVisitor):
     def resolve_function(self, function: Function, fun_type: FunctionType) -> None:
         parent_fun = self.current_function
         self.current_function = fun_type
-        self.begin_scope()
+        self.begin_scope(function=function)
         for param in function.params:
             self.declare(param)
             self.define(param)
@@ -221,8 +294,17 @@ class Resolver(ExprVisitor, StmtVisitor):
     def declare(self, identifier: Token) -> None:
         if len(self.scopes) == 0:
             return
-        scope = self.scopes[-1]
-        scope[identifier.lexeme] = False
+        # Every declaration takes a new slot, so a name can't be declared twice.
+        if identifier.lexeme in self.scopes[-1]:
+            raise LoxParseError(
+                identifier, "Already a variable with this name in this scope."
+            )
+        self.declare_name(identifier.lexeme)
+
+    def declare_name(self, name: str) -> None:
+        self.scopes[-1][name] = False
+        slots = self.open_scopes[-1].slots
+        slots[name] = len(slots)
 
     def define(self, identifier: Token) -> None:
         if len(self.scopes) == 0:
@@ -231,7 +313,7 @@ class Resolver(ExprVisitor, StmtVisitor):
         scope[identifier.lexeme] = True
 
     def visit_block_stmt(self, stmt: Block) -> typing.Any:
-        self.begin_scope()
+        self.begin_scope(stmt)
         self.resolve(stmt.statements)
         self.end_scope()
         return None
@@ -241,13 +323,61 @@ class Resolver(ExprVisitor, StmtVisitor):
             self.resolve_ast_node(statement)
 
     def resolve_ast_node(self, node: Stmt | Expr) -> None:
-        node.accept(self)
-
-    def begin_scope(self) -> None:
+        self.dispatch[node.kind](node)
+
+    # `node` is the block or loop opening the scope; `function` is given for
+    # the scopes that belong to a function of their own.
+    def begin_scope(self, node: typing.Optional[Stmt] = None, function=None) -> None:
+        parent = self.open_scopes[-1] if self.open_scopes else None
+        if function is None:
+            function = self.current_scope_function()
+        scope = Scope(parent, node, function)
         self.scopes.append({})
+        self.open_scopes.append(scope)
+        self.opened.append(scope)
 
     def end_scope(self) -> None:
         self.scopes.pop()
+        self.open_scopes.pop()
+        if not self.open_scopes:
+            self.assign_slots()
+
+    def current_scope_function(self) -> typing.Any:
+        return self.open_scopes[-1].function if self.open_scopes else None
+
+    # Decides which scopes get an environment, then hands the (depth, slot)
+    # of every reference and the layout of every other scope to the
+    # interpreter. Scopes come in the order they were opened, parents first.
+    def assign_slots(self) -> None:
+        for scope in self.opened:
+            parent = scope.parent
+            has_frame = parent is not None and parent.level > 0
+            scope.materialized = (
+                scope.node is None
+                or scope.captured
+                or not self.flatten_scopes
+                or (len(scope.slots) > 0 and not has_frame)
+            )
+            if scope.materialized:
+                scope.level = (0 if parent is None else parent.level) + 1
+                scope.base = 0
+                continue
+            # A flattened scope's variables follow those the enclosing scopes
+            # had declared in the same environment when it was opened.
+            if parent is not None:
+                scope.level = parent.level
+                parent_base = 0 if parent.materialized else parent.base
+                scope.base = parent_base + scope.declared_before
+            self.interpreter.inline_scope(
+                scope.node, scope.base if scope.slots else NO_VARIABLES
+            )
+
+        for expr, scope, target, index in self.references:
+            slot = index if target.materialized else target.base + index
+            self.interpreter.resolve(expr, scope.level - target.level, slot)
+
+        self.opened.clear()
+        self.references.clear()
 
     def visit_break_stmt(self, stmt) -> typing.Any:
         return None
@@ -255,8 +385,13 @@ class Resolver(ExprVisitor, StmtVisitor):
     # We start at the innermost scope and work outwards, looking in each map for a matching name.
     # If we find the variable, we resolve it
     # passing in the number of scopes between the current innermost scope and the scope where the variable was found
+    # and the variable's slot in that scope
+    # (both worked out in `assign_slots`).
     def resolve_local(self, expr: Expr, name: Token) -> None:
         for i in range(len(self.scopes) - 1, -1, -1):
             if name.lexeme in self.scopes[i].keys():
-                self.interpreter.resolve(expr, len(self.scopes) - 1 - i)
+                scope, target = self.open_scopes[-1], self.open_scopes[i]
+                if scope.function is not target.function:
+                    target.captured = True
+                self.references.append((expr, scope, target, target.slots[name.lexeme]))
                 return
@@ -0,0 +1,72 @@
+import typing
+
+# Concatenations shorter than this make plain strings: copying a few hundred
+# characters is cheaper than keeping pieces around.
+ROPE_MIN_LENGTH = 256
+
+
+# A long Lox string built by `+`, kept as the pieces it was made of until its
+# text is needed. Ropes made by appending to one another share one list of
+# pieces: a rope owns the first `count` of them, and appending to the newest
+# rope only adds a piece, so building a string in a loop takes linear time.
+# Appending to an older rope copies its pieces first.
+#
+# To Lox code a rope is a string: it compares, hashes and prints as its text,
+# which is joined on first use and kept.
+class Rope:
+    __slots__ = ("parts", "count", "length", "flat")
+
+    def __init__(self, parts: typing.List[str], length: int) -> None:
+        self.parts = parts
+        self.count = len(parts)
+        self.length = length
+        self.flat: typing.Optional[str] = None
+
+    def append(self, text: str) -> "Rope":
+        parts = self.parts
+        if len(parts) != self.count:
+            parts = parts[: self.count]
+        parts.append(text)
+        return Rope(parts, self.length + len(text))
+
+    def __str__(self) -> str:
+        flat = self.flat
+        if flat is None:
+            parts = self.parts
+            if len(parts) != self.count:
+                parts = parts[: self.count]
+            flat = self.flat = "".join(parts)
+        return flat
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is Rope:
+            return self.length == other.length and str(self) == str(other)
+        if type(other) is str:
+            return self.length == len(other) and str(self) == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def __repr__(self) -> str:
+        return repr(str(self))
+
+
+# The types a Lox string can have at run time.
+STRING_TYPES = (str, Rope)
+
+
+# `left + right` for two Lox strings.
+def concat(
+    left: typing.Union[str, Rope], right: typing.Union[str, Rope]
+) -> typing.Union[str, Rope]:
+    if type(right) is Rope:
+        right = str(right)
+    if type(left) is Rope:
+        return left.append(right)
+    if len(left) + len(right) < ROPE_MIN_LENGTH:
+        return left + right
+    return Rope([left, right], len(left) + len(right))
@@ -1,10 +1,15 @@
 import typing
 from abc import ABC, abstractmethod
-from pylox.error import LoxRuntimeError
+from pylox.error import BreakException, LoxRuntimeError
 from pylox.stmt import Function
-from environment import Environment
+from pylox.environment import Environment
 from pylox.tokens import Token
 
+# Statements return None to carry on, `BREAK` to leave the innermost loop or a
+# 1-tuple holding the value of a `return`, so no exceptions are involved.
+BREAK: typing.Any = object()
+NIL_RETURN = (None,)
+
 
 class LoxCallable(ABC):
     @abstractmethod
@@ -25,18 +30,12 @@ class LoxFunction(LoxCallable):
         self.is_init = is_init
 
     def call(self, interpreter, args: list) -> typing.Any:
-        env = Environment(self.closure)
-        for i in range(len(self.declaration.params)):
-            env.define(self.declaration.params[i].lexeme, args[i])
-        try:
-            interpreter.execute_block(self.declaration.body, env)
-        except Return as return_value:
-            if self.is_init:
-                return self.closure.get_at(0, "this")
-            return return_value.value
+        # The parameters take the first slots, in order.
+        env = Environment(self.closure, list(args))
+        completion = self.run(interpreter, env)
         if self.is_init:
-            return self.closure.get_at(0, "this")
-        return None
+            return self.closure.get_at(0, 0)
+        return completion[0]
 
     def arity(self) -> int:
         return len(self.declaration.params)
@@ -45,11 +44,60 @@ class LoxFunction(LoxCallable):
         return f"<fn {self.declaration.name.lexeme}>"
 
     def bind(self, instance: "LoxInstance") -> "LoxFunction":
-        env = Environment(self.closure)
-        env.define("this", instance)
+        env = Environment(self.closure, [instance])
         return LoxFunction(self.declaration, env, self.is_init)
 
-
+    # `bind(instance).call(interpreter, args)` for a method that is called
+    # right away, without the bound function. `args` must be a fresh list: it
+    # becomes the environment's values.
+    def call_bound(
+        self, interpreter, instance: "LoxInstance", args: list
+    ) -> typing.Any:
+        env = Environment(Environment(self.closure, [instance]), args)
+        completion = self.run(interpreter, env)
+        if self.is_init:
+            return instance
+        return completion[0]
+
+    # Runs the body and returns its `return` completion. A `Return` raised
+    # instead is taken as well. A `break` can leave a function declared in a
+    # loop body, as the parser allows it there; it goes on as a
+    # `BreakException` to the loop the call is in.
+    def run(self, interpreter, env: Environment) -> tuple:
+        try:
+            completion = interpreter.execute_block(self.declaration.body, env)
+        except Return as return_value:
+            return (return_value.value,)
+        if completion is None:
+            return NIL_RETURN
+        if completion is BREAK:
+            raise BreakException()
+        return completion
+
+
+# The layout of an instance's fields: the slot index of each field in
+# `LoxInstance.values`. Instances that got the same fields in the same order
+# share a shape, and adding a field moves an instance along a transition that
+# is created once and then reused, so the names are stored once per shape
+# rather than once per instance.
+class Shape:
+    __slots__ = ("slots", "transitions")
+
+    def __init__(self, slots: typing.Dict[str, int]) -> None:
+        self.slots = slots
+        self.transitions: typing.Dict[str, "Shape"] = {}
+
+    def with_field(self, name: str) -> "Shape":
+        shape = self.transitions.get(name)
+        if shape is None:
+            shape = Shape({**self.slots, name: len(self.slots)})
+            self.transitions[name] = shape
+        return shape
+
+
+# `method_table` holds every method an instance of the class can call, its
+# own over the inherited ones, flattened when the class is created, so
+# lookups and instantiation don't depend on the depth of the hierarchy.
 class LoxClass(LoxCallable):
     def __init__(
         self,
@@ -60,16 +108,36 @@ class LoxClass(LoxCallable):
         self.name = name
         self.superclass = superclass
         self.methods = methods
+        self.method_table: typing.Dict[str, LoxFunction] = {}
+        if superclass is not None:
+            self.method_table.update(superclass.method_table)
+        self.method_table.update(methods)
+        self.initializer: typing.Optional[LoxFunction] = self.method_table.get("init")
+        # Where the shapes of this class's instances start from.
+        self.empty_shape = Shape({})
+
+    # For classes built a step at a time, as the VM does: the superclass
+    # first, then the methods.
+    def inherit(self, superclass: "LoxClass") -> None:
+        self.superclass = superclass
+        self.method_table = {**superclass.method_table, **self.methods}
+        self.initializer = self.method_table.get("init")
+
+    def add_method(self, name: str, method: LoxFunction) -> None:
+        self.methods[name] = method
+        self.method_table[name] = method
+        if name == "init":
+            self.initializer = method
 
     def call(self, interpreter, args: list) -> typing.Any:
         instance = LoxInstance(self)
-        initializer = self.find_method("init")
+        initializer = self.initializer
         if initializer is not None:
-            initializer.bind(instance).call(interpreter, args)
+            initializer.call_bound(interpreter, instance, args)
         return instance
 
     def arity(self) -> int:
-        initializer = self.find_method("init")
+        initializer = self.initializer
         if initializer is None:
             return 0
         return initializer.arity()
@@ -78,35 +146,50 @@ class LoxClass(LoxCallable):
         return self.name
 
     def find_method(self, name: str) -> typing.Optional[LoxFunction]:
-        if name in self.methods:
-            return self.methods[name]
-
-        if self.superclass is not None:
-            return self.superclass.find_method(name)
-
-        return None
+        return self.method_table.get(name)
 
 
+# Field values are kept in `values`, at the slots `shape` gives them.
 class LoxInstance:
+    __slots__ = ("lox_class", "shape", "values")
+
     def __init__(self, lox_class: LoxClass) -> None:
         self.lox_class = lox_class
-        self.fields: typing.Dict[str, typing.Any] = {}
+        self.shape = lox_class.empty_shape
+        self.values: typing.List[typing.Any] = []
 
     def __str__(self) -> str:
         return f"{self.lox_class.name} instance"
 
+    # The fields by name, for inspection; the engines use the slots.
+    @property
+    def fields(self) -> typing.Dict[str, typing.Any]:
+        values = self.values
+        return {name: values[index] for name, index in self.shape.slots.items()}
+
     def get(self, name: Token):
-        if name.lexeme in self.fields:
-            return self.fields.get(name.lexeme)
-        method = self.lox_class.find_method(name.lexeme)
+        index = self.shape.slots.get(name.lexeme)
+        if index is not None:
+            return self.values[index]
+        method = self.lox_class.method_table.get(name.lexeme)
         if method is not None:
             return method.bind(self)
         raise LoxRuntimeError(name, f"Undefined property {name.lexeme}.")
 
     def set(self, name: Token, value: typing.Any):
-        self.fields[name.lexeme] = value
+        self.set_field(name.lexeme, value)
+
+    def set_field(self, name: str, value: typing.Any) -> None:
+        index = self.shape.slots.get(name)
+        if index is None:
+            self.shape = self.shape.with_field(name)
+            self.values.append(value)
+        else:
+            self.values[index] = value
 
 
+# The exception-based alternatives to the `BREAK` and return completions;
+# the tree walker's loops and calls still honour them.
 class Return(RuntimeError):
     def __init__(self, value: typing.Any) -> None:
         self.value = value
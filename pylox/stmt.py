@@ -49,14 +49,25 @@ class StmtVisitor(ABC):
     def visit_class_stmt(self, stmt) -> typing.Any:
         pass
 
+    @abstractmethod
+    def visit_for_stmt(self, stmt) -> typing.Any:
+        pass
+
 
 class Stmt(ABC):
+    __slots__ = ()
+    kind: int
+    runtime_fields: typing.Tuple[str, ...] = ()
+
     @abstractmethod
     def accept(self, visitor: StmtVisitor) -> typing.Any:
         pass
 
 
 class If(Stmt):
+    __slots__ = ("condition", "then_branch", "else_branch")
+    kind = 12
+
     def __init__(
         self, condition: Expr, then_branch: Stmt, else_branch: typing.Optional[Stmt]
     ):
@@ -69,14 +80,21 @@ class If(Stmt):
 
 
 class Block(Stmt):
+    __slots__ = ("statements", "inline_base")
+    kind = 13
+
     def __init__(self, statements: typing.List[Stmt]):
         self.statements = statements
+        self.inline_base: typing.Optional[int] = None
 
     def accept(self, visitor: StmtVisitor) -> typing.Any:
         return visitor.visit_block_stmt(self)
 
 
 class Expression(Stmt):
+    __slots__ = ("expression",)
+    kind = 14
+
     def __init__(self, expression: Expr):
         self.expression = expression
 
@@ -85,6 +103,9 @@ class Expression(Stmt):
 
 
 class Print(Stmt):
+    __slots__ = ("expression",)
+    kind = 15
+
     def __init__(self, expression: Expr):
         self.expression = expression
 
@@ -93,6 +114,9 @@ class Print(Stmt):
 
 
 class Var(Stmt):
+    __slots__ = ("name", "initializer")
+    kind = 16
+
     def __init__(self, name: Token, initializer: typing.Optional[Expr]):
         self.name = name
         self.initializer = initializer
@@ -102,6 +126,9 @@ class Var(Stmt):
 
 
 class While(Stmt):
+    __slots__ = ("condition", "body")
+    kind = 17
+
     def __init__(self, condition: Expr, body: Stmt):
         self.condition = condition
         self.body = body
@@ -111,6 +138,9 @@ class While(Stmt):
 
 
 class Break(Stmt):
+    __slots__ = ()
+    kind = 18
+
     def __init__(self):
         super().__init__()
 
@@ -119,6 +149,9 @@ class Break(Stmt):
 
 
 class Function(Stmt):
+    __slots__ = ("name", "params", "body")
+    kind = 19
+
     def __init__(
         self, name: Token, params: typing.List[Token], body: typing.List[Stmt]
     ):
@@ -131,6 +164,9 @@ class Function(Stmt):
 
 
 class Return(Stmt):
+    __slots__ = ("keyword", "value")
+    kind = 20
+
     def __init__(self, keyword: Token, value: typing.Optional[Expr]):
         self.keyword = keyword
         self.value = value
@@ -140,6 +176,9 @@ class Return(Stmt):
 
 
 class Class(Stmt):
+    __slots__ = ("name", "superclass", "methods")
+    kind = 21
+
     def __init__(
         self,
         name: Token,
@@ -152,3 +191,61 @@ class Class(Stmt):
 
     def accept(self, visitor: StmtVisitor) -> typing.Any:
         return visitor.visit_class_stmt(self)
+
+
+class For(Stmt):
+    __slots__ = ("initializer", "condition", "increment", "body", "inline_base")
+    kind = 22
+
+    def __init__(
+        self,
+        initializer: typing.Optional[Stmt],
+        condition: typing.Optional[Expr],
+        increment: typing.Optional[Expr],
+        body: Stmt,
+    ):
+        self.initializer = initializer
+        self.condition = condition
+        self.increment = increment
+        self.body = body
+        self.inline_base: typing.Optional[int] = None
+
+    def accept(self, visitor: StmtVisitor) -> typing.Any:
+        return visitor.visit_for_stmt(self)
+
+
+# The node classes in `kind` order, starting at 12.
+STMT_NODES: typing.Tuple[typing.Type[Stmt], ...] = (
+    If,
+    Block,
+    Expression,
+    Print,
+    Var,
+    While,
+    Break,
+    Function,
+    Return,
+    Class,
+    For,
+)
+
+
+# Table-driven alternative to `accept()`: the visitor's methods
+# for the `Stmt` kinds, in order. Visitors of both `Expr` and
+# `Stmt` concatenate the two tables and call `table[node.kind](node)`.
+def stmt_dispatch_table(
+    visitor: StmtVisitor,
+) -> typing.List[typing.Callable[[typing.Any], typing.Any]]:
+    return [
+        visitor.visit_if_stmt,
+        visitor.visit_block_stmt,
+        visitor.visit_expression_stmt,
+        visitor.visit_print_stmt,
+        visitor.visit_var_stmt,
+        visitor.visit_while_stmt,
+        visitor.visit_break_stmt,
+        visitor.visit_function_stmt,
+        visitor.visit_return_stmt,
+        visitor.visit_class_stmt,
+        visitor.visit_for_stmt,
+    ]
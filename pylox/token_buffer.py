@@ -0,0 +1,97 @@
+from array import array
+from typing import Any, Iterator, Optional
+
+from pylox.tokens import TokenType
+
+# `TokenType` values are small consecutive integers, so they fit in one byte.
+_TYPES_BY_CODE: list[Optional[TokenType]] = [None] * (
+    max(t.value for t in TokenType) + 1
+)
+for _token_type in TokenType:
+    _TYPES_BY_CODE[_token_type.value] = _token_type
+
+
+# Struct-of-arrays token storage: one byte for the type and three 32-bit
+# integers (start, end, line) per token, all pointing back into the source.
+# Lexemes and literals are only materialized when somebody asks for them.
+class TokenBuffer:
+    def __init__(self, source: str) -> None:
+        self.source: str = source
+        self.types: array = array("B")
+        self.starts: array = array("I")
+        self.ends: array = array("I")
+        self.lines: array = array("I")
+
+    def append(self, token_type: TokenType, start: int, end: int, line: int) -> None:
+        self.types.append(token_type.value)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> "TokenView":
+        if index < 0:
+            index += len(self.types)
+        if not 0 <= index < len(self.types):
+            raise IndexError("token index out of range")
+        return TokenView(self, index)
+
+    def __iter__(self) -> Iterator["TokenView"]:
+        for index in range(len(self.types)):
+            yield TokenView(self, index)
+
+    def token_type(self, index: int) -> TokenType:
+        return _TYPES_BY_CODE[self.types[index]]  # type: ignore
+
+    def lexeme(self, index: int) -> str:
+        return self.source[self.starts[index] : self.ends[index]]
+
+    def literal(self, index: int) -> Any:
+        code = self.types[index]
+        if code == TokenType.NUMBER.value:
+            text = self.lexeme(index)
+            return float(text) if "." in text else int(text)
+        if code == TokenType.STRING.value:
+            return self.source[self.starts[index] + 1 : self.ends[index] - 1]
+        return None
+
+    def nbytes(self) -> int:
+        return sum(
+            column.itemsize * len(column)
+            for column in (self.types, self.starts, self.ends, self.lines)
+        )
+
+
+# A `Token` look-alike that reads its fields out of a `TokenBuffer`.
+# The lexeme is sliced from the source on first access and kept afterwards,
+# because names are looked up by lexeme over and over at runtime.
+class TokenView:
+    __slots__ = ("buffer", "index", "_lexeme")
+
+    def __init__(self, buffer: TokenBuffer, index: int) -> None:
+        self.buffer = buffer
+        self.index = index
+        self._lexeme: Optional[str] = None
+
+    @property
+    def token_type(self) -> TokenType:
+        return _TYPES_BY_CODE[self.buffer.types[self.index]]  # type: ignore
+
+    @property
+    def lexeme(self) -> str:
+        if self._lexeme is None:
+            self._lexeme = self.buffer.lexeme(self.index)
+        return self._lexeme
+
+    @property
+    def literal(self) -> Any:
+        return self.buffer.literal(self.index)
+
+    @property
+    def line(self) -> int:
+        return self.buffer.lines[self.index]
+
+    def __str__(self):
+        return f"line {self.line} : {self.token_type} {self.lexeme} {self.literal}"
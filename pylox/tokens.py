@@ -54,6 +54,8 @@ class TokenType(Enum):
 
 
 class Token:
+    __slots__ = ("token_type", "lexeme", "literal", "line")
+
     def __init__(self, token_type: TokenType, lexeme: str, literal: Any, line: int):
         self.token_type: TokenType = token_type
         self.lexeme: str = lexeme
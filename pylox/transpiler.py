@@ -0,0 +1,1230 @@
+import builtins
+import itertools
+import linecache
+import math
+import re
+import sys
+import types
+import typing
+import warnings
+
+import pylox.expr as expr_ast
+import pylox.stmt as stmt_ast
+from pylox.error import BreakException, LoxRuntimeError
+from pylox.expr import Expr
+from pylox.interpreter import Interpreter
+from pylox.rope import STRING_TYPES, concat
+from pylox.runtime_object import LoxCallable
+from pylox.stmt import Stmt
+from pylox.tokens import Token, TokenType
+
+# Runtime support of the generated code. Lox values are Python values: nil,
+# booleans, numbers and strings as in the tree walker, functions as Python
+# functions and classes as Python classes deriving from `LoxObject`, whose
+# instances keep their fields as attributes. Every Lox name is prefixed so it
+# can't clash with Python's: globals, fields and methods with "lox_", locals
+# with "l_" and a suffix telling apart the declarations that share a name.
+
+
+# Raised by the helpers below; `PythonEngine` turns it into a `LoxRuntimeError`
+# on the line of the Lox code that was running. An arity error is raised in
+# the callee, though it belongs to the call: `callee` is the frame to skip.
+class RuntimeFault(Exception):
+    def __init__(self, message: str, callee: typing.Any = None) -> None:
+        self.message = message
+        self.callee = callee
+
+
+# Lox classes have no properties of their own, only their instances do.
+class LoxClassType(type):
+    def __getattribute__(cls, name: str) -> typing.Any:
+        if name.startswith("lox_"):
+            raise AttributeError(name, name=name, obj=cls)
+        return type.__getattribute__(cls, name)
+
+
+class LoxObject(metaclass=LoxClassType):
+    def __init__(self, *args: typing.Any) -> None:
+        if args:
+            raise RuntimeFault(f"Expected 0 arguments but got {len(args)}.")
+
+
+# `__init__` of the classes with an `init` method. Python wants `__init__` to
+# return None while `init` returns the instance.
+def construct(this: LoxObject, *args: typing.Any) -> None:
+    this.lox_init(*args)
+
+
+# A native function of the interpreter's globals, made callable.
+class Native:
+    def __init__(self, function: LoxCallable, interpreter: Interpreter) -> None:
+        self.function = function
+        self.interpreter = interpreter
+
+    def __call__(self, *args: typing.Any) -> typing.Any:
+        if len(args) != self.function.arity():
+            raise RuntimeFault(
+                f"Expected {self.function.arity()} arguments but got {len(args)}."
+            )
+        return self.function.call(self.interpreter, list(args))
+
+    def __str__(self) -> str:
+        return str(self.function)
+
+
+# A method taken from an instance without calling it. Python's bound methods
+# are equal when they bind the same function to the same instance, Lox's are
+# new values on each access, equal only to themselves.
+class BoundMethod:
+    __slots__ = ("method",)
+
+    def __init__(self, method: types.MethodType) -> None:
+        self.method = method
+
+    def __call__(self, *args: typing.Any) -> typing.Any:
+        return self.method(*args)
+
+
+def bound(value: typing.Any) -> typing.Any:
+    if type(value) is types.MethodType:
+        return BoundMethod(value)
+    return value
+
+
+# Called by a generated function whose arguments don't match its parameters.
+def arity(expected: int, args: tuple) -> typing.NoReturn:
+    raise RuntimeFault(
+        f"Expected {expected} arguments but got {len(args)}.", sys._getframe(1)
+    )
+
+
+def is_number(value: typing.Any) -> bool:
+    return type(value) is float or type(value) is int
+
+
+def numbers(left: typing.Any, right: typing.Any) -> typing.Tuple[float, float]:
+    if is_number(left) and is_number(right):
+        return float(left), float(right)
+    raise RuntimeFault("Operands must be a numbers.")
+
+
+# The slow paths of the operators: the generated code handles two floats
+# itself and calls these for anything else.
+def add(left: typing.Any, right: typing.Any) -> typing.Any:
+    if is_number(left) and is_number(right):
+        return float(left) + float(right)
+    if type(left) in STRING_TYPES or type(right) in STRING_TYPES:
+        if type(left) not in STRING_TYPES:
+            left = stringify(left)
+        if type(right) not in STRING_TYPES:
+            right = stringify(right)
+        return concat(left, right)
+    raise RuntimeFault("Operands must be two numbers or two strings.")
+
+
+def subtract(left: typing.Any, right: typing.Any) -> float:
+    a, b = numbers(left, right)
+    return a - b
+
+
+def multiply(left: typing.Any, right: typing.Any) -> float:
+    a, b = numbers(left, right)
+    return a * b
+
+
+def divide(left: typing.Any, right: typing.Any) -> float:
+    a, b = numbers(left, right)
+    if b == 0:
+        raise RuntimeFault("Division by zero!")
+    return a / b
+
+
+def greater(left: typing.Any, right: typing.Any) -> bool:
+    a, b = numbers(left, right)
+    return a > b
+
+
+def greater_equal(left: typing.Any, right: typing.Any) -> bool:
+    a, b = numbers(left, right)
+    return a >= b
+
+
+def less(left: typing.Any, right: typing.Any) -> bool:
+    a, b = numbers(left, right)
+    return a < b
+
+
+def less_equal(left: typing.Any, right: typing.Any) -> bool:
+    a, b = numbers(left, right)
+    return a <= b
+
+
+def negate(value: typing.Any) -> float:
+    if is_number(value):
+        return -float(value)
+    raise RuntimeFault("Operand must be a number.")
+
+
+def uncallable(*args: typing.Any) -> typing.NoReturn:
+    raise RuntimeFault("Can only call functions and classes.")
+
+
+def undefined(name: str) -> typing.NoReturn:
+    raise RuntimeFault(f"Undefined variable {name[4:]}.")
+
+
+def no_fields() -> typing.NoReturn:
+    raise RuntimeFault("Only instances have fields.")
+
+
+def instance(value: typing.Any) -> LoxObject:
+    if isinstance(value, LoxObject):
+        return value
+    no_fields()
+
+
+def set_field(obj: LoxObject, name: str, value: typing.Any) -> typing.Any:
+    setattr(obj, name, value)
+    return value
+
+
+def superclass(value: typing.Any) -> LoxClassType:
+    if type(value) is LoxClassType:
+        return value
+    raise RuntimeFault("Superclass must be a class.")
+
+
+# Assignment to a captured variable, as an expression.
+def store(cell: list, value: typing.Any) -> typing.Any:
+    cell[0] = value
+    return value
+
+
+LOCAL_FUNCTION = re.compile(r"_?l_(.*)_\d+")
+
+
+def function_name(function: types.FunctionType) -> str:
+    name = function.__name__
+    if name.startswith("lox_"):
+        return name[4:]
+    match = LOCAL_FUNCTION.fullmatch(name)
+    return name if match is None else match.group(1)
+
+
+def stringify(value: typing.Any) -> str:
+    if type(value) is str:
+        return value
+    if type(value) is types.FunctionType:
+        return f"<fn {function_name(value)}>"
+    if type(value) is BoundMethod:
+        return f"<fn {function_name(value.method.__func__)}>"
+    if type(value) is LoxClassType:
+        return value.__qualname__
+    if isinstance(value, LoxObject):
+        return f"{type(value).__qualname__} instance"
+    return Interpreter.stringify(value)
+
+
+# Names the generated code finds its helpers under.
+HELPERS: typing.Dict[str, typing.Any] = {
+    "_LoxObject": LoxObject,
+    "_construct": construct,
+    "_bound": bound,
+    "_arity": arity,
+    "_add": add,
+    "_subtract": subtract,
+    "_multiply": multiply,
+    "_divide": divide,
+    "_greater": greater,
+    "_greater_equal": greater_equal,
+    "_less": less,
+    "_less_equal": less_equal,
+    "_negate": negate,
+    "_uncallable": uncallable,
+    "_undefined": undefined,
+    "_no_fields": no_fields,
+    "_instance": instance,
+    "_set_field": set_field,
+    "_superclass": superclass,
+    "_store": store,
+    "_Break": BreakException,
+}
+
+
+# A local variable of the generated code. One that a nested function uses is
+# handed to it as a keyword default when the function is defined: its value
+# if that can't change afterwards, otherwise a one-element list (a cell)
+# shared by both. Functions and classes that refer to themselves need a cell
+# too, as the value doesn't exist yet when their methods are defined.
+class Local:
+    __slots__ = ("python_name", "captured", "assigned", "defining", "early")
+
+    def __init__(self, python_name: str) -> None:
+        self.python_name = python_name
+        self.captured = False
+        self.assigned = False
+        self.defining = False
+        self.early = False
+
+    @property
+    def cell(self) -> bool:
+        return self.captured and (self.assigned or self.early)
+
+
+class FunctionScope:
+    __slots__ = ("enclosing", "scopes", "free", "loops")
+
+    def __init__(self, enclosing: typing.Optional["FunctionScope"]) -> None:
+        self.enclosing = enclosing
+        self.scopes: typing.List[typing.Dict[str, Local]] = []
+        # Locals of enclosing functions used here or in nested functions.
+        self.free: typing.Dict[Local, None] = {}
+        # Loops of this function around the node being analyzed.
+        self.loops = 0
+
+
+# Finds, before any code is generated, the declaration each local name refers
+# to and which locals nested functions capture. Declarations are keyed by the
+# id of their node (or token, for parameters); a method's `this` by the id of
+# the method.
+class LocalAnalysis(expr_ast.ExprVisitor, stmt_ast.StmtVisitor):
+    def __init__(self) -> None:
+        self.dispatch = expr_ast.expr_dispatch_table(
+            self
+        ) + stmt_ast.stmt_dispatch_table(self)
+        self.locals: typing.Dict[int, Local] = {}
+        self.references: typing.Dict[int, Local] = {}
+        self.free: typing.Dict[int, typing.List[Local]] = {}
+        self.function = FunctionScope(None)
+        self.counter = itertools.count(1)
+        # Whether a `break` leaves a function declared in a loop.
+        self.breaks_out = False
+
+    def analyze(self, nodes: typing.List[typing.Any]) -> None:
+        for node in nodes:
+            self.dispatch[node.kind](node)
+
+    def declare(self, name: str, key: int) -> typing.Optional[Local]:
+        if not self.function.scopes:
+            return None
+        prefix = "this" if name == "this" else f"l_{name}"
+        local = Local(f"{prefix}_{next(self.counter)}")
+        self.function.scopes[-1][name] = local
+        self.locals[key] = local
+        return local
+
+    def lookup(self, name: str, node: typing.Any) -> Local:
+        function: typing.Optional[FunctionScope] = self.function
+        while function is not None:
+            for scope in reversed(function.scopes):
+                if name in scope:
+                    local = scope[name]
+                    if function is not self.function:
+                        local.captured = True
+                        local.early = local.early or local.defining
+                        inner = self.function
+                        while inner is not function:
+                            inner.free[local] = None
+                            inner = inner.enclosing
+                    self.references[id(node)] = local
+                    return local
+            function = function.enclosing
+        raise KeyError(name)
+
+    def begin_scope(self) -> None:
+        self.function.scopes.append({})
+
+    def end_scope(self) -> None:
+        self.function.scopes.pop()
+
+    def function_body(self, stmt: stmt_ast.Function, method: bool) -> None:
+        self.function = FunctionScope(self.function)
+        self.begin_scope()
+        if method:
+            self.declare("this", id(stmt))
+        for param in stmt.params:
+            self.declare(param.lexeme, id(param))
+        self.analyze(stmt.body)
+        self.free[id(stmt)] = list(self.function.free)
+        self.function = self.function.enclosing
+
+    def visit_block_stmt(self, stmt: stmt_ast.Block) -> None:
+        self.begin_scope()
+        self.analyze(stmt.statements)
+        self.end_scope()
+
+    def visit_for_stmt(self, stmt: stmt_ast.For) -> None:
+        self.begin_scope()
+        if stmt.initializer is not None:
+            self.dispatch[stmt.initializer.kind](stmt.initializer)
+        if stmt.condition is not None:
+            self.dispatch[stmt.condition.kind](stmt.condition)
+        if stmt.increment is not None:
+            self.dispatch[stmt.increment.kind](stmt.increment)
+        self.function.loops += 1
+        self.dispatch[stmt.body.kind](stmt.body)
+        self.function.loops -= 1
+        self.end_scope()
+
+    def visit_var_stmt(self, stmt: stmt_ast.Var) -> None:
+        if stmt.initializer is not None:
+            self.dispatch[stmt.initializer.kind](stmt.initializer)
+        self.declare(stmt.name.lexeme, id(stmt))
+
+    def visit_function_stmt(self, stmt: stmt_ast.Function) -> None:
+        local = self.declare(stmt.name.lexeme, id(stmt))
+        if local is not None:
+            local.defining = True
+        self.function_body(stmt, method=False)
+        if local is not None:
+            local.defining = False
+
+    def visit_class_stmt(self, stmt: stmt_ast.Class) -> None:
+        local = self.declare(stmt.name.lexeme, id(stmt))
+        if stmt.superclass is not None:
+            self.dispatch[stmt.superclass.kind](stmt.superclass)
+        if local is not None:
+            local.defining = True
+        for method in stmt.methods:
+            self.function_body(method, method=True)
+        if local is not None:
+            local.defining = False
+
+    def visit_if_stmt(self, stmt: stmt_ast.If) -> None:
+        self.dispatch[stmt.condition.kind](stmt.condition)
+        self.dispatch[stmt.then_branch.kind](stmt.then_branch)
+        if stmt.else_branch is not None:
+            self.dispatch[stmt.else_branch.kind](stmt.else_branch)
+
+    def visit_while_stmt(self, stmt: stmt_ast.While) -> None:
+        self.dispatch[stmt.condition.kind](stmt.condition)
+        self.function.loops += 1
+        self.dispatch[stmt.body.kind](stmt.body)
+        self.function.loops -= 1
+
+    def visit_return_stmt(self, stmt: stmt_ast.Return) -> None:
+        if stmt.value is not None:
+            self.dispatch[stmt.value.kind](stmt.value)
+
+    def visit_expression_stmt(self, stmt: stmt_ast.Expression) -> None:
+        self.dispatch[stmt.expression.kind](stmt.expression)
+
+    def visit_print_stmt(self, stmt: stmt_ast.Print) -> None:
+        self.dispatch[stmt.expression.kind](stmt.expression)
+
+    def visit_break_stmt(self, stmt: stmt_ast.Break) -> None:
+        if not self.function.loops:
+            self.breaks_out = True
+
+    def visit_variable_expr(self, expr: expr_ast.Variable) -> None:
+        if expr.resolved is not None:
+            self.lookup(expr.name.lexeme, expr)
+
+    def visit_assign_expr(self, expr: expr_ast.Assign) -> None:
+        self.dispatch[expr.value.kind](expr.value)
+        if expr.resolved is not None:
+            self.lookup(expr.name.lexeme, expr).assigned = True
+
+    def visit_this_expr(self, expr: expr_ast.This) -> None:
+        if expr.resolved is not None:
+            self.lookup("this", expr)
+
+    def visit_super_expr(self, expr: expr_ast.Super) -> None:
+        self.lookup("this", expr)
+
+    def visit_literal_expr(self, expr: expr_ast.Literal) -> None:
+        return None
+
+    def visit_grouping_expr(self, expr: expr_ast.Grouping) -> None:
+        self.dispatch[expr.expression.kind](expr.expression)
+
+    def visit_unary_expr(self, expr: expr_ast.Unary) -> None:
+        self.dispatch[expr.right.kind](expr.right)
+
+    def visit_binary_expr(self, expr: expr_ast.Binary) -> None:
+        self.dispatch[expr.left.kind](expr.left)
+        self.dispatch[expr.right.kind](expr.right)
+
+    def visit_logical_expr(self, expr: expr_ast.Logical) -> None:
+        self.dispatch[expr.left.kind](expr.left)
+        self.dispatch[expr.right.kind](expr.right)
+
+    def visit_call_expr(self, expr: expr_ast.Call) -> None:
+        self.dispatch[expr.callee.kind](expr.callee)
+        for argument in expr.arguments:
+            self.dispatch[argument.kind](argument)
+
+    def visit_get_expr(self, expr: expr_ast.Get) -> None:
+        self.dispatch[expr.obj.kind](expr.obj)
+
+    def visit_set_expr(self, expr: expr_ast.Set) -> None:
+        self.dispatch[expr.obj.kind](expr.obj)
+        self.dispatch[expr.value.kind](expr.value)
+
+
+# A column range of a generated line and the Lox line an error inside it is
+# reported on.
+Span = typing.Tuple[int, int, int]
+
+NOT_LITERAL: typing.Any = object()
+
+
+# Generated Python for an expression. `pure` code is a literal or a variable,
+# cheap and without side effects, so it may be evaluated twice; `safe` code
+# can't fail either. `boolean` code always
+# gives True or False, so Python's truthiness is Lox's.
+class Code:
+    __slots__ = ("text", "spans", "pure", "safe", "boolean", "literal")
+
+    def __init__(
+        self,
+        text: str,
+        spans: typing.List[Span],
+        pure: bool = False,
+        safe: bool = False,
+        boolean: bool = False,
+        literal: typing.Any = NOT_LITERAL,
+    ) -> None:
+        self.text = text
+        self.spans = spans
+        self.pure = pure
+        self.safe = safe
+        self.boolean = boolean
+        self.literal = literal
+
+
+# Concatenates text and code, moving the spans of the code along; `line` adds
+# a span covering the result.
+def join(
+    *parts: typing.Union[str, Code], line: typing.Optional[int] = None, **flags
+) -> Code:
+    texts: typing.List[str] = []
+    spans: typing.List[Span] = []
+    offset = 0
+    for part in parts:
+        if type(part) is str:
+            texts.append(part)
+            offset += len(part)
+        else:
+            spans.extend(
+                (start + offset, end + offset, l) for start, end, l in part.spans
+            )
+            texts.append(part.text)
+            offset += len(part.text)
+    if line is not None:
+        spans.append((0, offset, line))
+    return Code("".join(texts), spans, **flags)
+
+
+def literal_text(value: typing.Any) -> str:
+    if type(value) is str:
+        # All ASCII, so the columns of the line are those Python reports.
+        return ascii(value)
+    if type(value) is float:
+        if not math.isfinite(value):
+            return f'float("{value}")'
+        return f"({value!r})" if value < 0 else repr(value)
+    return repr(value)
+
+
+def is_float(code: Code) -> bool:
+    return type(code.literal) is float
+
+
+# The lines of one generated function: indentation relative to its body, the
+# code and the Lox line for errors no span covers.
+class FunctionState:
+    def __init__(self) -> None:
+        self.lines: typing.List[typing.Tuple[int, Code, int]] = []
+        self.indent = 0
+        self.globals: typing.Dict[str, None] = {}
+        self.temps = 0
+        self.loops = 0
+
+
+# The generated source of a program, with the Lox line and spans of each of
+# its lines.
+class Program:
+    __slots__ = ("source", "lines")
+
+    def __init__(
+        self, source: str, lines: typing.List[typing.Tuple[int, typing.List[Span]]]
+    ) -> None:
+        self.source = source
+        self.lines = lines
+
+
+# (Python operator, slow path) of the binary operators that take numbers.
+OPERATORS: typing.Dict[TokenType, typing.Tuple[str, str]] = {
+    TokenType.PLUS: ("+", "_add"),
+    TokenType.MINUS: ("-", "_subtract"),
+    TokenType.STAR: ("*", "_multiply"),
+    TokenType.SLASH: ("/", "_divide"),
+    TokenType.GREATER: (">", "_greater"),
+    TokenType.GREATER_EQUAL: (">=", "_greater_equal"),
+    TokenType.LESS: ("<", "_less"),
+    TokenType.LESS_EQUAL: ("<=", "_less_equal"),
+}
+COMPARISONS = {
+    TokenType.GREATER,
+    TokenType.GREATER_EQUAL,
+    TokenType.LESS,
+    TokenType.LESS_EQUAL,
+}
+
+
+# Translates a resolved program into Python source: a `_main` function running
+# the top-level statements, with Lox functions as nested Python functions and
+# Lox classes as Python classes. Two floats are added, compared and so on by
+# inline Python operators; the helpers above only see the other cases, and
+# conditions skip the truthiness test when the value is known to be a bool.
+#
+# A `break` in a function declared in a loop raises `_Break` for the loop the
+# call is in. Loops only catch it once such a `break` has been seen, in this
+# program or, with `breaks_out`, an earlier one sharing the globals.
+class Transpiler(expr_ast.ExprVisitor, stmt_ast.StmtVisitor):
+    def __init__(self, breaks_out: bool = False) -> None:
+        self.dispatch = expr_ast.expr_dispatch_table(
+            self
+        ) + stmt_ast.stmt_dispatch_table(self)
+        self.breaks_out = breaks_out
+        self.analysis = LocalAnalysis()
+        self.function = FunctionState()
+        # `this` of the initializer being generated, which its returns give.
+        self.initializer: typing.Optional[Local] = None
+        self.line = 1
+
+    def transpile(self, statements: typing.List[Stmt]) -> Program:
+        self.analysis.analyze(statements)
+        self.breaks_out = self.breaks_out or self.analysis.breaks_out
+        for stmt in statements:
+            self.dispatch[stmt.kind](stmt)
+        return self.program()
+
+    def transpile_expr(self, expr: Expr) -> Program:
+        self.analysis.analyze([expr])
+        self.emit(join("return ", self.expression(expr)))
+        return self.program()
+
+    def program(self) -> Program:
+        lines: typing.List[typing.Tuple[int, Code, int]] = []
+        self.splice(lines, join("def _main():"), self.function, 0)
+        texts = []
+        table = []
+        for indent, code, line in lines:
+            width = 4 * indent
+            texts.append(" " * width + code.text)
+            table.append((line, [(s + width, e + width, l) for s, e, l in code.spans]))
+        return Program("\n".join(texts) + "\n", table)
+
+    # Appends a function with its body to `lines` at `indent`.
+    def splice(
+        self,
+        lines: typing.List[typing.Tuple[int, Code, int]],
+        header: Code,
+        function: FunctionState,
+        indent: int,
+    ) -> None:
+        lines.append((indent, header, self.line))
+        if function.globals:
+            lines.append((indent + 1, join(f"global {', '.join(function.globals)}"), 0))
+        if not function.lines:
+            lines.append((indent + 1, join("pass"), 0))
+        for inner, code, line in function.lines:
+            lines.append((indent + 1 + inner, code, line))
+
+    def emit(self, code: typing.Union[str, Code]) -> None:
+        if type(code) is str:
+            code = join(code)
+        line = min((l for _, _, l in code.spans), default=self.line)
+        self.function.lines.append((self.function.indent, code, line))
+
+    def temp(self) -> str:
+        self.function.temps += 1
+        return f"_t{self.function.temps}"
+
+    def expression(self, expr: Expr) -> Code:
+        return self.dispatch[expr.kind](expr)
+
+    def statements(self, statements: typing.List[Stmt]) -> None:
+        for stmt in statements:
+            self.dispatch[stmt.kind](stmt)
+
+    # Statements one level further in, with `pass` if they emit nothing.
+    def suite(self, statements: typing.List[Stmt]) -> None:
+        self.function.indent += 1
+        count = len(self.function.lines)
+        self.statements(statements)
+        if len(self.function.lines) == count:
+            self.emit("pass")
+        self.function.indent -= 1
+
+    def truthy(self, code: Code) -> Code:
+        if code.literal is not NOT_LITERAL:
+            truth = code.literal is not None and code.literal is not False
+            return join(str(truth), boolean=True, pure=True, safe=True)
+        if code.boolean:
+            return code
+        if code.pure:
+            return join(
+                "(", code, " is not None and ", code, " is not False)", boolean=True
+            )
+        t = self.temp()
+        return join(
+            f"(({t} := ", code, f") is not None and {t} is not False)", boolean=True
+        )
+
+    def reader(self, local: Local) -> Code:
+        text = f"{local.python_name}[0]" if local.cell else local.python_name
+        return join(text, pure=True, safe=True)
+
+    def global_name(self, name: Token) -> str:
+        return f"lox_{name.lexeme}"
+
+    # Stores `value` in a newly declared variable.
+    def declare(self, local: typing.Optional[Local], name: Token, value: Code) -> None:
+        if local is None:
+            python_name = self.global_name(name)
+            self.function.globals[python_name] = None
+            self.emit(join(f"{python_name} = ", value))
+        elif local.cell:
+            self.emit(join(f"{local.python_name} = [", value, "]"))
+        else:
+            self.emit(join(f"{local.python_name} = ", value))
+
+    def visit_literal_expr(self, expr: expr_ast.Literal) -> Code:
+        value = expr.value
+        # Numbers are mostly floats at run time, which the operators handle
+        # inline; an integer literal is one too unless that loses digits.
+        if type(value) is int and float(value) == value:
+            value = float(value)
+        return join(
+            literal_text(value),
+            pure=True,
+            safe=True,
+            boolean=type(value) is bool,
+            literal=value,
+        )
+
+    def visit_grouping_expr(self, expr: expr_ast.Grouping) -> Code:
+        return self.expression(expr.expression)
+
+    def visit_variable_expr(self, expr: expr_ast.Variable) -> Code:
+        local = self.analysis.references.get(id(expr))
+        if local is None:
+            return join(self.global_name(expr.name), line=expr.name.line, pure=True)
+        return self.reader(local)
+
+    def visit_this_expr(self, expr: expr_ast.This) -> Code:
+        local = self.analysis.references.get(id(expr))
+        if local is None:
+            return join("lox_this", line=expr.keyword.line, pure=True)
+        return self.reader(local)
+
+    def visit_assign_expr(self, expr: expr_ast.Assign) -> Code:
+        value = self.expression(expr.value)
+        local = self.analysis.references.get(id(expr))
+        if local is None:
+            name = self.global_name(expr.name)
+            return join(f'_set_global("{name}", ', value, ")", line=expr.name.line)
+        if local.cell:
+            return join(f"_store({local.python_name}, ", value, ")")
+        return join(f"({local.python_name} := ", value, ")")
+
+    def visit_unary_expr(self, expr: expr_ast.Unary) -> Code:
+        right = self.expression(expr.right)
+        if expr.operator.token_type is TokenType.BANG:
+            truth = self.truthy(right)
+            return join("(not ", truth, ")", boolean=True)
+        line = expr.operator.line
+        if is_float(right):
+            return join("(-", right, ")", pure=True, safe=True)
+        if right.pure:
+            return join(
+                "(-",
+                right,
+                " if type(",
+                right,
+                ") is float else _negate(",
+                right,
+                "))",
+                line=line,
+            )
+        t = self.temp()
+        return join(
+            f"(-{t} if type({t} := ", right, f") is float else _negate({t}))", line=line
+        )
+
+    def visit_binary_expr(self, expr: expr_ast.Binary) -> Code:
+        left = self.expression(expr.left)
+        right = self.expression(expr.right)
+        kind = expr.operator.token_type
+        if kind is TokenType.EQUAL_EQUAL or kind is TokenType.BANG_EQUAL:
+            symbol = "==" if kind is TokenType.EQUAL_EQUAL else "!="
+            return join(
+                "(",
+                left,
+                f" {symbol} ",
+                right,
+                ")",
+                boolean=True,
+                safe=left.safe and right.safe,
+            )
+
+        symbol, helper = OPERATORS[kind]
+        line = expr.operator.line
+        if any(
+            code.literal is not NOT_LITERAL and not is_float(code)
+            for code in (left, right)
+        ):
+            return join(f"{helper}(", left, ", ", right, ")", line=line)
+        boolean = kind in COMPARISONS
+        # The right operand runs before the left one is used, so the left one
+        # has to be kept in a temporary unless the right one is pure.
+        checks: typing.List[Code] = []
+        operands: typing.List[typing.Union[str, Code]] = []
+        for operand in (left, right):
+            if is_float(operand):
+                operands.append(operand)
+            elif operand.pure and right.pure:
+                operands.append(operand)
+                checks.append(join("type(", operand, ") is float"))
+            else:
+                t = self.temp()
+                operands.append(t)
+                checks.append(join(f"type({t} := ", operand, ") is float"))
+        a, b = operands
+        if kind is TokenType.SLASH and is_float(right) and right.literal == 0:
+            return join(f"{helper}(", left, ", ", right, ")", line=line)
+        fast = join("(", a, f" {symbol} ", b)
+        if not checks:
+            return join(fast, ")", boolean=boolean)
+        if len(checks) == 2 and not right.pure:
+            # Both assignments have to happen whatever the first test gives.
+            condition = join("(", checks[0], ") & (", checks[1], ")")
+        else:
+            condition = join(*checks[:1], *(join(" and ", c) for c in checks[1:]))
+        if kind is TokenType.SLASH and not is_float(right):
+            condition = join(condition, " and ", b)
+        return join(
+            fast,
+            " if ",
+            condition,
+            f" else {helper}(",
+            a,
+            ", ",
+            b,
+            "))",
+            line=line,
+            boolean=boolean,
+        )
+
+    def visit_logical_expr(self, expr: expr_ast.Logical) -> Code:
+        left = self.expression(expr.left)
+        right = self.expression(expr.right)
+        is_or = expr.operator.token_type is TokenType.OR
+        flags = {"boolean": left.boolean and right.boolean}
+        if left.literal is not NOT_LITERAL:
+            truth = left.literal is not None and left.literal is not False
+            return left if truth is is_or else right
+        if left.boolean:
+            return join("(", left, " or " if is_or else " and ", right, ")", **flags)
+        if left.pure:
+            value, test = left, self.truthy(left)
+        else:
+            t = self.temp()
+            value = join(t)
+            test = join(f"(({t} := ", left, f") is not None and {t} is not False)")
+        if is_or:
+            return join("(", value, " if ", test, " else ", right, ")", **flags)
+        return join("(", right, " if ", test, " else ", value, ")", **flags)
+
+    def visit_call_expr(self, expr: expr_ast.Call) -> Code:
+        callee = self.callee(expr.callee)
+        arguments: typing.List[typing.Union[str, Code]] = []
+        for argument in expr.arguments:
+            if arguments:
+                arguments.append(", ")
+            arguments.append(self.expression(argument))
+        if callee.literal is not NOT_LITERAL:
+            # Python refuses to compile a call to a literal.
+            return join("_uncallable(", *arguments, ")", line=expr.paren.line)
+        return join(callee, "(", *arguments, ")", line=expr.paren.line)
+
+    # A called method needs no `_bound`: Python calls it without making a
+    # bound method at all.
+    def callee(self, expr: Expr) -> Code:
+        if type(expr) is expr_ast.Get:
+            return self.property(expr)
+        if type(expr) is expr_ast.Super:
+            return self.super_method(expr)
+        return self.expression(expr)
+
+    def visit_get_expr(self, expr: expr_ast.Get) -> Code:
+        return join("_bound(", self.property(expr), ")")
+
+    def property(self, expr: expr_ast.Get) -> Code:
+        obj = self.expression(expr.obj)
+        return join(obj, f".lox_{expr.name.lexeme}", line=expr.name.line)
+
+    def visit_set_expr(self, expr: expr_ast.Set) -> Code:
+        obj = self.expression(expr.obj)
+        value = self.expression(expr.value)
+        return join(
+            "_set_field(",
+            join("_instance(", obj, ")", line=expr.name.line),
+            f', "lox_{expr.name.lexeme}", ',
+            value,
+            ")",
+        )
+
+    def visit_super_expr(self, expr: expr_ast.Super) -> Code:
+        return join("_bound(", self.super_method(expr), ")")
+
+    def super_method(self, expr: expr_ast.Super) -> Code:
+        this = self.reader(self.analysis.references[id(expr)])
+        return join(
+            "super(__class__, ",
+            this,
+            f").lox_{expr.method.lexeme}",
+            line=expr.method.line,
+        )
+
+    def visit_expression_stmt(self, stmt: stmt_ast.Expression) -> None:
+        self.expression_statement(stmt.expression)
+
+    # Assignments at statement level need no helper: Python's own statements
+    # do, once the checks of Lox are made.
+    def expression_statement(self, expr: Expr) -> None:
+        if type(expr) is expr_ast.Assign:
+            self.assignment(expr)
+        elif type(expr) is expr_ast.Set:
+            self.field_assignment(expr)
+        else:
+            self.emit(self.expression(expr))
+
+    def assignment(self, expr: expr_ast.Assign) -> None:
+        value = self.expression(expr.value)
+        local = self.analysis.references.get(id(expr))
+        if local is not None:
+            suffix = "[0]" if local.cell else ""
+            self.emit(join(f"{local.python_name}{suffix} = ", value))
+            return
+        name = self.global_name(expr.name)
+        self.function.globals[name] = None
+        if not value.safe:
+            # The value comes first, errors included.
+            t = self.temp()
+            self.emit(join(f"{t} = ", value))
+            value = join(t)
+        self.emit(
+            join(
+                f'if "{name}" not in _G: ',
+                join(f'_undefined("{name}")', line=expr.name.line),
+            )
+        )
+        self.emit(join(f"{name} = ", value))
+
+    def field_assignment(self, expr: expr_ast.Set) -> None:
+        obj = self.expression(expr.obj)
+        if type(expr.obj) is not expr_ast.This or expr.obj.resolved is None:
+            if not obj.pure:
+                t = self.temp()
+                self.emit(join(f"{t} = ", obj))
+                obj = join(t, pure=True)
+            self.emit(
+                join(
+                    "if not isinstance(",
+                    obj,
+                    ", _LoxObject): ",
+                    join("_no_fields()", line=expr.name.line),
+                )
+            )
+        value = self.expression(expr.value)
+        self.emit(join(obj, f".lox_{expr.name.lexeme} = ", value))
+
+    def visit_print_stmt(self, stmt: stmt_ast.Print) -> None:
+        self.emit(join("_print(", self.expression(stmt.expression), ")"))
+
+    def visit_var_stmt(self, stmt: stmt_ast.Var) -> None:
+        self.line = stmt.name.line
+        if stmt.initializer is None:
+            value = join("None")
+        else:
+            value = self.expression(stmt.initializer)
+        self.declare(self.analysis.locals.get(id(stmt)), stmt.name, value)
+
+    def visit_block_stmt(self, stmt: stmt_ast.Block) -> None:
+        self.statements(stmt.statements)
+
+    def visit_if_stmt(self, stmt: stmt_ast.If) -> None:
+        keyword = "if"
+        while True:
+            condition = self.truthy(self.expression(stmt.condition))
+            self.emit(join(f"{keyword} ", condition, ":"))
+            self.suite([stmt.then_branch])
+            else_branch = stmt.else_branch
+            if type(else_branch) is not stmt_ast.If:
+                break
+            # `elif` keeps chains from nesting deeper and deeper.
+            stmt, keyword = else_branch, "elif"
+        if else_branch is not None:
+            self.emit("else:")
+            self.suite([else_branch])
+
+    def visit_while_stmt(self, stmt: stmt_ast.While) -> None:
+        self.begin_loop()
+        condition = self.truthy(self.expression(stmt.condition))
+        self.emit(join("while ", condition, ":"))
+        self.suite([stmt.body])
+        self.end_loop()
+
+    def visit_for_stmt(self, stmt: stmt_ast.For) -> None:
+        if stmt.initializer is not None:
+            self.dispatch[stmt.initializer.kind](stmt.initializer)
+        self.begin_loop()
+        if stmt.condition is None:
+            condition = join("True")
+        else:
+            condition = self.truthy(self.expression(stmt.condition))
+        self.emit(join("while ", condition, ":"))
+        self.function.indent += 1
+        self.dispatch[stmt.body.kind](stmt.body)
+        if stmt.increment is not None:
+            self.expression_statement(stmt.increment)
+        else:
+            self.emit("pass")
+        self.function.indent -= 1
+        self.end_loop()
+
+    def begin_loop(self) -> None:
+        self.function.loops += 1
+        if self.breaks_out:
+            self.emit("try:")
+            self.function.indent += 1
+
+    def end_loop(self) -> None:
+        self.function.loops -= 1
+        if self.breaks_out:
+            self.function.indent -= 1
+            self.emit("except _Break:")
+            self.emit("    pass")
+
+    def visit_break_stmt(self, stmt: stmt_ast.Break) -> None:
+        self.emit("break" if self.function.loops else "raise _Break()")
+
+    def visit_return_stmt(self, stmt: stmt_ast.Return) -> None:
+        if self.initializer is not None:
+            self.emit(join("return ", self.reader(self.initializer)))
+        elif stmt.value is None:
+            self.emit("return None")
+        else:
+            self.emit(join("return ", self.expression(stmt.value)))
+
+    def visit_function_stmt(self, stmt: stmt_ast.Function) -> None:
+        local = self.analysis.locals.get(id(stmt))
+        if local is None:
+            name = self.global_name(stmt.name)
+            self.function.globals[name] = None
+            self.define_function(stmt, name)
+        elif not local.cell:
+            self.define_function(stmt, local.python_name)
+        else:
+            # The cell exists first when the function needs it itself.
+            if local.early:
+                self.emit(f"{local.python_name} = [None]")
+            self.define_function(stmt, f"_{local.python_name}")
+            if local.early:
+                self.emit(f"{local.python_name}[0] = _{local.python_name}")
+            else:
+                self.emit(f"{local.python_name} = [_{local.python_name}]")
+
+    # A Python function running `stmt`. Parameters arrive in `*args`, so a
+    # wrong number of arguments is a Lox error rather than a TypeError, and
+    # the captured locals as keyword defaults.
+    def define_function(
+        self, stmt: stmt_ast.Function, name: str, method: bool = False
+    ) -> None:
+        self.line = stmt.name.line
+        params = [self.analysis.locals[id(param)] for param in stmt.params]
+        this = self.analysis.locals[id(stmt)] if method else None
+        header = [this.python_name] if this is not None else []
+        header.append("*args")
+        header.extend(
+            f"{local.python_name}={local.python_name}"
+            for local in self.analysis.free[id(stmt)]
+        )
+
+        enclosing, enclosing_init = self.function, self.initializer
+        self.function = FunctionState()
+        is_init = method and stmt.name.lexeme == "init"
+        self.initializer = this if is_init else None
+        if params:
+            names = ", ".join(local.python_name for local in params)
+            if len(params) == 1:
+                names += ","
+            self.emit("try:")
+            self.emit(f"    {names} = args")
+            self.emit("except ValueError:")
+            self.emit(f"    _arity({len(params)}, args)")
+        else:
+            self.emit("if args:")
+            self.emit("    _arity(0, args)")
+        for local in params:
+            if local.cell:
+                self.emit(f"{local.python_name} = [{local.python_name}]")
+        self.statements(stmt.body)
+        if this is not None and is_init:
+            self.emit(f"return {this.python_name}")
+        function = self.function
+        self.function, self.initializer = enclosing, enclosing_init
+
+        self.line = stmt.name.line
+        header_code = join(f"def {name}({', '.join(header)}):")
+        self.splice(self.function.lines, header_code, function, self.function.indent)
+
+    def visit_class_stmt(self, stmt: stmt_ast.Class) -> None:
+        self.line = stmt.name.line
+        local = self.analysis.locals.get(id(stmt))
+        if local is not None and local.early:
+            self.emit(f"{local.python_name} = [None]")
+        if stmt.superclass is None:
+            base = join("_LoxObject")
+        else:
+            superclass = self.expression(stmt.superclass)
+            base = join("_superclass(", superclass, ")", line=stmt.superclass.name.line)
+        self.emit(join("class _class(", base, "):"))
+        self.function.indent += 1
+        self.emit(f"__qualname__ = {stmt.name.lexeme!r}")
+        for method in stmt.methods:
+            self.define_function(method, f"lox_{method.name.lexeme}", method=True)
+        if any(method.name.lexeme == "init" for method in stmt.methods):
+            self.emit("__init__ = _construct")
+        self.function.indent -= 1
+        if local is not None and local.early:
+            self.emit(f"{local.python_name}[0] = _class")
+        else:
+            self.declare(local, stmt.name, join("_class"))
+
+
+# Runs programs through `Transpiler` and CPython's compiler. All the programs
+# share one module namespace, holding the helpers and the Lox globals, so the
+# REPL keeps its globals from line to line.
+#
+# Python exceptions of the generated code become `LoxRuntimeError`s. The line
+# comes from the innermost frame of generated code: Python knows the columns
+# of the instruction that failed, and the spans of the line give the Lox line
+# of the smallest expression around them.
+class PythonEngine:
+    def __init__(self, interpreter: Interpreter) -> None:
+        self.interpreter = interpreter
+        namespace: typing.Dict[str, typing.Any] = {"__builtins__": builtins}
+        namespace.update(HELPERS)
+        namespace["_G"] = namespace
+        for name, value in interpreter.globals.values.items():
+            if isinstance(value, LoxCallable):
+                value = Native(value, interpreter)
+            namespace[f"lox_{name}"] = value
+
+        def set_global(name: str, value: typing.Any) -> typing.Any:
+            if name not in namespace:
+                undefined(name)
+            namespace[name] = value
+            return value
+
+        namespace["_set_global"] = set_global
+        write_line = interpreter.output.write_line
+        namespace["_print"] = lambda value: write_line(stringify(value))
+        self.namespace = namespace
+        self.programs: typing.Dict[str, Program] = {}
+        self.counter = itertools.count(1)
+        # Whether a program run so far has a `break` out of a function.
+        self.breaks_out = False
+
+    def interpret(self, statements: typing.List[Stmt]) -> None:
+        try:
+            transpiler = Transpiler(self.breaks_out)
+            program = transpiler.transpile(statements)
+            self.breaks_out = transpiler.breaks_out
+            self.run(program)
+        finally:
+            self.interpreter.output.flush()
+
+    def interpret_expr(self, expr: Expr) -> str:
+        return stringify(self.run(Transpiler().transpile_expr(expr)))
+
+    # The Python a program is translated to.
+    @staticmethod
+    def transpile(statements: typing.List[Stmt]) -> str:
+        return Transpiler().transpile(statements).source
+
+    def run(self, program: Program) -> typing.Any:
+        filename = f"<lox-{next(self.counter)}>"
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", SyntaxWarning)
+            code = compile(program.source, filename, "exec")
+        self.programs[filename] = program
+        # Lets tracebacks of crashes show the generated code.
+        linecache.cache[filename] = (
+            len(program.source),
+            None,
+            program.source.splitlines(True),
+            filename,
+        )
+        exec(code, self.namespace)
+        main = self.namespace.pop("_main")
+        try:
+            return main()
+        except RuntimeFault as fault:
+            raise self.error(fault, fault.message, fault.callee) from None
+        except NameError as e:
+            if not (e.name or "").startswith("lox_"):
+                raise
+            raise self.error(e, f"Undefined variable {e.name[4:]}.") from None
+        except AttributeError as e:
+            if not (e.name or "").startswith("lox_"):
+                raise
+            name = e.name[4:]
+            if isinstance(e.obj, super):
+                message = f"Undefined property '{name}'."
+            elif isinstance(e.obj, LoxObject):
+                message = f"Undefined property {name}."
+            else:
+                message = "Only instances have properties."
+            raise self.error(e, message) from None
+        except TypeError as e:
+            if "object is not callable" not in str(e):
+                raise
+            raise self.error(e, "Can only call functions and classes.") from None
+        except RecursionError as e:
+            raise self.error(e, "Stack overflow.") from None
+
+    def error(
+        self, exception: BaseException, message: str, skip: typing.Any = None
+    ) -> LoxRuntimeError:
+        found = None
+        tb = exception.__traceback__
+        while tb is not None:
+            frame = tb.tb_frame
+            if frame is not skip and frame.f_code.co_filename in self.programs:
+                found = tb
+            tb = tb.tb_next
+        line = 0 if found is None else self.lox_line(found)
+        return LoxRuntimeError(Token(TokenType.EOF, "", None, line), message)
+
+    def lox_line(self, tb: types.TracebackType) -> int:
+        code = tb.tb_frame.f_code
+        program = self.programs[code.co_filename]
+        positions = list(code.co_positions())[tb.tb_lasti // 2]
+        python_line, _, start, end = positions
+        if python_line is None:
+            python_line = tb.tb_lineno
+        line, spans = program.lines[python_line - 1]
+        if start is None or end is None:
+            return line
+        best = None
+        for span in spans:
+            inside = span[0] <= start and end <= span[1]
+            if inside and (best is None or span[1] - span[0] < best[1] - best[0]):
+                best = span
+        return line if best is None else best[2]
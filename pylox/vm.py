@@ -0,0 +1,494 @@
+import typing
+
+from pylox.bytecode import BytecodeFunction, OpCode
+from pylox.bytecode_compiler import BytecodeCompiler
+from pylox.error import BreakException, LoxRuntimeError
+from pylox.expr import Expr
+from pylox.interpreter import Interpreter
+from pylox.rope import STRING_TYPES
+from pylox.runtime_object import LoxCallable, LoxClass, LoxInstance
+from pylox.stmt import Stmt
+from pylox.tokens import Token, TokenType
+
+# The opcodes as plain ints: the dispatch loop compares `op` against them,
+# and comparing two ints is an order of magnitude faster than comparing an
+# int with an `IntEnum` member.
+CONSTANT = OpCode.CONSTANT.value
+NIL = OpCode.NIL.value
+TRUE = OpCode.TRUE.value
+FALSE = OpCode.FALSE.value
+POP = OpCode.POP.value
+GET_LOCAL = OpCode.GET_LOCAL.value
+SET_LOCAL = OpCode.SET_LOCAL.value
+GET_GLOBAL = OpCode.GET_GLOBAL.value
+DEFINE_GLOBAL = OpCode.DEFINE_GLOBAL.value
+SET_GLOBAL = OpCode.SET_GLOBAL.value
+GET_UPVALUE = OpCode.GET_UPVALUE.value
+SET_UPVALUE = OpCode.SET_UPVALUE.value
+GET_PROPERTY = OpCode.GET_PROPERTY.value
+SET_PROPERTY = OpCode.SET_PROPERTY.value
+GET_SUPER = OpCode.GET_SUPER.value
+EQUAL = OpCode.EQUAL.value
+NOT_EQUAL = OpCode.NOT_EQUAL.value
+GREATER = OpCode.GREATER.value
+GREATER_EQUAL = OpCode.GREATER_EQUAL.value
+LESS = OpCode.LESS.value
+LESS_EQUAL = OpCode.LESS_EQUAL.value
+ADD = OpCode.ADD.value
+SUBTRACT = OpCode.SUBTRACT.value
+MULTIPLY = OpCode.MULTIPLY.value
+DIVIDE = OpCode.DIVIDE.value
+NOT = OpCode.NOT.value
+NEGATE = OpCode.NEGATE.value
+PRINT = OpCode.PRINT.value
+JUMP = OpCode.JUMP.value
+JUMP_IF_FALSE = OpCode.JUMP_IF_FALSE.value
+JUMP_IF_TRUE = OpCode.JUMP_IF_TRUE.value
+POP_JUMP_IF_FALSE = OpCode.POP_JUMP_IF_FALSE.value
+CALL = OpCode.CALL.value
+INVOKE = OpCode.INVOKE.value
+SUPER_INVOKE = OpCode.SUPER_INVOKE.value
+CLOSURE = OpCode.CLOSURE.value
+CLOSE_UPVALUE = OpCode.CLOSE_UPVALUE.value
+RETURN = OpCode.RETURN.value
+CLASS = OpCode.CLASS.value
+INHERIT = OpCode.INHERIT.value
+METHOD = OpCode.METHOD.value
+BREAK_OUT = OpCode.BREAK_OUT.value
+
+# Nested calls allowed before "Stack overflow.", unless configured otherwise:
+# frames live on the heap, so deep recursion only costs memory.
+MAX_FRAMES = 500_000
+
+stringify = Interpreter.stringify
+concatenate = Interpreter.concatenate
+
+
+# A variable captured by a closure. While the variable is on the stack,
+# `cell` is the stack and `index` its slot; once it goes out of scope the
+# value moves into a list of its own, at index 0.
+class Upvalue:
+    __slots__ = ("cell", "index")
+
+    def __init__(self, cell: list, index: int) -> None:
+        self.cell = cell
+        self.index = index
+
+
+class Closure:
+    __slots__ = ("function", "upvalues")
+
+    def __init__(self, function: BytecodeFunction, upvalues: list) -> None:
+        self.function = function
+        self.upvalues = upvalues
+
+    def __str__(self) -> str:
+        return str(self.function)
+
+
+class BoundMethod:
+    __slots__ = ("receiver", "method")
+
+    def __init__(self, receiver: LoxInstance, method: Closure) -> None:
+        self.receiver = receiver
+        self.method = method
+
+    def __str__(self) -> str:
+        return str(self.method)
+
+
+# Raised by the VM without a token; `VM.run` adds the line of the
+# instruction that failed and turns it into a `LoxRuntimeError`.
+class RuntimeFault(Exception):
+    def __init__(self, message: str) -> None:
+        self.message = message
+
+
+def numbers(left: typing.Any, right: typing.Any) -> typing.Tuple[float, float]:
+    if (type(left) is float or type(left) is int) and (
+        type(right) is float or type(right) is int
+    ):
+        return float(left), float(right)
+    raise RuntimeFault("Operands must be a numbers.")
+
+
+def add(left: typing.Any, right: typing.Any) -> typing.Any:
+    if (type(left) is float or type(left) is int) and (
+        type(right) is float or type(right) is int
+    ):
+        return float(left) + float(right)
+    if type(left) in STRING_TYPES or type(right) in STRING_TYPES:
+        return concatenate(left, right)
+    raise RuntimeFault("Operands must be two numbers or two strings.")
+
+
+def close_upvalues(
+    open_upvalues: typing.Dict[int, Upvalue], stack: list, last: int
+) -> None:
+    for slot in [slot for slot in open_upvalues if slot >= last]:
+        upvalue = open_upvalues.pop(slot)
+        upvalue.cell = [stack[slot]]
+        upvalue.index = 0
+
+
+# Runs programs compiled by `BytecodeCompiler` on a value stack, following
+# the second half of Crafting Interpreters. Classes and instances are the
+# interpreter's, natives are called through `LoxCallable`, and the globals
+# are shared with the interpreter.
+#
+# Frames live on a list rather than the Python stack, so the depth of Lox
+# recursion is bounded by `max_depth` alone. A call followed directly by a
+# `RETURN` is a tail call, `return f(x);`: the callee takes over the frame of
+# the caller, so tail recursion runs in constant space.
+class VM:
+    def __init__(self, interpreter: Interpreter, max_depth: int = MAX_FRAMES) -> None:
+        self.interpreter = interpreter
+        self.globals = interpreter.globals.values
+        self.compiler = BytecodeCompiler()
+        self.max_depth = max_depth
+        self.tail_calls: int = 0
+
+    def interpret(self, statements: typing.List[Stmt]) -> None:
+        try:
+            self.run(self.compiler.compile(statements))
+        finally:
+            self.interpreter.output.flush()
+
+    def interpret_expr(self, expr: Expr) -> str:
+        return stringify(self.run(self.compiler.compile_expr(expr)))
+
+    def report(self) -> typing.List[str]:
+        return [f"frames: {self.tail_calls} reused by tail calls"]
+
+    # Places the result of calling a callee that is not a closure on the
+    # stack, or returns the closure to run with its arguments on the stack.
+    def call_value(
+        self, callee: typing.Any, count: int, stack: list
+    ) -> typing.Optional[Closure]:
+        if type(callee) is BoundMethod:
+            stack[-1 - count] = callee.receiver
+            return callee.method
+        if isinstance(callee, LoxClass):
+            stack[-1 - count] = LoxInstance(callee)
+            initializer = callee.initializer
+            if initializer is not None:
+                return typing.cast(Closure, initializer)
+            if count != 0:
+                raise RuntimeFault(f"Expected 0 arguments but got {count}.")
+            return None
+        if isinstance(callee, LoxCallable):
+            if count != callee.arity():
+                raise RuntimeFault(
+                    f"Expected {callee.arity()} arguments but got {count}."
+                )
+            start = len(stack) - count
+            args = stack[start:]
+            del stack[start - 1 :]
+            stack.append(callee.call(self.interpreter, args))
+            return None
+        raise RuntimeFault("Can only call functions and classes.")
+
+    # The dispatch loop. The state of the running frame lives in locals and
+    # is saved on `frames` as (closure, ip, base) during calls; the most
+    # frequent instructions are tested first.
+    def run(self, function: BytecodeFunction) -> typing.Any:
+        globals_ = self.globals
+        max_depth = self.max_depth
+        write_line = self.interpreter.output.write_line
+        closure = Closure(function, [])
+        stack: list = [closure]
+        push, pop = stack.append, stack.pop
+        frames: typing.List[typing.Tuple[Closure, int, int]] = []
+        open_upvalues: typing.Dict[int, Upvalue] = {}
+        code = function.chunk.code
+        constants = function.chunk.constants
+        upvalues = closure.upvalues
+        base = ip = 0
+        try:
+            while True:
+                op = code[ip]
+                ip += 1
+                if op == GET_LOCAL:
+                    push(stack[base + code[ip]])
+                    ip += 1
+                elif op == CONSTANT:
+                    push(constants[code[ip]])
+                    ip += 1
+                elif op == POP:
+                    pop()
+                elif op == GET_GLOBAL:
+                    name = constants[code[ip]]
+                    ip += 1
+                    try:
+                        push(globals_[name])
+                    except KeyError:
+                        raise RuntimeFault(f"Undefined variable {name}.") from None
+                elif op == RETURN:
+                    result = pop()
+                    if open_upvalues:
+                        close_upvalues(open_upvalues, stack, base)
+                    if not frames:
+                        return result
+                    del stack[base:]
+                    push(result)
+                    closure, ip, base = frames.pop()
+                    code = closure.function.chunk.code
+                    constants = closure.function.chunk.constants
+                    upvalues = closure.upvalues
+                elif op == ADD:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) is float and type(right) is float:
+                        stack[-1] = left + right
+                    else:
+                        stack[-1] = add(left, right)
+                elif op == POP_JUMP_IF_FALSE:
+                    value = pop()
+                    if value is None or value is False:
+                        ip = code[ip]
+                    else:
+                        ip += 1
+                elif op == GET_PROPERTY:
+                    instance = stack[-1]
+                    if not isinstance(instance, LoxInstance):
+                        raise RuntimeFault("Only instances have properties.")
+                    name = constants[code[ip]]
+                    ip += 1
+                    index = instance.shape.slots.get(name)
+                    if index is not None:
+                        stack[-1] = instance.values[index]
+                    else:
+                        method = instance.lox_class.find_method(name)
+                        if method is None:
+                            raise RuntimeFault(f"Undefined property {name}.")
+                        stack[-1] = BoundMethod(instance, method)  # type: ignore
+                elif op == LESS:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) is not float or type(right) is not float:
+                        left, right = numbers(left, right)
+                    stack[-1] = left < right
+                elif CALL <= op <= SUPER_INVOKE:
+                    if op == CALL:
+                        count = code[ip]
+                        ip += 1
+                        callee = stack[-1 - count]
+                    elif op == INVOKE:
+                        name = constants[code[ip]]
+                        count = code[ip + 1]
+                        ip += 2
+                        receiver = stack[-1 - count]
+                        if not isinstance(receiver, LoxInstance):
+                            raise RuntimeFault("Only instances have properties.")
+                        index = receiver.shape.slots.get(name)
+                        if index is not None:
+                            callee = stack[-1 - count] = receiver.values[index]
+                        else:
+                            callee = receiver.lox_class.find_method(name)
+                            if callee is None:
+                                raise RuntimeFault(f"Undefined property {name}.")
+                    else:
+                        name = constants[code[ip]]
+                        count = code[ip + 1]
+                        ip += 2
+                        callee = pop().find_method(name)
+                        if callee is None:
+                            raise RuntimeFault(f"Undefined property '{name}'.")
+                    if type(callee) is not Closure:
+                        callee = self.call_value(callee, count, stack)
+                        if callee is None:
+                            continue
+                    function = callee.function
+                    if function.arity != count:
+                        raise RuntimeFault(
+                            f"Expected {function.arity} arguments but got {count}."
+                        )
+                    # Not in a loop, where a `break` from the callee would
+                    # need the frame.
+                    if (
+                        code[ip] == RETURN
+                        and ip not in closure.function.chunk.break_targets
+                    ):
+                        # The callee and its arguments replace the frame.
+                        if open_upvalues:
+                            close_upvalues(open_upvalues, stack, base)
+                        stack[base:] = stack[len(stack) - count - 1 :]
+                        self.tail_calls += 1
+                    else:
+                        if len(frames) == max_depth:
+                            raise RuntimeFault("Stack overflow.")
+                        frames.append((closure, ip, base))
+                        base = len(stack) - count - 1
+                    closure = callee
+                    code = function.chunk.code
+                    constants = function.chunk.constants
+                    upvalues = callee.upvalues
+                    ip = 0
+                elif op == SET_PROPERTY:
+                    value = pop()
+                    instance = stack[-1]
+                    if not isinstance(instance, LoxInstance):
+                        raise RuntimeFault("Only instances have fields.")
+                    instance.set_field(constants[code[ip]], value)
+                    ip += 1
+                    stack[-1] = value
+                elif op == JUMP:
+                    ip = code[ip]
+                elif op == SUBTRACT:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) is not float or type(right) is not float:
+                        left, right = numbers(left, right)
+                    stack[-1] = left - right
+                elif op == SET_LOCAL:
+                    stack[base + code[ip]] = stack[-1]
+                    ip += 1
+                elif op == SET_GLOBAL:
+                    name = constants[code[ip]]
+                    ip += 1
+                    if name not in globals_:
+                        raise RuntimeFault(f"Undefined variable {name}.")
+                    globals_[name] = stack[-1]
+                elif op == EQUAL:
+                    right = pop()
+                    stack[-1] = stack[-1] == right
+                elif op == JUMP_IF_TRUE:
+                    value = stack[-1]
+                    if value is None or value is False:
+                        ip += 1
+                    else:
+                        ip = code[ip]
+                elif op == GET_UPVALUE:
+                    upvalue = upvalues[code[ip]]
+                    ip += 1
+                    push(upvalue.cell[upvalue.index])
+                elif op == SET_UPVALUE:
+                    upvalue = upvalues[code[ip]]
+                    ip += 1
+                    upvalue.cell[upvalue.index] = stack[-1]
+                elif op == NOT:
+                    value = stack[-1]
+                    stack[-1] = value is None or value is False
+                elif op == GREATER:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) is not float or type(right) is not float:
+                        left, right = numbers(left, right)
+                    stack[-1] = left > right
+                elif op == GREATER_EQUAL:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) is not float or type(right) is not float:
+                        left, right = numbers(left, right)
+                    stack[-1] = left >= right
+                elif op == LESS_EQUAL:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) is not float or type(right) is not float:
+                        left, right = numbers(left, right)
+                    stack[-1] = left <= right
+                elif op == NOT_EQUAL:
+                    right = pop()
+                    stack[-1] = stack[-1] != right
+                elif op == MULTIPLY:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) is not float or type(right) is not float:
+                        left, right = numbers(left, right)
+                    stack[-1] = left * right
+                elif op == DIVIDE:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) is not float or type(right) is not float:
+                        left, right = numbers(left, right)
+                    if right == 0:
+                        raise RuntimeFault("Division by zero!")
+                    stack[-1] = left / right
+                elif op == NEGATE:
+                    value = stack[-1]
+                    if type(value) is not float and type(value) is not int:
+                        raise RuntimeFault("Operand must be a number.")
+                    stack[-1] = -float(value)
+                elif op == JUMP_IF_FALSE:
+                    value = stack[-1]
+                    if value is None or value is False:
+                        ip = code[ip]
+                    else:
+                        ip += 1
+                elif op == CLOSURE:
+                    function = constants[code[ip]]
+                    ip += 1
+                    captured = []
+                    for _ in range(function.upvalue_count):
+                        if code[ip]:
+                            slot = base + code[ip + 1]
+                            upvalue = open_upvalues.get(slot)
+                            if upvalue is None:
+                                upvalue = open_upvalues[slot] = Upvalue(stack, slot)
+                            captured.append(upvalue)
+                        else:
+                            captured.append(upvalues[code[ip + 1]])
+                        ip += 2
+                    push(Closure(function, captured))
+                elif op == CLOSE_UPVALUE:
+                    upvalue = open_upvalues.pop(len(stack) - 1, None)
+                    if upvalue is not None:
+                        upvalue.cell = [stack[-1]]
+                        upvalue.index = 0
+                    pop()
+                elif op == NIL:
+                    push(None)
+                elif op == TRUE:
+                    push(True)
+                elif op == FALSE:
+                    push(False)
+                elif op == PRINT:
+                    write_line(stringify(pop()))
+                elif op == DEFINE_GLOBAL:
+                    globals_[constants[code[ip]]] = pop()
+                    ip += 1
+                elif op == GET_SUPER:
+                    name = constants[code[ip]]
+                    ip += 1
+                    method = pop().find_method(name)
+                    if method is None:
+                        raise RuntimeFault(f"Undefined property '{name}'.")
+                    stack[-1] = BoundMethod(stack[-1], method)
+                elif op == CLASS:
+                    push(LoxClass(constants[code[ip]], None, {}))  # type: ignore
+                    ip += 1
+                elif op == INHERIT:
+                    if not isinstance(stack[-1], LoxClass):
+                        raise RuntimeFault("Superclass must be a class.")
+                    stack[-2].inherit(stack[-1])
+                elif op == METHOD:
+                    method = pop()
+                    stack[-1].add_method(constants[code[ip]], method)
+                    ip += 1
+                elif op == BREAK_OUT:
+                    while True:
+                        if open_upvalues:
+                            close_upvalues(open_upvalues, stack, base)
+                        del stack[base:]
+                        if not frames:
+                            raise BreakException()
+                        closure, ip, base = frames.pop()
+                        target = closure.function.chunk.break_targets.get(ip)
+                        if target is not None:
+                            break
+                    ip, height = target
+                    if open_upvalues:
+                        close_upvalues(open_upvalues, stack, base + height)
+                    del stack[base + height :]
+                    code = closure.function.chunk.code
+                    constants = closure.function.chunk.constants
+                    upvalues = closure.upvalues
+                else:
+                    raise RuntimeFault(f"Unknown opcode {op}.")
+        except RuntimeFault as fault:
+            # Closures that outlive the run keep the values they saw.
+            close_upvalues(open_upvalues, stack, 0)
+            line = closure.function.chunk.lines[ip - 1]
+            raise LoxRuntimeError(
+                Token(TokenType.EOF, "", None, line), fault.message
+            ) from None
@@ -0,0 +1,161 @@
+from pylox.adaptive import (
+    AdaptiveInterpreter,
+    AddNumbers,
+    GenericBinary,
+    GenericGet,
+    GetField,
+    GetMethod,
+)
+from pylox.cache import dump_program, load_program
+from pylox.cli import EngineKind, Lox
+from pylox.expr import Get
+from pylox.interpreter import Interpreter
+from pylox.parser import Parser
+from pylox.resolver import Resolver
+from pylox.scanner import Scanner
+
+
+def prepare(src: str):
+    statements = Parser(Scanner(src).scan_tokens()).parse()
+    interpreter = Interpreter()
+    Resolver(interpreter).resolve(statements)
+    return AdaptiveInterpreter(interpreter), statements
+
+
+def test_if_number_arithmetic_specializes_once(capsys) -> None:
+    # GIVEN
+    engine, statements = prepare(
+        "var sum = 0;\nfor (var i = 0; i < 10; i = i + 1) sum = sum + i;\nprint sum;"
+    )
+
+    # WHEN
+    engine.interpret(statements)
+
+    # THEN
+    assert capsys.readouterr().out == "45\n"
+    assert engine.specializations == {"AddNumbers": 2, "LessNumbers": 1}
+    assert not engine.despecializations
+    assert type(statements[1].increment.value) is AddNumbers
+
+
+def test_if_a_type_change_despecializes_and_keeps_the_semantics(capsys) -> None:
+    # GIVEN
+    engine, statements = prepare(
+        "fun add(a, b) { return a + b; }\n"
+        'print add(1, 2);\nprint add("a", "b");\nprint add("c", "d");'
+    )
+
+    # WHEN
+    engine.interpret(statements)
+
+    # THEN
+    assert capsys.readouterr().out == "3\nab\ncd\n"
+    assert engine.despecializations == {"AddNumbers": 1}
+    assert engine.specializations["AddStrings"] == 1
+
+
+def test_if_a_site_that_keeps_changing_settles_for_generic_code(capsys) -> None:
+    # GIVEN
+    engine, statements = prepare(
+        "fun add(a, b) { return a + b; }\n"
+        'print add(1, 2);\nprint add("a", "b");\nprint add(3, 4);\nprint add("c", 5);\n'
+        'print add(6, 7);\nprint add("d", "e");'
+    )
+
+    # WHEN
+    engine.interpret(statements)
+
+    # THEN
+    assert capsys.readouterr().out.split() == ["3", "ab", "7", "c5", "13", "de"]
+    assert type(statements[0].body[0].value) is GenericBinary
+    assert statements[0].body[0].value.failures == 2
+    assert engine.despecializations == {"AddNumbers": 2}
+
+
+def test_if_property_access_follows_fields_shadowing_methods(capsys) -> None:
+    # GIVEN
+    engine, statements = prepare(
+        "class A { m() { return 1; } }\nvar a = A();\n"
+        "fun get(o) { return o.m; }\n"
+        'print get(a)();\na.m = "field";\nprint get(a);\nprint get(a);\n'
+        "print get(A())();"
+    )
+
+    # WHEN
+    engine.interpret(statements)
+
+    # THEN
+    assert capsys.readouterr().out == "1\nfield\nfield\n1\n"
+    assert engine.despecializations == {"GetMethod": 1, "GetField": 1}
+    assert engine.specializations["GetMethod"] == 1
+    assert engine.specializations["GetField"] == 1
+    assert type(statements[2].body[0].value) is GenericGet
+
+
+def test_if_runtime_errors_match_the_tree_walker(capsys) -> None:
+    # GIVEN
+    sources = [
+        "fun f(a) { return -a; }\nprint f(1);\nprint f(nil);",
+        "fun f(a, b) { return a / b; }\nprint f(1, 2);\nprint f(1, 0);",
+        "fun f(o) { return o.x; }\nclass A {}\nvar a = A();\na.x = 1;\nprint f(a);\nf(1);",
+    ]
+
+    # WHEN
+    for src in sources:
+        Lox(engine=EngineKind.ADAPTIVE).run(src)
+
+    # THEN
+    assert capsys.readouterr().out == (
+        "-1\nline 1: Operand must be a number.\n"
+        "0.5\nline 1: Division by zero!\n"
+        "1\nline 1: Only instances have properties.\n"
+    )
+
+
+def test_if_runtime_caches_are_not_saved_with_the_program() -> None:
+    # GIVEN
+    engine, statements = prepare("class A { m() {} }\nvar a = A();\na.m;")
+    payload = dump_program(statements)
+
+    # WHEN
+    engine.interpret(statements)
+
+    # THEN
+    assert type(statements[2].expression) is GetMethod
+    assert type(load_program(payload)[2].expression) is Get
+    assert GetField.runtime_fields == ("cache", "failures")
+
+
+def test_if_engine_report_shows_the_counters(capsys) -> None:
+    # GIVEN
+    lines = []
+    lox = Lox(engine=EngineKind.ADAPTIVE, engine_report=lines.append)
+
+    # WHEN
+    lox.run('print 1 + 2;\nprint "a" + "b";')
+
+    # THEN
+    assert capsys.readouterr().out == "3\nab\n"
+    assert lines == [
+        "inline caches: property 0 hits, 0 misses; super 0 hits, 0 misses",
+        "bound methods: 0 created, 0 elided by direct calls",
+        "quickening: 2 specializations (1 AddNumbers, 1 AddStrings)",
+        "quickening: 0 de-specializations",
+    ]
+
+
+def test_if_a_field_read_follows_instances_of_other_shapes(capsys) -> None:
+    # GIVEN
+    engine, statements = prepare(
+        "class A {}\nfun get(o) { return o.x; }\n"
+        "var a = A();\na.x = 1;\nvar b = A();\nb.y = 2;\nb.x = 3;\n"
+        "print get(a);\nprint get(b);\nprint get(a);"
+    )
+
+    # WHEN
+    engine.interpret(statements)
+
+    # THEN
+    assert capsys.readouterr().out == "1\n3\n1\n"
+    assert type(statements[1].body[0].value) is GetField
+    assert not engine.despecializations
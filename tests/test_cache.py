@@ -0,0 +1,95 @@
+from pylox.cache import ProgramCache, dump_program, load_program
+from pylox.cli import Lox
+
+PROGRAM = """
+var a = "global";
+{
+  fun show() { print a; }
+  show();
+  var a = "block";
+  show();
+}
+class Counter {
+  init() { this.n = 0; }
+  inc() { this.n = this.n + 1; return this; }
+}
+print Counter().inc().inc().n;
+print 1.5 + 2;
+"""
+
+
+def write_script(tmp_path, src: str = PROGRAM):
+    path = tmp_path / "script.lox"
+    path.write_text(src, encoding="utf-8")
+    return str(path)
+
+
+def test_if_loaded_program_runs_like_the_original(capsys) -> None:
+    # GIVEN
+    lox = Lox()
+    statements = lox.front_end(lox.scanner(PROGRAM))
+    lox.execute(statements)
+    expected = capsys.readouterr().out
+
+    # WHEN
+    payload = dump_program(statements)
+    fresh = Lox()
+    loaded = load_program(payload)
+    fresh.execute(loaded)
+
+    # THEN
+    assert capsys.readouterr().out == expected == "global\nglobal\n2\n3.5\n"
+
+
+def test_if_cache_misses_then_hits(tmp_path, capsys) -> None:
+    # GIVEN
+    script = write_script(tmp_path)
+    messages: list = []
+    cache = ProgramCache(messages.append)
+
+    # WHEN
+    Lox(cache=cache).run_file(script)
+    Lox(cache=cache).run_file(script)
+
+    # THEN
+    assert (cache.misses, cache.hits) == (1, 1)
+    assert messages[0].startswith("cache miss (missing)")
+    assert cache.cache_path(script).exists()
+    assert capsys.readouterr().out == "global\nglobal\n2\n3.5\n" * 2
+
+
+def test_if_cache_is_invalidated_by_source_changes(tmp_path, capsys) -> None:
+    # GIVEN
+    script = write_script(tmp_path)
+    messages: list = []
+    cache = ProgramCache(messages.append)
+    Lox(cache=cache).run_file(script)
+
+    # WHEN
+    write_script(tmp_path, "print 42;")
+    Lox(cache=cache).run_file(script)
+
+    # THEN
+    assert messages[-2].startswith("cache miss (stale)")
+    assert capsys.readouterr().out.endswith("42\n")
+
+
+def test_if_corrupt_cache_file_is_rebuilt(tmp_path, capsys) -> None:
+    # GIVEN
+    script = write_script(tmp_path)
+    messages: list = []
+    cache = ProgramCache(messages.append)
+    Lox(cache=cache).run_file(script)
+    path = cache.cache_path(script)
+    data = bytearray(path.read_bytes())
+    data[-5] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    # WHEN
+    Lox(cache=cache).run_file(script)
+    Lox(cache=cache).run_file(script)
+
+    # THEN
+    assert messages[-3].startswith("cache miss (corrupt)")
+    assert messages[-1].startswith("cache hit")
+    assert capsys.readouterr().out == "global\nglobal\n2\n3.5\n" * 3
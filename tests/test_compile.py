@@ -0,0 +1,102 @@
+from typer.testing import CliRunner
+
+from pylox import cache
+from pylox.cache import decode_lines, encode_lines
+from pylox.cli import Lox, pylox_cli
+
+PROGRAM = """
+fun fib(n) {
+  if (n < 2) return n;
+  return fib(n - 1) + fib(n - 2);
+}
+print fib(10);
+print "x" + 1;
+
+
+print -"oops";
+"""
+
+
+def test_if_compiled_program_runs_without_front_end(tmp_path, monkeypatch) -> None:
+    # GIVEN
+    script = tmp_path / "script.lox"
+    script.write_text(PROGRAM, encoding="utf-8")
+    compiled = tmp_path / "script.loxc"
+    assert Lox().compile_file(str(script), str(compiled))
+    script.unlink()
+    monkeypatch.setattr(Lox, "front_end", None)
+    errors: list = []
+    monkeypatch.setattr(Lox, "report_runtime_error", lambda _, e: errors.append(e))
+
+    # WHEN
+    lox = Lox()
+    statements = lox.load_compiled(str(compiled))
+    lox.execute(statements)
+
+    # THEN
+    assert [(e.message, e.line) for e in errors] == [("Operand must be a number.", 10)]
+
+
+def test_if_cli_compiles_and_runs_artifact(tmp_path) -> None:
+    # GIVEN
+    script = tmp_path / "script.lox"
+    script.write_text("print 1 + 2;", encoding="utf-8")
+    runner = CliRunner()
+
+    # WHEN
+    compiled = runner.invoke(pylox_cli, ["compile", str(script)])
+    result = runner.invoke(pylox_cli, [str(tmp_path / "script.loxc")])
+
+    # THEN
+    assert compiled.exit_code == 0
+    assert result.exit_code == 0
+    assert result.output == "3\n"
+
+
+def test_if_folded_long_concatenation_compiles(tmp_path) -> None:
+    # GIVEN
+    text = "x" * 200
+    script = tmp_path / "script.lox"
+    script.write_text(f'print "{text}" + "{text}";', encoding="utf-8")
+    runner = CliRunner()
+
+    # WHEN
+    compiled = runner.invoke(pylox_cli, ["compile", "-O", "1", str(script)])
+    result = runner.invoke(pylox_cli, [str(tmp_path / "script.loxc")])
+
+    # THEN
+    assert compiled.exit_code == 0
+    assert result.output == text * 2 + "\n"
+
+
+def test_if_artifact_from_other_build_is_rejected(tmp_path, monkeypatch) -> None:
+    # GIVEN
+    script = tmp_path / "script.lox"
+    script.write_text("print 1;", encoding="utf-8")
+    compiled = tmp_path / "script.loxc"
+    monkeypatch.setattr(cache, "BUILD_TAG", b"\0" * 8)
+    Lox().compile_file(str(script), str(compiled))
+    monkeypatch.undo()
+
+    # WHEN
+    lox = Lox()
+    statements = lox.load_compiled(str(compiled))
+
+    # THEN
+    assert statements is None
+    assert lox.had_error
+
+
+def test_if_line_table_round_trips() -> None:
+    # GIVEN
+    small = [1, 1, 2, 5, 3, 3, 100]
+    large = [1, 2, 70_000, 1]
+
+    # WHEN
+    small_table = encode_lines(small)
+    large_table = encode_lines(large)
+
+    # THEN
+    assert small_table[0] == "b" and len(small_table[1]) == len(small)
+    assert decode_lines(*small_table) == small
+    assert decode_lines(*large_table) == large
@@ -0,0 +1,76 @@
+from pylox.incremental import IncrementalDocument
+from pylox.parser import Parser
+from pylox.regex_scanner import RegexScanner
+import pylox.stmt as stmt_ast
+
+SRC = """var a = 1;
+fun f(x) { return x + a; }
+print f(2);
+if (a) print 1;
+else print 2;
+"""
+
+
+def test_if_edit_reparses_only_the_damaged_declarations() -> None:
+    # GIVEN
+    doc = IncrementalDocument(SRC)
+    before = doc.statements
+    doc.reparsed = 0
+
+    # WHEN
+    # print f(2); -> print f(22);
+    offset = SRC.index("f(2)") + 2
+    after = doc.edit(offset, 0, "2")
+
+    # THEN
+    assert doc.reparsed == 2  # the edited declaration and the one before it
+    assert after[0] is before[0]
+    assert after[3] is before[3]
+    assert isinstance(after[2], stmt_ast.Print)
+    assert after[2].expression.arguments[0].value == 22
+
+
+def test_if_reused_declarations_get_new_line_numbers() -> None:
+    # GIVEN
+    doc = IncrementalDocument(SRC)
+    if_stmt = doc.statements[3]
+
+    # WHEN
+    doc.edit(0, 0, "\n\n")
+
+    # THEN
+    assert doc.statements[3] is if_stmt
+    assert if_stmt.condition.name.line == 6
+    assert if_stmt.else_branch.expression.value == 2
+
+
+def test_if_edit_can_merge_declarations() -> None:
+    # GIVEN
+    doc = IncrementalDocument(SRC)
+
+    # WHEN
+    # deleting "print 1;\n" attaches the "else" to nothing
+    offset = SRC.index("print 1;")
+    doc.edit(offset, len("print 1;\n"), "")
+
+    # THEN
+    expected_parser = Parser(RegexScanner(doc.source).scan_tokens())
+    expected_parser.parse()
+    assert [(e.message, e.line) for e in doc.errors] == [
+        (e.message, e.line) for e in expected_parser.errors
+    ]
+
+
+def test_if_syntax_error_is_recovered_on_next_edit() -> None:
+    # GIVEN
+    doc = IncrementalDocument(SRC)
+
+    # WHEN
+    doc.edit(0, 0, '"')
+    error = doc.syntax_error
+    doc.edit(0, 1, "")
+
+    # THEN
+    assert error is not None and error.message == "Unterminated string."
+    assert doc.syntax_error is None
+    assert len(doc.statements) == 4
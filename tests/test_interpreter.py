@@ -0,0 +1,626 @@
+import pytest
+
+from pylox.cli import EngineKind, Lox
+from pylox.error import BreakException
+from pylox.interpreter import Interpreter
+from pylox.output import CaptureSink
+from pylox.parser import Parser
+from pylox.resolver import Resolver
+from pylox.runtime_object import LoxClass, LoxInstance, Return
+from pylox.scanner import Scanner
+
+
+@pytest.fixture(params=list(EngineKind))
+def engine(request) -> EngineKind:
+    return request.param
+
+
+def run(src: str, capsys, engine: EngineKind = EngineKind.TREE) -> str:
+    Lox(engine=engine).run(src)
+    return capsys.readouterr().out
+
+
+def test_if_for_loop_shares_loop_variable_with_closures(capsys, engine) -> None:
+    # GIVEN
+    src = """
+    var first; var second;
+    for (var i = 0; i < 2; i = i + 1) {
+      var j = i;
+      fun show() { print i; print j; }
+      if (first == nil) first = show; else second = show;
+    }
+    first();
+    second();
+    """
+
+    # WHEN
+    result = run(src, capsys, engine)
+
+    # THEN
+    assert result.split() == ["2", "0", "2", "1"]
+
+
+def test_if_for_loop_supports_missing_clauses_and_break(capsys, engine) -> None:
+    # GIVEN
+    src = """
+    var n = 0;
+    for (;;) { n = n + 1; if (n == 3) break; }
+    for (; n < 5;) n = n + 1;
+    print n;
+    for (var i = 0; i < 2; i = i + 1) print i;
+    """
+
+    # WHEN
+    result = run(src, capsys, engine)
+
+    # THEN
+    assert result.split() == ["5", "0", "1"]
+
+
+def test_if_for_loop_variable_is_scoped_to_the_loop(capsys, engine) -> None:
+    # GIVEN
+    src = """
+    var i = "global";
+    for (var i = 0; i < 1; i = i + 1) {}
+    print i;
+    """
+
+    # WHEN
+    result = run(src, capsys, engine)
+
+    # THEN
+    assert result == "global\n"
+
+
+def test_if_closures_read_and_write_captured_slots(capsys, engine) -> None:
+    # GIVEN
+    src = """
+    fun makeCounter() {
+      var count = 0;
+      fun inc() { count = count + 1; return count; }
+      return inc;
+    }
+    var a = makeCounter();
+    var b = makeCounter();
+    a(); a();
+    print a();
+    print b();
+    """
+
+    # WHEN
+    result = run(src, capsys, engine)
+
+    # THEN
+    assert result.split() == ["3", "1"]
+
+
+def test_if_this_super_and_init_resolve_to_their_slots(capsys, engine) -> None:
+    # GIVEN
+    src = """
+    class Base { init(v) { this.v = v; } get() { return this.v; } }
+    class Derived < Base {
+      init(v) { var doubled = v * 2; super.init(doubled); }
+      get() { return super.get() + 1; }
+    }
+    var d = Derived(20);
+    print d.get();
+    print d.init(1).v;
+    """
+
+    # WHEN
+    result = run(src, capsys, engine)
+
+    # THEN
+    assert result.split() == ["41", "2"]
+
+
+def test_if_redeclaring_a_local_is_an_error(capsys) -> None:
+    # GIVEN
+    src = """
+    var a = 1;
+    var a = 2;
+    { var b = 1; var b = 2; }
+    """
+
+    # WHEN
+    Lox().run(src)
+    captured = capsys.readouterr()
+
+    # THEN
+    assert "Already a variable with this name in this scope." in captured.out
+
+
+def test_if_uncaptured_scopes_run_without_environments(capsys) -> None:
+    # GIVEN
+    src = """
+    fun run() {
+      var total = 0;
+      for (var i = 0; i < 3; i = i + 1) {
+        var doubled = i * 2;
+        { var tripled = doubled + i; total = total + tripled; }
+        if (i == 1) { total = total + 100; }
+      }
+      var after = total;
+      { var again = after; print again; }
+    }
+    run();
+    """
+    lox = Lox()
+
+    # WHEN
+    lox.run(src)
+
+    # THEN
+    assert capsys.readouterr().out == "109\n"
+    assert lox.interpreter.scope_environments == 0
+    assert lox.interpreter.avoided_environments == 9
+
+
+def test_if_captured_scopes_keep_their_environments(capsys) -> None:
+    # GIVEN
+    src = """
+    fun run() {
+      var getters = nil;
+      for (var i = 0; i < 3; i = i + 1) {
+        var j = i;
+        fun get() { return j; }
+        if (getters == nil) getters = get;
+        { var unused = 0; }
+      }
+      print getters();
+    }
+    run();
+    """
+    lox = Lox()
+
+    # WHEN
+    lox.run(src)
+
+    # THEN
+    assert capsys.readouterr().out == "0\n"
+    assert lox.interpreter.scope_environments == 3
+    assert lox.interpreter.avoided_environments == 4
+
+
+def test_if_return_and_break_unwind_nested_statements(capsys, engine) -> None:
+    # GIVEN
+    src = """
+    fun find(limit) {
+      for (var i = 0; i < 10; i = i + 1) {
+        while (true) {
+          { if (i == limit) return i * 10; }
+          break;
+        }
+      }
+      return "none";
+    }
+    print find(3);
+    print find(20);
+    fun nothing() { return; }
+    print nothing();
+    """
+
+    # WHEN
+    result = run(src, capsys, engine)
+
+    # THEN
+    assert result.split() == ["30", "none", "nil"]
+
+
+def test_if_runtime_errors_report_their_line(capsys, engine) -> None:
+    # GIVEN
+    src = """
+    class A {}
+    fun f(a) { return a.missing; }
+    print "before";
+    print f(A());
+    print "after";
+    """
+
+    # WHEN
+    result = run(src, capsys, engine)
+
+    # THEN
+    assert result == "before\nline 3: Undefined property missing.\n"
+
+
+@pytest.mark.parametrize(
+    "src, expected",
+    [
+        ("print 1 + nil;", "line 1: Operands must be two numbers or two strings."),
+        ('print "a" < 1;', "line 1: Operands must be a numbers."),
+        ('print -"a";', "line 1: Operand must be a number."),
+        ("print 1 / 0;", "line 1: Division by zero!"),
+        ("var x = 1; x();", "line 1: Can only call functions and classes."),
+        ("fun f(a) {} f();", "line 1: Expected 1 arguments but got 0."),
+        ("print undefined;", "line 1: Undefined variable undefined."),
+        ("var n = 1; class A < n {}", "line 1: Superclass must be a class."),
+    ],
+)
+def test_if_engines_agree_on_runtime_errors(src, expected, capsys, engine) -> None:
+    # WHEN
+    result = run(src, capsys, engine)
+
+    # THEN
+    assert result == expected + "\n"
+
+
+def test_if_engines_call_natives_and_stringify_values(capsys, engine) -> None:
+    # GIVEN
+    src = """
+    print len("four");
+    print clock() > 0;
+    print 7 / 2;
+    print 2 * 3;
+    print "n" + 1;
+    print nil == false;
+    print !nil;
+    """
+
+    # WHEN
+    result = run(src, capsys, engine)
+
+    # THEN
+    assert result.split() == ["4", "true", "3.5", "6", "n1", "false", "true"]
+
+
+def test_if_method_lookups_hit_the_inline_cache(capsys) -> None:
+    # GIVEN
+    src = """
+    class A { m() { return "a"; } }
+    class B < A { m() { return "b" + super.m(); } }
+    class C < B {}
+    for (var i = 0; i < 10; i = i + 1) {
+      var o;
+      if (i < 5) o = C(); else o = A();
+      o.m();
+    }
+    print C().m();
+    """
+    lox = Lox()
+
+    # WHEN
+    lox.run(src)
+
+    # THEN
+    assert capsys.readouterr().out == "ba\n"
+    assert lox.interpreter.property_cache_misses == 3
+    assert lox.interpreter.property_cache_hits == 8
+    assert lox.interpreter.super_cache_misses == 1
+    assert lox.interpreter.super_cache_hits == 5
+
+
+def test_if_fields_shadow_cached_methods_and_new_classes_miss(capsys) -> None:
+    # GIVEN
+    src = """
+    fun make(tag) {
+      class Base { name() { return tag; } }
+      class Derived < Base { name() { return super.name(); } }
+      return Derived();
+    }
+    fun name(o) { return o.name(); }
+    var a = make("a");
+    print name(a);
+    print name(make("b"));
+    a.name = clock;
+    print name(a) > 0;
+    """
+    lox = Lox()
+
+    # WHEN
+    lox.run(src)
+
+    # THEN
+    assert capsys.readouterr().out.split() == ["a", "b", "true"]
+    assert lox.interpreter.super_cache_misses == 2
+    assert lox.interpreter.super_cache_hits == 0
+
+
+def test_if_engine_report_shows_inline_cache_statistics(capsys) -> None:
+    # GIVEN
+    lines = []
+    lox = Lox(engine_report=lines.append)
+
+    # WHEN
+    lox.run(
+        "class A { m() {} }\nvar a = A();\nfor (var i = 0; i < 3; i = i + 1) a.m();"
+    )
+
+    # THEN
+    assert lines == [
+        "inline caches: property 2 hits, 1 misses; super 0 hits, 0 misses",
+        "bound methods: 0 created, 3 elided by direct calls",
+    ]
+
+
+def test_if_methods_and_initializers_are_inherited_through_deep_hierarchies(
+    capsys, engine
+) -> None:
+    # GIVEN
+    levels = "\n".join(f"class L{n} < L{n - 1} {{}}" for n in range(1, 12))
+    src = f"""
+    class L0 {{
+      init(a) {{ this.a = a; }}
+      name() {{ return "L0"; }}
+      both() {{ return this.name() + "/" + this.a; }}
+    }}
+    {levels}
+    class Mid < L11 {{ name() {{ return "Mid<" + super.name(); }} }}
+    class Leaf < Mid {{ name() {{ return "Leaf<" + super.name(); }} }}
+    print Leaf("x").both();
+    print L11("y").both();
+    Leaf();
+    """
+
+    # WHEN
+    result = run(src, capsys, engine)
+
+    # THEN
+    assert result == ("Leaf<Mid<L0/x\nL0/y\nline 22: Expected 1 arguments but got 0.\n")
+
+
+def test_if_direct_method_calls_bind_this_and_respect_fields(capsys, engine) -> None:
+    # GIVEN
+    src = """
+    class A {
+      init(n) { this.n = n; }
+      get() { return this.n; }
+      adder() { fun add(x) { return this.n + x; } return add; }
+    }
+    var a = A(1);
+    print a.get();
+    print a.adder()(2);
+    print a.init(5).get();
+    a.get = clock;
+    print a.get() > 0;
+    a.get(1);
+    """
+
+    # WHEN
+    result = run(src, capsys, engine)
+
+    # THEN
+    assert result.split("\n") == [
+        "1",
+        "3",
+        "5",
+        "true",
+        "line 13: Expected 0 arguments but got 1.",
+        "",
+    ]
+
+
+def test_if_only_escaping_methods_are_bound(capsys) -> None:
+    # GIVEN
+    src = """
+    class A { m(x) { return x; } }
+    var a = A();
+    for (var i = 0; i < 3; i = i + 1) a.m(i);
+    var m = a.m;
+    print m(4);
+    """
+    lox = Lox()
+
+    # WHEN
+    lox.run(src)
+
+    # THEN
+    assert capsys.readouterr().out == "4\n"
+    assert lox.interpreter.elided_bound_methods == 3
+    assert lox.interpreter.bound_methods == 1
+
+
+def test_if_returns_and_breaks_complete_without_exceptions() -> None:
+    # GIVEN
+    src = """
+    fun find(limit) {
+      for (var i = 0; ; i = i + 1) {
+        { if (i == limit) return i; }
+      }
+    }
+    fun nothing() { return; }
+    var n = 0;
+    while (true) { n = n + 1; if (n == 3) { break; } }
+    print find(4);
+    print nothing();
+    print n;
+    """
+    statements = Parser(Scanner(src).scan_tokens()).parse()
+    output = CaptureSink()
+    interpreter = Interpreter(output)
+    Resolver(interpreter).resolve(statements)
+
+    # WHEN
+    completions = [interpreter.execute(statement) for statement in statements]
+
+    # THEN
+    assert output.getvalue() == "4\nnil\n3\n"
+    assert completions == [None] * len(statements)
+    assert interpreter.execute(
+        Parser(Scanner("return 1;").scan_tokens()).parse()[0]
+    ) == (1,)
+
+
+def test_if_raised_returns_and_breaks_are_still_honoured(capsys) -> None:
+    # GIVEN
+    class RaisingInterpreter(Interpreter):
+        def visit_return_stmt(self, stmt):
+            raise Return(self.evaluate(stmt.value))
+
+        def visit_break_stmt(self, stmt):
+            raise BreakException()
+
+    src = """
+    fun twice(n) { return n * 2; }
+    for (var i = 0; ; i = i + 1) { if (i == 2) break; print twice(i); }
+    for (var i = 0; i < 5; i = i + 1) {
+      fun stop() { break; }
+      if (i == 1) stop();
+      print i;
+    }
+    """
+    statements = Parser(Scanner(src).scan_tokens()).parse()
+    interpreter = RaisingInterpreter()
+    Resolver(interpreter).resolve(statements)
+
+    # WHEN
+    interpreter.interpret(statements)
+    Lox().run(
+        "for (var i = 0; i < 5; i = i + 1) { fun stop() { break; } if (i == 1) stop(); print i; }"
+    )
+
+    # THEN
+    assert capsys.readouterr().out == "0\n2\n0\n0\n"
+
+
+def test_if_unbounded_recursion_reports_stack_overflow(capsys, engine) -> None:
+    # GIVEN
+    src = (
+        "fun f(n) {\n  return 1 + f(n + 1);\n}\nf(0);\n"
+        "class A {\n  m() { return 1 + this.m(); }\n}\nA().m();\n"
+    )
+
+    # WHEN
+    result = run(src, capsys, engine)
+
+    # THEN
+    assert result == "line 2: Stack overflow.\n"
+
+
+def test_if_instances_with_the_same_fields_share_a_shape() -> None:
+    # GIVEN
+    point, other = LoxClass("Point", None, {}), LoxClass("Other", None, {})
+    a, b, c, d = (
+        LoxInstance(point),
+        LoxInstance(point),
+        LoxInstance(point),
+        LoxInstance(other),
+    )
+
+    # WHEN
+    for instance, names in ((a, "xy"), (b, "xy"), (c, "yx"), (d, "xy")):
+        for n, name in enumerate(names):
+            instance.set_field(name, n)
+    a.set_field("x", 5)
+
+    # THEN
+    assert a.shape is b.shape
+    assert a.shape is not c.shape and a.shape is not d.shape
+    assert a.shape.slots == {"x": 0, "y": 1}
+    assert a.values == [5, 1]
+    assert a.fields == {"x": 5, "y": 1} and c.fields == {"y": 0, "x": 1}
+    assert list(point.empty_shape.transitions) == ["x", "y"]
+
+
+def test_if_fields_added_in_any_order_read_back(capsys, engine) -> None:
+    # GIVEN
+    src = """
+    class Node {
+      init(left) { if (left) this.left = "l"; this.value = 1; }
+      value() { return "method"; }
+    }
+    fun show(node) { return node.value; }
+    var a = Node(true);
+    var b = Node(false);
+    b.left = "late";
+    b.value = 2;
+    print show(a);
+    print show(b);
+    print a.left + b.left;
+    """
+
+    # WHEN
+    result = run(src, capsys, engine)
+
+    # THEN
+    assert result == "1\n2\nllate\n"
+
+
+def test_if_long_strings_built_by_concatenation_behave_as_strings(
+    capsys, engine
+) -> None:
+    # GIVEN
+    src = """
+    var s = "";
+    for (var i = 0; i < 500; i = i + 1) s = s + "ab";
+    var t = s + "!";
+    var u = s + "?";
+    print len(s);
+    print t == s + "!";
+    print t == u;
+    print len(1 + s + nil);
+    print s + "x" == "pre" + s;
+    print s;
+    """
+
+    # WHEN
+    result = run(src, capsys, engine)
+
+    # THEN
+    assert result == "1000\ntrue\nfalse\n1004\nfalse\n" + "ab" * 500 + "\n"
+
+
+def test_if_break_in_a_function_leaves_the_loop_it_is_called_in(capsys, engine) -> None:
+    # GIVEN
+    src = """
+    var n = 0;
+    while (true) { fun f() { print "in f"; break; } n = n + 1; f(); print "no"; }
+    print n;
+    for (var i = 0; i < 3; i = i + 1) {
+      fun g(x) { if (x == 1) break; print x; }
+      g(i);
+    }
+    class A { init() { while (true) { fun stop() { break; } stop(); } } }
+    A();
+    while (true) { class B { init() { break; } } B(); print "no"; }
+    print "done";
+    """
+
+    # WHEN
+    result = run(src, capsys, engine)
+
+    # THEN
+    assert result == "in f\n1\n0\ndone\n"
+
+
+def test_if_locals_after_a_break_out_of_a_function_use_their_own_slots(
+    capsys, engine
+) -> None:
+    # GIVEN
+    src = """
+    fun outer() {
+      var x = 1;
+      while (true) { var t = 2; fun brk() { break; } brk(); }
+      for (var i = 3; ; ) { var u = 4; fun stop() { break; } stop(); }
+      var after = "after";
+      print after;
+      print x;
+    }
+    outer();
+    """
+
+    # WHEN
+    result = run(src, capsys, engine)
+
+    # THEN
+    assert result == "after\n1\n"
+
+
+def test_if_each_access_to_a_method_makes_a_new_bound_method(capsys, engine) -> None:
+    # GIVEN
+    src = """
+    class A { m() { return "m"; } }
+    class B < A { m() { return super.m == super.m; } }
+    var a = B();
+    var m = a.m;
+    print a.m == a.m;
+    print m == m;
+    print m();
+    print a.m();
+    """
+
+    # WHEN
+    result = run(src, capsys, engine)
+
+    # THEN
+    assert result == "false\ntrue\nfalse\nfalse\n"
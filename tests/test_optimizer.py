@@ -0,0 +1,102 @@
+import pytest
+
+from pylox.ast_printer import AstPrinter
+from pylox.cli import Lox
+from pylox.expr import Binary, Literal
+from pylox.interpreter import Interpreter
+from pylox.optimizer import Optimizer
+from pylox.parser import Parser
+from pylox.resolver import Resolver
+from pylox.scanner import Scanner
+from pylox.stmt import Block, Print
+
+
+def optimize(src: str) -> tuple:
+    statements = Parser(Scanner(src).scan_tokens()).parse()
+    Resolver(Interpreter()).resolve(statements)
+    optimizer = Optimizer()
+    return optimizer.optimize(statements), optimizer
+
+
+@pytest.mark.parametrize(
+    "src, expected",
+    [
+        ("print 1 + 2 * 3;", 7.0),
+        ('print "a" + "b" + 1;', "ab1"),
+        ("print !true;", False),
+        ("print -(2 - 4);", 2.0),
+        ('print nil or "x";', "x"),
+        ("print 1 < 2 and 3 == 3;", True),
+    ],
+)
+def test_if_constant_expressions_are_folded(src: str, expected: object) -> None:
+    # WHEN
+    statements, _ = optimize(src)
+
+    # THEN
+    assert isinstance(statements[0], Print)
+    assert isinstance(statements[0].expression, Literal)
+    assert statements[0].expression.value == expected
+    assert type(statements[0].expression.value) is type(expected)
+
+
+def test_if_failing_operations_are_left_for_runtime() -> None:
+    # WHEN
+    statements, optimizer = optimize('print 1 / (2 - 2); print -"a";')
+
+    # THEN
+    assert AstPrinter().print(statements[0].expression) == "(/ 1 0.0)"
+    assert optimizer.folded == 2
+
+
+def test_if_logical_with_constant_left_keeps_right_operand() -> None:
+    # WHEN
+    statements, _ = optimize("var x; print false or x; print true and x + 1;")
+
+    # THEN
+    assert type(statements[1].expression).__name__ == "Variable"
+    assert isinstance(statements[2].expression, Binary)
+
+
+def test_if_dead_branches_are_pruned() -> None:
+    # GIVEN
+    src = """
+    if (false) print "dead";
+    if (1 > 2) print "dead"; else { print "alive"; }
+    while (nil) print "never";
+    while (true) if (false) print "dead";
+    1 + 2;
+    """
+
+    # WHEN
+    statements, optimizer = optimize(src)
+
+    # THEN
+    assert [type(stmt).__name__ for stmt in statements] == ["Block", "While"]
+    assert isinstance(statements[1].body, Block)
+    assert statements[1].body.statements == []
+    assert optimizer.pruned == 5
+
+
+def test_if_optimized_program_prints_the_same(capsys) -> None:
+    # GIVEN
+    src = """
+    fun f(n) {
+      if (true and n > 0) return n * (2 + 3);
+      return -(1 + 1);
+    }
+    var s = "x" + (1 + 1);
+    for (var i = 0; i < 3 + 0; i = i + 1) {
+      if (!(i == 1)) print f(i) + s;
+    }
+    print 10 / (5 - 5);
+    """
+    Lox().run(src)
+    expected = capsys.readouterr().out
+
+    # WHEN
+    Lox(opt_level=1).run(src)
+
+    # THEN
+    assert capsys.readouterr().out == expected
+    assert "Division by zero!" in expected
@@ -1,5 +1,7 @@
 import pytest
 
+import pylox.expr as expr_ast
+import pylox.stmt as stmt_ast
 from pylox.ast_printer import AstPrinter
 from pylox.parser import Parser
 from pylox.scanner import Scanner
@@ -17,6 +19,28 @@ def test_if_parser_produces_valid_ast() -> None:
     assert result == "(* (- 123) (group 45.67))"
 
 
+def test_if_parser_consumes_lazy_token_stream() -> None:
+    # GIVEN
+    src = "-123 * (45.67)"
+    consumed = 0
+
+    def lazy_tokens():
+        nonlocal consumed
+        for token in Scanner(src).scan_tokens():
+            consumed += 1
+            yield token
+
+    # WHEN
+    parser = Parser(lazy_tokens())
+    first_consumed = consumed
+    ast = parser.expression()
+    result = AstPrinter().print(ast)
+
+    # THEN
+    assert first_consumed == 1
+    assert result == "(* (- 123) (group 45.67))"
+
+
 def test_if_parser_handles_unclosed_paren() -> None:
     # GIVEN
     src = "-123 * (45.67"
@@ -79,3 +103,21 @@ def test_if_parser_parse_and_discard_right_hand_operand_in_case_of_empty_left_ha
     # THEN
     assert "Expect ')' after expression." in err.value.message
     assert cnt == 2  # both errors have been handled
+
+
+def test_if_parser_produces_for_node() -> None:
+    # GIVEN
+    src = "for (var i = 0; i < 3; i = i + 1) print i; for (;;) break;"
+
+    # WHEN
+    statements = Parser(Scanner(src).scan_tokens()).parse()
+
+    # THEN
+    full, bare = statements
+    assert isinstance(full, stmt_ast.For)
+    assert isinstance(full.initializer, stmt_ast.Var)
+    assert isinstance(full.condition, expr_ast.Binary)
+    assert isinstance(full.increment, expr_ast.Assign)
+    assert isinstance(full.body, stmt_ast.Print)
+    assert isinstance(bare, stmt_ast.For)
+    assert (bare.initializer, bare.condition, bare.increment) == (None, None, None)
@@ -0,0 +1,79 @@
+import pytest
+
+from pylox.ast_printer import AstPrinter
+from pylox.error import LoxParseError
+from pylox.expr import Expr
+from pylox.parser import Parser
+from pylox.pratt_parser import PrattParser
+from pylox.scanner import Scanner
+from pylox.stmt import Stmt
+from pylox.tokens import Token
+
+
+def dump(node) -> object:
+    if isinstance(node, list):
+        return [dump(n) for n in node]
+    if isinstance(node, Token):
+        return (node.token_type, node.lexeme, node.literal, node.line)
+    if isinstance(node, (Expr, Stmt)):
+        return type(node).__name__, {k: dump(getattr(node, k)) for k in node.__slots__}
+    return node
+
+
+def parse_with_errors(parser_class, src: str) -> tuple:
+    errors: list = []
+    parser = parser_class(
+        Scanner(src).scan_tokens(), lambda e: errors.append((e.message, e.line))
+    )
+    return dump(parser.parse()), errors
+
+
+@pytest.mark.parametrize(
+    "src",
+    [
+        "1 + 2 * 3 - 4 / 5 - 6;",
+        "a = b = c or d and e == f != g < h <= i > j >= k;",
+        "!-!x; -(1 + 2) * 3;",
+        'f(1, g(2))(3).h.i = "s" + this.x + super.y;',
+        "a or b or c and d and e;",
+        "1 + * 2; == 3; < 4; + 5; / 6;",
+        "* (123",
+        "(1 + 2 = 3;",
+        "a.b(c, .d;",
+    ],
+)
+def test_if_pratt_parser_matches_recursive_descent_parser(src: str) -> None:
+    # WHEN
+    expected = parse_with_errors(Parser, src)
+    result = parse_with_errors(PrattParser, src)
+
+    # THEN
+    assert result == expected
+
+
+def test_if_pratt_parser_respects_precedence_and_associativity() -> None:
+    # GIVEN
+    src = "-1 - 2 - 3 * 4 / (5)"
+
+    # WHEN
+    ast = PrattParser(Scanner(src).scan_tokens()).expression()
+
+    # THEN
+    assert AstPrinter().print(ast) == "(- (- (- 1) 2) (/ (* 3 4) (group 5)))"
+
+
+def test_if_pratt_parser_recovers_from_missing_left_hand_operand() -> None:
+    # GIVEN
+    src = "* (123"
+    errors: list = []
+
+    # WHEN
+    with pytest.raises(LoxParseError) as err:
+        PrattParser(Scanner(src).scan_tokens(), errors.append).expression()
+
+    # THEN
+    assert err.value.message == "Expect ')' after expression."
+    assert [e.message for e in errors] == [
+        "Missing left-hand operand.",
+        "Expect ')' after expression.",
+    ]
@@ -0,0 +1,89 @@
+import pytest
+
+from pylox.error import LoxSyntaxError
+from pylox.regex_scanner import RegexScanner, StreamScanner
+from pylox.scanner import Scanner
+
+SOURCES = [
+    "",
+    "var five = 5;\nvar ten = 10.25;\n5 <= 10 > 5;\n10 != 9 == !true;",
+    "andy formless fo _ _123 _abc ab123 while break",
+    "123\n123.456\n.456\n123.\n",
+    '""\n"string"\n"multi\nline\nstring" after',
+    "(){};,+-*!===<=>=!=<>/.",
+    "a // line comment\nb // trailing comment",
+    "/* simple */ x /* /* nested */ */ y /*/ odd */ z\n/* a\nb */ w",
+    "space    tabs\t\t\r\nnewlines\n\n\nend",
+]
+
+ERROR_SOURCES = [
+    '"hello" "world!\n\n',
+    "\n\n%",
+    "a\né",
+    "/* /* */ //\n\n",
+    "/*/",
+]
+
+
+def token_stream(scanner_class, src: str) -> list:
+    return [
+        (t.token_type, t.lexeme, t.literal, type(t.literal), t.line)
+        for t in scanner_class(src).scan_tokens()
+    ]
+
+
+def file_token_stream(tmp_path, src: str) -> list:
+    path = tmp_path / "script.lox"
+    path.write_text(src, encoding="utf-8")
+    return [
+        (t.token_type, t.lexeme, t.literal, type(t.literal), t.line)
+        for t in StreamScanner(str(path)).scan_tokens()
+    ]
+
+
+@pytest.mark.parametrize("src", SOURCES)
+def test_if_regex_scanner_matches_classic_scanner(src: str) -> None:
+    # WHEN
+    expected = token_stream(Scanner, src)
+    result = token_stream(RegexScanner, src)
+
+    # THEN
+    assert result == expected
+
+
+@pytest.mark.parametrize("src", ERROR_SOURCES)
+def test_if_regex_scanner_raises_same_errors_as_classic_scanner(src: str) -> None:
+    # WHEN
+    with pytest.raises(LoxSyntaxError) as expected:
+        Scanner(src).scan_tokens()
+    with pytest.raises(LoxSyntaxError) as result:
+        RegexScanner(src).scan_tokens()
+
+    # THEN
+    assert result.value.message == expected.value.message
+    assert result.value.line == expected.value.line
+
+
+@pytest.mark.parametrize("src", SOURCES + ['"unicode é\n☃" x'])
+def test_if_stream_scanner_matches_classic_scanner(tmp_path, src: str) -> None:
+    # WHEN
+    expected = token_stream(Scanner, src)
+    result = file_token_stream(tmp_path, src)
+
+    # THEN
+    assert result == expected
+
+
+@pytest.mark.parametrize("src", ERROR_SOURCES)
+def test_if_stream_scanner_raises_same_errors_as_classic_scanner(
+    tmp_path, src: str
+) -> None:
+    # WHEN
+    with pytest.raises(LoxSyntaxError) as expected:
+        Scanner(src).scan_tokens()
+    with pytest.raises(LoxSyntaxError) as result:
+        file_token_stream(tmp_path, src)
+
+    # THEN
+    assert result.value.message == expected.value.message
+    assert result.value.line == expected.value.line
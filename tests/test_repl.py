@@ -0,0 +1,40 @@
+import gc
+import tracemalloc
+
+from pylox.cli import Lox
+
+LINES = [
+    "fun f(n) { var total = 0; for (var i = 0; i < n; i = i + 1) { var x = i; total = total + x; } return total; }",
+    "print f(3);",
+    "class C { init(v) { this.v = v; } get() { return this.v; } }",
+    "print C(1).get();",
+    "{ var a = 1; fun g() { return a; } print g(); }",
+]
+
+
+def feed(lox: Lox, times: int, capsys) -> None:
+    for _ in range(times):
+        for line in LINES:
+            lox.run_line(line)
+    capsys.readouterr()
+
+
+def test_if_repl_memory_stays_flat(capsys) -> None:
+    # GIVEN
+    lox = Lox()
+    feed(lox, 50, capsys)
+    gc.collect()
+    tracemalloc.start()
+    feed(lox, 20, capsys)
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+
+    # WHEN
+    feed(lox, 400, capsys)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # THEN
+    # Keeping the 2000 resolved lines alive would take megabytes.
+    assert after - before < 64 * 1024
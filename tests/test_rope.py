@@ -0,0 +1,58 @@
+from pylox.rope import ROPE_MIN_LENGTH, Rope, concat
+
+
+def test_if_short_concatenations_stay_plain_strings() -> None:
+    # GIVEN
+    left, right = "a" * (ROPE_MIN_LENGTH - 2), "bc"
+
+    # WHEN
+    short = concat(left, "b")
+    long = concat(left, right)
+
+    # THEN
+    assert type(short) is str
+    assert type(long) is Rope
+    assert str(long) == left + right and len(long) == ROPE_MIN_LENGTH
+
+
+def test_if_appending_to_the_newest_rope_shares_its_pieces() -> None:
+    # GIVEN
+    rope = concat("a" * ROPE_MIN_LENGTH, "b")
+
+    # WHEN
+    first = concat(rope, "c")
+    second = concat(first, "d")
+
+    # THEN
+    assert first.parts is rope.parts and second.parts is rope.parts
+    assert (rope.count, first.count, second.count) == (2, 3, 4)
+    assert str(rope).endswith("ab") and str(second).endswith("abcd")
+
+
+def test_if_appending_to_an_older_rope_leaves_the_newer_one_alone() -> None:
+    # GIVEN
+    rope = concat("a" * ROPE_MIN_LENGTH, "b")
+    newer = concat(rope, "c")
+
+    # WHEN
+    other = concat(rope, "x")
+
+    # THEN
+    assert other.parts is not rope.parts
+    assert str(newer).endswith("bc") and str(other).endswith("bx")
+
+
+def test_if_ropes_compare_and_hash_as_their_text() -> None:
+    # GIVEN
+    text = "a" * ROPE_MIN_LENGTH + "b"
+    rope = concat("a" * ROPE_MIN_LENGTH, "b")
+    same = concat(concat("a" * ROPE_MIN_LENGTH, ""), "b")
+
+    # WHEN
+    prefixed = concat("x", rope)
+
+    # THEN
+    assert rope == text and text == rope and rope == same
+    assert rope != text + "c" and rope != 1.0
+    assert hash(rope) == hash(text)
+    assert str(prefixed) == "x" + text
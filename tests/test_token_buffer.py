@@ -0,0 +1,68 @@
+import pytest
+
+from pylox.ast_printer import AstPrinter
+from pylox.error import LoxParseError, LoxSyntaxError
+from pylox.parser import Parser
+from pylox.regex_scanner import CompactScanner
+from pylox.scanner import Scanner
+from pylox.tokens import TokenType
+
+
+def test_if_compact_scanner_matches_classic_scanner() -> None:
+    # GIVEN
+    src = 'var x = 1.5;\n"two\nlines" 42 /* c */ andy // c\n<= ! != break'
+
+    # WHEN
+    expected = Scanner(src).scan_tokens()
+    buffer = CompactScanner(src).scan_tokens()
+
+    # THEN
+    assert len(buffer) == len(expected)
+    for view, token in zip(buffer, expected):
+        assert view.token_type == token.token_type
+        assert view.lexeme == token.lexeme
+        assert view.literal == token.literal
+        assert type(view.literal) is type(token.literal)
+        assert view.line == token.line
+
+
+def test_if_token_buffer_stores_offsets_into_source() -> None:
+    # GIVEN
+    src = "print 12;"
+
+    # WHEN
+    buffer = CompactScanner(src).scan_tokens()
+
+    # THEN
+    assert list(buffer.starts) == [0, 6, 8, 9]
+    assert list(buffer.ends) == [5, 8, 9, 9]
+    assert buffer[-1].token_type == TokenType.EOF
+    assert buffer.nbytes() == 4 * 13
+
+
+def test_if_parser_works_on_token_views() -> None:
+    # GIVEN
+    src = "-123 * (45.67)"
+
+    # WHEN
+    ast = Parser(CompactScanner(src).scan_tokens()).expression()
+
+    # THEN
+    assert AstPrinter().print(ast) == "(* (- 123) (group 45.67))"
+
+
+def test_if_errors_report_lines_from_token_views() -> None:
+    # GIVEN
+    src = "1 +\n\n(2"
+
+    # WHEN
+    with pytest.raises(LoxParseError) as err:
+        Parser(CompactScanner(src).scan_tokens()).expression()
+
+    # THEN
+    assert err.value.line == 3
+
+
+def test_if_compact_scanner_raises_syntax_errors() -> None:
+    with pytest.raises(LoxSyntaxError):
+        CompactScanner('"unterminated').scan_tokens()
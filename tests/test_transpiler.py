@@ -0,0 +1,151 @@
+from typer.testing import CliRunner
+
+from pylox.cli import EngineKind, Lox, pylox_cli
+from pylox.interpreter import Interpreter
+from pylox.parser import Parser
+from pylox.resolver import Resolver
+from pylox.scanner import Scanner
+from pylox.transpiler import PythonEngine
+
+
+def transpile(src: str) -> str:
+    statements = Parser(Scanner(src).scan_tokens()).parse()
+    Resolver(Interpreter()).resolve(statements)
+    return PythonEngine.transpile(statements)
+
+
+def test_if_numbers_get_an_inline_fast_path_and_lox_names_a_prefix() -> None:
+    # GIVEN
+    src = "fun dec(n) { return n - 1; }\nprint dec(3);\n"
+
+    # WHEN
+    source = transpile(src)
+
+    # THEN
+    assert source.splitlines() == [
+        "def _main():",
+        "    global lox_dec",
+        "    def lox_dec(*args):",
+        "        try:",
+        "            l_n_1, = args",
+        "        except ValueError:",
+        "            _arity(1, args)",
+        "        return (l_n_1 - 1.0 if type(l_n_1) is float else _subtract(l_n_1, 1.0))",
+        "    _print(lox_dec(3.0))",
+    ]
+
+
+def test_if_captured_and_reassigned_locals_are_shared_through_cells() -> None:
+    # GIVEN
+    src = "{\n  var n = 0;\n  fun inc() { n = n + 1; }\n  var k = 1;\n  fun get() { return k; }\n}\n"
+
+    # WHEN
+    source = transpile(src)
+
+    # THEN
+    assert "    l_n_1 = [0.0]" in source
+    assert "    def l_inc_2(*args, l_n_1=l_n_1):" in source
+    assert "    def l_get_4(*args, l_k_3=l_k_3):" in source
+
+
+def test_if_each_loop_iteration_gets_its_own_captured_variable(capsys) -> None:
+    # GIVEN
+    src = """
+    var first;
+    for (var i = 0; i < 3; i = i + 1) {
+      var j = i;
+      fun get() { return j; }
+      if (i == 0) first = get;
+    }
+    print first();
+    """
+
+    # WHEN
+    Lox(engine=EngineKind.PYTHON).run(src)
+
+    # THEN
+    assert capsys.readouterr().out == "0\n"
+
+
+def test_if_errors_in_expressions_over_several_lines_report_their_token_line(
+    capsys,
+) -> None:
+    # GIVEN
+    sources = [
+        "var a = 1;\nprint a -\n  nil;\n",
+        "class A {}\nvar a = A();\nprint a\n  .missing;\n",
+        "fun f() {}\nf(\n  1\n);\n",
+    ]
+
+    # WHEN
+    for src in sources:
+        Lox(engine=EngineKind.PYTHON).run(src)
+
+    # THEN
+    assert capsys.readouterr().out == (
+        "line 2: Operands must be a numbers.\n"
+        "line 4: Undefined property missing.\n"
+        "line 4: Expected 0 arguments but got 1.\n"
+    )
+
+
+def test_if_deep_recursion_reports_stack_overflow(capsys) -> None:
+    # GIVEN
+    src = "fun f(n) {\n  return f(n + 1);\n}\nf(0);\n"
+
+    # WHEN
+    Lox(engine=EngineKind.PYTHON).run(src)
+
+    # THEN
+    assert capsys.readouterr().out == "line 2: Stack overflow.\n"
+
+
+def test_if_classes_are_not_instances(capsys) -> None:
+    # GIVEN
+    src = "class A { m() {} }\nprint A.m;\n"
+
+    # WHEN
+    Lox(engine=EngineKind.PYTHON).run(src)
+
+    # THEN
+    assert capsys.readouterr().out == "line 2: Only instances have properties.\n"
+
+
+def test_if_repl_lines_share_globals(capsys) -> None:
+    # GIVEN
+    lox = Lox(engine=EngineKind.PYTHON)
+
+    # WHEN
+    lox.run_line("var a = 1;")
+    lox.run_line("fun f() { return a + 1; }")
+    lox.run_line("a = 41;")
+    lox.run_line("f()")
+
+    # THEN
+    assert capsys.readouterr().out == "42\n"
+
+
+def test_if_repl_loops_catch_break_from_function_of_earlier_line(capsys) -> None:
+    # GIVEN
+    lox = Lox(engine=EngineKind.PYTHON)
+
+    # WHEN
+    lox.run_line("var g; while (true) { fun f() { break; } g = f; break; }")
+    lox.run_line('while (true) { g(); print "no"; }')
+    lox.run_line('print "done";')
+
+    # THEN
+    assert capsys.readouterr().out == "done\n"
+
+
+def test_if_cli_transpiles_script(tmp_path) -> None:
+    # GIVEN
+    script = tmp_path / "script.lox"
+    script.write_text('print "[x]";', encoding="utf-8")
+
+    # WHEN
+    result = CliRunner().invoke(pylox_cli, ["transpile", str(script)])
+
+    # THEN
+    assert result.exit_code == 0
+    assert result.output == "def _main():\n    _print('[x]')\n"
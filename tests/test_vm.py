@@ -0,0 +1,228 @@
+import pytest
+from typer.testing import CliRunner
+
+from pylox.bytecode_compiler import BytecodeCompiler
+from pylox.cli import EngineKind, Lox, pylox_cli
+from pylox.disassembler import disassemble
+from pylox.interpreter import Interpreter
+from pylox.parser import Parser
+from pylox.resolver import Resolver
+from pylox.scanner import Scanner
+
+
+def compile_source(src: str):
+    statements = Parser(Scanner(src).scan_tokens()).parse()
+    Resolver(Interpreter()).resolve(statements)
+    return BytecodeCompiler().compile(statements)
+
+
+def test_if_disassembler_shows_lines_operands_and_upvalues() -> None:
+    # GIVEN
+    function = compile_source(
+        "fun counter() {\n  var n = 0;\n  fun inc() { n = n + 1; return n; }\n"
+        "  return inc;\n}\nprint counter()();\n"
+    )
+
+    # WHEN
+    listing = disassemble(function).splitlines()
+
+    # THEN
+    assert listing[:7] == [
+        "== <script> ==",
+        "0000    1 CLOSURE             0 <fn counter>",
+        "0002    | DEFINE_GLOBAL       1 'counter'",
+        "0004    6 GET_GLOBAL          1 'counter'",
+        "0006    | CALL                0",
+        "0008    | CALL                0",
+        "0010    | PRINT",
+    ]
+    assert "0004    |                 local 1" in listing
+    assert "0000    3 GET_UPVALUE         0" in listing
+
+
+def test_if_breaking_out_of_a_scope_closes_its_upvalues(capsys) -> None:
+    # GIVEN
+    src = """
+    var get;
+    while (true) {
+      var captured = "inside";
+      fun read() { return captured; }
+      get = read;
+      break;
+    }
+    var other = "other";
+    print get();
+    """
+
+    # WHEN
+    Lox(engine=EngineKind.VM).run(src)
+
+    # THEN
+    assert capsys.readouterr().out == "inside\n"
+
+
+def test_if_deep_recursion_reports_stack_overflow(capsys) -> None:
+    # GIVEN
+    src = "fun f(n) {\n  return 1 + f(n + 1);\n}\nf(0);\n"
+
+    # WHEN
+    Lox(engine=EngineKind.VM).run(src)
+
+    # THEN
+    assert capsys.readouterr().out == "line 2: Stack overflow.\n"
+
+
+def test_if_default_depth_allows_recursion_in_the_hundreds_of_thousands(
+    capsys,
+) -> None:
+    # GIVEN
+    src = "fun depth(n) { if (n == 0) return 0; return 1 + depth(n - 1); }\n"
+    src += "print depth(300000);"
+
+    # WHEN
+    Lox(engine=EngineKind.VM).run(src)
+
+    # THEN
+    assert capsys.readouterr().out == "300000\n"
+
+
+def test_if_maximum_depth_is_configurable(capsys) -> None:
+    # GIVEN
+    src = """
+    fun depth(n) { if (n == 0) return 0; return 1 + depth(n - 1); }
+    print depth(200000);
+    print depth(10);
+    """
+
+    # WHEN
+    Lox(engine=EngineKind.VM, max_depth=300000).run(src)
+    Lox(engine=EngineKind.VM, max_depth=10).run(src)
+
+    # THEN
+    assert capsys.readouterr().out == ("200000\n10\nline 2: Stack overflow.\n")
+
+
+def test_if_tail_calls_run_in_constant_space(capsys) -> None:
+    # GIVEN
+    lines = []
+    src = """
+    fun even(n) { if (n == 0) return true; return odd(n - 1); }
+    fun odd(n) { if (n == 0) return false; return even(n - 1); }
+    class Counter {
+      init(n) { this.n = n; }
+      down() { if (this.n == 0) return "done"; this.n = this.n - 1; return this.down(); }
+    }
+    fun make(n) { return Counter(n); }
+    print even(100001);
+    print make(5000).down();
+    """
+
+    # WHEN
+    Lox(engine=EngineKind.VM, max_depth=64, engine_report=lines.append).run(src)
+
+    # THEN
+    assert capsys.readouterr().out == "false\ndone\n"
+    assert lines == ["frames: 105002 reused by tail calls"]
+
+
+def test_if_tail_calls_close_the_upvalues_of_the_frame_they_replace(capsys) -> None:
+    # GIVEN
+    src = """
+    var saved;
+    fun id(f) { return f; }
+    fun outer(n) {
+      fun get() { return n; }
+      saved = get;
+      return id(n);
+    }
+    outer(1);
+    print saved();
+    """
+
+    # WHEN
+    Lox(engine=EngineKind.VM).run(src)
+
+    # THEN
+    assert capsys.readouterr().out == "1\n"
+
+
+def test_if_method_call_over_two_lines_reports_each_error_on_its_line(
+    capsys,
+) -> None:
+    # GIVEN
+    src = "class A { m() {} }\nvar a = A();\nprint a.missing\n  ();\na.m\n  (1);\n"
+
+    # WHEN
+    Lox(engine=EngineKind.VM).run(src)
+    Lox(engine=EngineKind.VM).run(src.replace("a.missing\n  ();\n", ""))
+
+    # THEN
+    assert capsys.readouterr().out == (
+        "line 3: Undefined property missing.\nline 4: Expected 0 arguments but got 1.\n"
+    )
+
+
+def test_if_cli_disassembles_script(tmp_path) -> None:
+    # GIVEN
+    script = tmp_path / "script.lox"
+    script.write_text('print "[x]";', encoding="utf-8")
+
+    # WHEN
+    result = CliRunner().invoke(pylox_cli, ["disassemble", str(script)])
+
+    # THEN
+    assert result.exit_code == 0
+    assert result.output == (
+        "== <script> ==\n"
+        "0000    1 CONSTANT            0 '[x]'\n"
+        "0002    | PRINT\n"
+        "0003    | NIL\n"
+        "0004    | RETURN\n"
+    )
+
+
+def test_if_break_out_of_a_function_unwinds_to_the_calling_loop(capsys) -> None:
+    # GIVEN
+    src = """
+    var fs;
+    for (var i = 0; i < 5; i = i + 1) {
+      var local = i * 10;
+      fun cap() { return local; }
+      fs = cap;
+      fun stop(x) { if (x == 2) break; return x; }
+      print 100 + stop(i);
+    }
+    print fs();
+    while (true) { fun t() { break; } fun u() { return t(); } u(); }
+    print "end";
+    """
+
+    # WHEN
+    Lox(engine=EngineKind.VM, opt_level=1).run(src)
+
+    # THEN
+    assert capsys.readouterr().out == "100\n101\n20\nend\n"
+
+
+@pytest.mark.parametrize(
+    "call",
+    ["x.m(f());", "A().nope(f());", "B().test();"],
+)
+def test_if_method_lookup_fails_before_arguments_run(capsys, call) -> None:
+    # GIVEN
+    src = f"""
+    fun f() {{ print "side"; return 1; }}
+    class A {{ m(x) {{ return x; }} }}
+    class B < A {{ test() {{ super.nope(f()); }} }}
+    var x = 1;
+    {call}
+    """
+    Lox(engine=EngineKind.TREE).run(src)
+    expected = capsys.readouterr().out
+
+    # WHEN
+    Lox(engine=EngineKind.VM).run(src)
+
+    # THEN
+    assert capsys.readouterr().out == expected
+    assert "side" not in expected
@@ -1,7 +1,31 @@
 import os
 
 
-def define_ast(output_dir, base_name, types):
+# Splits "type name, type name" at the commas outside of brackets.
+def split_fields(fields):
+    result, depth, start = [], 0, 0
+    for i, char in enumerate(fields):
+        if char == "[":
+            depth += 1
+        elif char == "]":
+            depth -= 1
+        elif char == "," and depth == 0:
+            result.append(fields[start:i].strip())
+            start = i + 1
+    result.append(fields[start:].strip())
+    return result
+
+
+# Every node class gets `__slots__` and a `kind`: its position in `types`,
+# offset by `first_kind` so that the kinds of the `Expr` and `Stmt` classes
+# don't overlap and one dispatch table can serve both.
+#
+# Fields after a `|` ("type name = default") are not constructor parameters:
+# they start out with their default and are filled in by the resolver. Fields
+# after a second `|` are declared the same way but belong to the engines, which
+# keep per-node caches in them while the program runs; they are listed in the
+# class's `runtime_fields` and never saved with the program.
+def define_ast(output_dir, base_name, types, first_kind=0):
     output_dir = os.path.abspath(output_dir)  # Get absolute path
 
     path = os.path.join(output_dir, f"{base_name.lower()}.py")
@@ -27,27 +51,56 @@ def define_ast(output_dir, base_name, types):
             f.write("        pass\n\n")
 
         f.write(f"\nclass {base_name}(ABC):\n")
+        f.write("    __slots__ = ()\n")
+        f.write("    kind: int\n")
+        f.write("    runtime_fields: typing.Tuple[str, ...] = ()\n\n")
         f.write("    @abstractmethod\n")
         f.write(f"    def accept(self, visitor: {base_name}Visitor)-> typing.Any:\n")
         f.write("        pass\n\n")
-        for expr_type in types:
+        class_names = []
+        for kind, expr_type in enumerate(types, first_kind):
             class_name = expr_type.split(":")[0].strip()
-            fields = expr_type.split(":")[1].strip() if ":" in expr_type else ""
+            class_names.append(class_name)
+            fields = expr_type.split(":", 1)[1].strip() if ":" in expr_type else ""
+            fields, _, resolved = fields.partition("|")
+            resolved, _, runtime = resolved.partition("|")
+            field_list = split_fields(fields) if fields.strip() else []
+            resolved_list = split_fields(resolved) if resolved.strip() else []
+            runtime_list = split_fields(runtime) if runtime.strip() else []
 
             f.write(f"class {class_name}({base_name}):\n")
-            if fields:  # If there are fields, generate a constructor
-                field_list = fields.split(", ")
+            field_names = [field.rsplit(" ", 1)[1].lower() for field in field_list]
+            resolved_fields = []
+            for field in resolved_list + runtime_list:
+                declaration, default = field.split("=")
+                field_type, name = declaration.strip().rsplit(" ", 1)
+                resolved_fields.append((field_type, name.lower(), default.strip()))
+            slot_names = field_names + [name for _, name, _ in resolved_fields]
+            slots = ", ".join(f'"{name}"' for name in slot_names)
+            if len(slot_names) == 1:
+                slots += ","
+            f.write(f"    __slots__ = ({slots})\n")
+            f.write(f"    kind = {kind}\n")
+            if runtime_list:
+                names = [name for _, name, _ in resolved_fields[len(resolved_list) :]]
+                runtime_fields = ", ".join(f'"{name}"' for name in names)
+                if len(names) == 1:
+                    runtime_fields += ","
+                f.write(f"    runtime_fields = ({runtime_fields})\n")
+            f.write("\n")
+            if field_list:  # If there are fields, generate a constructor
                 params = ", ".join(
-                    f"{field.split(' ')[1].lower()}: {field.split(' ')[0]}"
+                    f"{field.rsplit(' ', 1)[1].lower()}: {field.rsplit(' ', 1)[0]}"
                     for field in field_list
                 )
                 f.write(f"    def __init__(self, {params}):\n")
-                for field in field_list:
-                    name = field.split(" ")[1].lower()
+                for name in field_names:
                     f.write(f"        self.{name} = {name}\n")
             else:  # No fields, so generate a default constructor
                 f.write("    def __init__(self):\n")
                 f.write("        super().__init__()\n")
+            for field_type, name, default in resolved_fields:
+                f.write(f"        self.{name}: {field_type} = {default}\n")
 
             f.write(
                 f"\n    def accept(self, visitor: {base_name}Visitor) -> typing.Any:\n"
@@ -56,6 +109,31 @@ def define_ast(output_dir, base_name, types):
                 f"        return visitor.visit_{class_name.lower()}_{base_name.lower()}(self)\n\n"
             )
 
+        lower = base_name.lower()
+        upper = base_name.upper()
+        f.write(f"\n# The node classes in `kind` order, starting at {first_kind}.\n")
+        f.write(f"{upper}_NODES: typing.Tuple[typing.Type[{base_name}], ...] = (\n")
+        for class_name in class_names:
+            f.write(f"    {class_name},\n")
+        f.write(")\n\n")
+        f.write("\n# Table-driven alternative to `accept()`: the visitor's methods\n")
+        f.write(
+            f"# for the `{base_name}` kinds, in order. Visitors of both `Expr` and\n"
+        )
+        f.write(
+            "# `Stmt` concatenate the two tables and call `table[node.kind](node)`.\n"
+        )
+        f.write(
+            f"def {lower}_dispatch_table(visitor: {base_name}Visitor) -> "
+            "typing.List[typing.Callable[[typing.Any], typing.Any]]:\n"
+        )
+        f.write("    return [\n")
+        for class_name in class_names:
+            f.write(f"        visitor.visit_{class_name.lower()}_{lower},\n")
+        f.write("    ]\n")
+
+    return first_kind + len(types)
+
 
 if __name__ == "__main__":
     project_root = os.path.dirname(
@@ -66,22 +144,22 @@ if __name__ == "__main__":
     )  # This will resolve to lox/pylox/pylox
 
     os.makedirs(default_output_dir, exist_ok=True)
-    define_ast(
+    next_kind = define_ast(
         default_output_dir,
         "Expr",
         [
-            "Assign   : Token name, Expr value",
-            "Binary   : Expr left, Token operator, Expr right",
+            "Assign   : Token name, Expr value | typing.Optional[typing.Tuple[int, int]] resolved = None",
+            "Binary   : Expr left, Token operator, Expr right | | int failures = 0",
             "Grouping : Expr expression",
             "Literal  : object value",
             "Logical  : Expr left, Token operator, Expr right",
-            "Unary    : Token operator, Expr right",
-            "Variable : Token name",
-            "Call     : Expr callee, Token paren, typing.List[Expr] arguments",
-            "Get      : Expr obj, Token name",
+            "Unary    : Token operator, Expr right | | int failures = 0",
+            "Variable : Token name | typing.Optional[typing.Tuple[int, int]] resolved = None",
+            "Call     : Expr callee, Token paren, typing.List[Expr] arguments | | int failures = 0",
+            "Get      : Expr obj, Token name | | typing.Any cache = None, int failures = 0",
             "Set      : Expr obj, Token name, Expr value",
-            "This     : Token keyword",
-            "Super    : Token keyword, Token method",
+            "This     : Token keyword | typing.Optional[typing.Tuple[int, int]] resolved = None",
+            "Super    : Token keyword, Token method | typing.Optional[typing.Tuple[int, int]] resolved = None | typing.Any cache = None",
         ],
     )
     define_ast(
@@ -89,7 +167,7 @@ if __name__ == "__main__":
         "Stmt",
         [
             "If         : Expr condition, Stmt then_branch, typing.Optional[Stmt] else_branch",
-            "Block      : typing.List[Stmt] statements",
+            "Block      : typing.List[Stmt] statements | typing.Optional[int] inline_base = None",
             "Expression : Expr expression",
             "Print      : Expr expression",
             "Var        : Token name, typing.Optional[Expr] initializer",
@@ -98,5 +176,7 @@ if __name__ == "__main__":
             "Function   : Token name, typing.List[Token] params, typing.List[Stmt] body",
             "Return     : Token keyword, typing.Optional[Expr] value",
             "Class      : Token name, typing.Optional[Variable] superclass, typing.List[Function] methods",
+            "For        : typing.Optional[Stmt] initializer, typing.Optional[Expr] condition, typing.Optional[Expr] increment, Stmt body | typing.Optional[int] inline_base = None",
         ],
+        first_kind=next_kind,
     )